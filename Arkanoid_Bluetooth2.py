@@ -1,110 +1,62 @@
 import tkinter as tk
 from tkinter import messagebox
-from bleak import BleakClient
-import asyncio
-import json
-from asyncio import Event
-import threading
-from queue import Queue
+from ble_frame import decode_samples, is_binary_frame
+from ble_stream import FrameReassembler
 import random
+from physics import ArkanoidPhysics
+from game_loop import GameLoop
+from ble_input import InputQueue
+from imu_filter import InputFilter, LinearPredictor
+from ble_hub import BleHub, STATUS_CONNECTED
+from device_cache import DeviceCache, controller_addresses
+from sensor_log import install_from_env
+from renderer import TkRenderer, RECTANGLE, OVAL
+from arkanoid_config import (SERVICE_UUID, CHARACTERISTIC_UUID, WIN_WIDTH, WIN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT,
+                             BALL_SIZE, BALL_SPEED, PLAYER_SPEED, BLOCK_WIDTH, BLOCK_HEIGHT, LIVES)
 
-# UUIDs für den BLE-Service und die Charakteristik
-SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
-CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+# Nur falls noch kein Controller bekannt ist (siehe device_cache.py)
 BLUETOOTH_DEVICE1 = "64:E8:33:88:5E:E2"
 BLUETOOTH_DEVICE2 = "64:E8:33:88:9E:36"
 
 # Game settings
-WIN_WIDTH = 1000
-WIN_HEIGHT = 600
-PADDLE_WIDTH = 100
-PADDLE_HEIGHT = 10
-BALL_SIZE = 20
-BALL_SPEED = 5
-PLAYER_SPEED = 3
-BLOCK_WIDTH = 100
-BLOCK_HEIGHT = 30
 FG_COLOR = "black"
 BG_COLOR = "white"
 BLOCK_COLORS = ["red", "blue", "green", "yellow", "purple"]
-LIVES = 5
 
 class Paddle:
-    def __init__(self, canvas, x, y):
-        self.canvas = canvas
-        self.rect = canvas.create_rectangle(x, y, x + PADDLE_WIDTH, y + PADDLE_HEIGHT, fill=FG_COLOR)
-        self.speed = 0
-    
-    def move(self):
-        self.canvas.move(self.rect, self.speed, 0)
-        self.limit_within_screen()
-    
-    def limit_within_screen(self):
-        pos = self.canvas.coords(self.rect)
-        if pos[0] < 0:
-            self.canvas.move(self.rect, -pos[0], 0)
-        elif pos[2] > WIN_WIDTH:
-            self.canvas.move(self.rect, WIN_WIDTH - pos[2], 0)
+    def __init__(self, renderer, body):
+        self.renderer = renderer
+        self.body = body
+        self.item = renderer.create(RECTANGLE, body.bbox(), FG_COLOR)
+
+    def sync(self):
+        self.renderer.move(self.item, self.body.bbox())
     
     def set_speed(self, speed):
-        self.speed = speed
+        self.body.vx = speed
     
     def get_position(self):
-        return self.canvas.coords(self.rect)
+        return self.body.bbox()
 
 class Ball:
-    def __init__(self, canvas):
-        self.canvas = canvas
-        self.oval = canvas.create_oval(WIN_WIDTH // 2 - BALL_SIZE // 2, WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                                     WIN_WIDTH // 2 + BALL_SIZE // 2, WIN_HEIGHT // 2 + BALL_SIZE // 2, fill=FG_COLOR)
-        self.x_velocity = BALL_SPEED
-        self.y_velocity = -BALL_SPEED
-    
-    def move(self):
-        self.canvas.move(self.oval, self.x_velocity, self.y_velocity)
-        self.check_wall_collisions()
-    
-    def check_wall_collisions(self):
-        pos = self.canvas.coords(self.oval)
-        
-        if pos[0] <= 0 or pos[2] >= WIN_WIDTH:
-            self.x_velocity = -self.x_velocity
-        if pos[1] <= 0:
-            self.y_velocity = -self.y_velocity
-    
-    def check_paddle_collision(self, paddle):
-        pos = self.canvas.coords(self.oval)
-        paddle_pos = paddle.get_position()
-        
-        if pos[3] >= paddle_pos[1] and paddle_pos[0] < pos[2] and paddle_pos[2] > pos[0]:
-            self.y_velocity = -self.y_velocity
-    
-    def check_block_collision(self, blocks, game):
-        pos = self.canvas.coords(self.oval)
-        for block in blocks[:]:
-            block_pos = self.canvas.coords(block)
-            if block_pos and block_pos[1] < pos[3] and block_pos[3] > pos[1] and block_pos[0] < pos[2] and block_pos[2] > pos[0]:
-                self.canvas.delete(block)
-                blocks.remove(block)
-                self.y_velocity = -self.y_velocity
-                game.increase_score()
-                break
-    
-    def reset(self):
-        self.canvas.coords(self.oval, 
-                          WIN_WIDTH // 2 - BALL_SIZE // 2,
-                          WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                          WIN_WIDTH // 2 + BALL_SIZE // 2,
-                          WIN_HEIGHT // 2 + BALL_SIZE // 2)
-        self.x_velocity = 4
-        self.y_velocity = -4
+    def __init__(self, renderer, body):
+        self.renderer = renderer
+        self.body = body
+        self.item = renderer.create(OVAL, body.bbox(), FG_COLOR)
+
+    def sync(self):
+        self.renderer.move(self.item, self.body.bbox())
 
 class ArkanoidGame:
-    def __init__(self, root):
+    def __init__(self, root, seed=None):
         self.root = root
+        # Mit festem Seed sind auch die Blockfarben reproduzierbar
+        self.rng = random.Random(seed)
         self.root.title("Arkanoid Game")
         self.canvas = tk.Canvas(root, width=WIN_WIDTH, height=WIN_HEIGHT, bg=BG_COLOR)
         self.canvas.pack()
+        # Änderungen werden gesammelt und einmal pro Frame gezeichnet
+        self.renderer = TkRenderer(self.canvas)
         
         self.start_button = tk.Button(root, text="Start Game", command=self.start_game)
         self.start_button.pack()
@@ -116,86 +68,65 @@ class ArkanoidGame:
         self.score_label.pack()
         
         self.running = False
-        self.ble_queue = Queue()
+        # Weckt den Tk-Thread, sobald Daten da sind (statt alle 100 ms nachzusehen)
+        self.ble_queue = InputQueue(self.root, self.process_ble_data)
+        # Sensordaten werden gesammelt und einmal pro Tick gefiltert,
+        # zwischen zwei Samples wird der Steuerwert extrapoliert
+        self.input_filter = InputFilter(predictor=LinearPredictor)
+        self.ble_reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
         self.connected = False
         
+        # BLE-Verbindung läuft als Task auf der asyncio-Schleife des Hubs
+        # Zuletzt verbundener Controller zuerst, die feste Adresse nur als Ersatz
+        self.device_cache = DeviceCache()
+        self.ble_address = controller_addresses({1: BLUETOOTH_DEVICE1}, self.device_cache, SERVICE_UUID)[1]
+        self.ble_hub = BleHub(characteristic_uuid=CHARACTERISTIC_UUID).start()
+        self.ble_hub.add_device(1, self.ble_address, self.notification_handler, on_status=self.on_ble_status)
         
-        self.ble_thread = threading.Thread(target=self.run_ble_loop)
-        self.ble_thread.daemon = True
-        self.ble_thread.start()
-        
-        self.update_game()
-        self.root.after(100, self.check_ble_queue)
+        self.game_loop = GameLoop(self.root, self.update_game, self.render)
     
     def start_game(self):
         self.start_button.destroy()
         self.running = True
-        self.update_game()
+        self.game_loop.start()
        
     def init_game(self):
         self.score = 0
         self.lives = LIVES
-        self.paddle = Paddle(self.canvas, WIN_WIDTH // 2 - PADDLE_WIDTH // 2, WIN_HEIGHT - 50)
-        self.ball = Ball(self.canvas)
+        self.physics = ArkanoidPhysics(WIN_WIDTH, WIN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, BALL_SPEED,
+                                       BLOCK_WIDTH, BLOCK_HEIGHT)
+        self.paddle = Paddle(self.renderer, self.physics.paddle)
+        self.ball = Ball(self.renderer, self.physics.ball)
         self.blocks = self.create_blocks()
+        self.renderer.flush()
         
     def restart_game(self):
-        for block in self.blocks:
-            self.canvas.delete(block)
-        self.paddle.canvas.delete(self.paddle.rect)
-        self.ball.canvas.delete(self.ball.oval)
+        # Figuren werden nur versteckt und von init_game() wiederverwendet
+        self.renderer.release_all()
         self.init_game()
         self.running = True
     
     def create_blocks(self):
-        blocks = []
-        for row in range(5):
-            for col in range(WIN_WIDTH // BLOCK_WIDTH):
-                x1 = col * BLOCK_WIDTH
-                y1 = row * BLOCK_HEIGHT
-                x2 = x1 + BLOCK_WIDTH
-                y2 = y1 + BLOCK_HEIGHT
-                block = self.canvas.create_rectangle(x1, y1, x2, y2, fill=random.choice(BLOCK_COLORS))
-                blocks.append(block)
+        # Zuordnung Block-Body -> Renderer-Handle
+        blocks = {}
+        for body in self.physics.blocks:
+            blocks[body] = self.renderer.create(RECTANGLE, body.bbox(), self.rng.choice(BLOCK_COLORS))
         return blocks
 
-    def check_ble_queue(self):
-        try:
-            while not self.ble_queue.empty():
-                data = self.ble_queue.get_nowait()
-                self.process_ble_data(data)
-        except Exception as e:
-            print(f"Error processing BLE queue: {e}")
-        finally:
-            self.root.after(100, self.check_ble_queue)
-    
     def process_ble_data(self, data):
         try:
-            json_str = data.decode('utf-8')
-            joystick_data = json.loads(json_str)
-            ax = joystick_data.get("Ax", 0)
-            if self.running:
-                self.paddle.set_speed(ax * PLAYER_SPEED)
+            self.input_filter.push_batch(1, decode_samples(data))
         except Exception as e:
             print(f"Error processing BLE data: {e}")
     
     def notification_handler(self, sender, data):
-        self.ble_queue.put(data)
+        for frame in self.ble_reassembler.feed(data):
+            self.ble_queue.put(bytes(frame))
     
-    def run_ble_loop(self):
-        async def run_ble():
-            while True:
-                try:
-                    async with BleakClient(BLUETOOTH_DEVICE1) as client:
-                        print("Connected to BLE device")
-                        self.connected = True
-                        await client.start_notify(CHARACTERISTIC_UUID, self.notification_handler)
-                        await Event().wait()
-                except Exception as e:
-                    print(f"BLE Error: {e}")
-                    self.connected = False
-                    await asyncio.sleep(1)
-        asyncio.run(run_ble())
+    def on_ble_status(self, status):
+        print(f"BLE: {status}")
+        self.connected = status == STATUS_CONNECTED
+        self.device_cache.record_status(self.ble_address, status, SERVICE_UUID)
 
     def increase_score(self):
         self.score += 10
@@ -207,7 +138,7 @@ class ArkanoidGame:
         if self.lives == 0:
             self.game_over()
         else:
-            self.ball.reset()
+            self.physics.reset_ball()
     
     def check_win(self):
         if not self.blocks:  # Falls alle Blöcke entfernt wurden
@@ -225,20 +156,35 @@ class ArkanoidGame:
             self.root.quit()
     
     def update_game(self):
+        # Ein Physik-Schritt, wird von GameLoop mit festem Takt aufgerufen
+        # None: seit `stale_after` nichts gekommen, Schläger anhalten statt weiterrutschen
+        value = self.input_filter.value(1)
+        if self.running:
+            self.paddle.set_speed(0 if value is None else value * PLAYER_SPEED)
         if self.running:
             self.check_win()
-            self.ball.move()
-            self.ball.check_paddle_collision(self.paddle)
-            self.ball.check_block_collision(self.blocks, self)
-            if self.ball.canvas.coords(self.ball.oval)[3] > WIN_HEIGHT:
+        if self.running:  # Spiel wurde nach dem Sieg evtl. beendet
+            for block in self.physics.step():
+                self.renderer.release(self.blocks.pop(block))
+                self.increase_score()
+            if self.physics.ball_lost():
                 self.lose_life()
-            self.paddle.move()
-            self.root.after(20, self.update_game)
+        if not self.running:
+            self.game_loop.stop()
+
+    def render(self):
+        self.paddle.sync()
+        self.ball.sync()
+        self.renderer.flush()
 
 def main():
+    install_from_env()
     root = tk.Tk()
     game = ArkanoidGame(root)
     root.mainloop()
+    print(f"BLE-Queue: {game.ble_queue.stats()}")
+    print(f"Eingaben: {game.input_filter.stats(1)}")
+    game.ble_hub.stop()
 
 if __name__ == "__main__":
     main()
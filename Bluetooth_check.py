@@ -1,16 +1,158 @@
-from bleak import BleakClient
+import argparse
 import asyncio
+import time
+from collections import deque
+
+from ble_frame import (COMMAND_FIELDS, COMMAND_INTERVAL, SENSOR_FIELDS, decode_samples, encode_command,
+                       is_binary_frame, sample_ages)
+from ble_hub import BleHub, STATUS_CONNECTED
+from ble_stream import FrameReassembler
+from link_stats import LinkStats
 
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
 
-async def run(address):
-    async with BleakClient(address) as client:
-        print("Verbunden!")
-        while True:
-            value = await client.read_gatt_char(CHARACTERISTIC_UUID)
-            print("Empfangene Daten:", value.decode())
+DEFAULT_ADDRESSES = ["64:e8:33:88:5e:e2"]  # Ersetze durch die BLE-Adresse deines ESP32-C3
+WINDOW = 200  # Anzahl Notifications, über die Rate und Jitter berechnet werden
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LinkMonitor:
+    """Sammelt Messwerte der Notifications eines Controllers.
+
+    Es wird nur mitgehört (Notifications), nicht gelesen - die Messung
+    belastet die Funkverbindung also nicht zusätzlich.
+    """
+
+    def __init__(self, address, window=WINDOW):
+        self.address = address
+        self.status = "Nicht verbunden"
+        self.notifications = 0
+        self.frames = 0
+        self.decode_errors = 0
+        self.arrivals = deque(maxlen=window)
+        self.sizes = deque(maxlen=window)
+        self.last_frame = None
+        self.reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
+        # Verlust und Laufzeit-Jitter aus Frame-Zähler und Sendezeit (neuere Firmware)
+        self.link = LinkStats()
+
+    def on_status(self, status):
+        self.status = status
+        if status == STATUS_CONNECTED:
+            self.link.reset()
+
+    def on_notify(self, sender, data):
+        now = time.monotonic()
+        self.arrivals.append(now)
+        self.sizes.append(len(data))
+        self.notifications += 1
+        self.link.on_notification(len(data), now)
+        for frame in self.reassembler.feed(data):
+            try:
+                samples = decode_samples(frame)
+            except Exception:
+                self.decode_errors += 1
+                continue
+            self.frames += len(samples)
+            self.last_frame = samples[-1]
+            for sample, age in zip(samples, sample_ages(samples)):
+                self.link.on_frame(sample.get("seq"), sample.get("ms"), now - age)
+
+    def snapshot(self):
+        arrivals = list(self.arrivals)
+        intervals = sorted(b - a for a, b in zip(arrivals, arrivals[1:]))
+        sizes = list(self.sizes)
+        rate = 0.0
+        if len(arrivals) > 1 and arrivals[-1] > arrivals[0]:
+            rate = (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+        median = percentile(intervals, 0.5)
+        link = self.link.stats()
+        return {
+            "status": self.status,
+            "notifications": self.notifications,
+            "rate_hz": rate,
+            "samples_per_s": link["samples_per_s"],
+            "interval_p50_ms": 1000 * median,
+            # Jitter = Abweichung der Ankunftsabstände vom Median
+            "jitter_p95_ms": 1000 * (percentile(intervals, 0.95) - median),
+            "jitter_p99_ms": 1000 * (percentile(intervals, 0.99) - median),
+            "size_min": min(sizes, default=0),
+            "size_avg": sum(sizes) / len(sizes) if sizes else 0.0,
+            "size_max": max(sizes, default=0),
+            "decode_errors": self.decode_errors,
+            "resyncs": self.reassembler.resync_count,
+            # nur mit Frame-Zähler (sonst None)
+            "loss_rate": link["loss_rate"] if link["sequenced"] else None,
+            "reordered": link["reordered"] if link["sequenced"] else None,
+            "transit_jitter_ms": link["jitter_ms"] if link["sequenced"] else None,
+        }
+
+
+def print_report(monitors):
+    print(f"{'Adresse':<18} {'Status':<26} {'Rate':>7} {'Mess.':>7} {'p50':>7} {'Jit95':>7} {'Jit99':>7} "
+          f"{'Bytes min/avg/max':>18} {'Fehler':>6} {'Verlust':>7} {'Vert.':>5} {'Laufz.':>7}")
+    for monitor in monitors:
+        s = monitor.snapshot()
+        sizes = f"{s['size_min']}/{s['size_avg']:.0f}/{s['size_max']}"
+        if s["loss_rate"] is None:
+            link = f"{'-':>7} {'-':>5} {'-':>7}"  # Firmware ohne Frame-Zähler
+        else:
+            link = f"{100 * s['loss_rate']:6.1f}% {s['reordered']:>5} {s['transit_jitter_ms']:5.1f}ms"
+        print(f"{monitor.address:<18} {s['status']:<26} {s['rate_hz']:6.1f}Hz {s['samples_per_s']:6.1f}Hz "
+              f"{s['interval_p50_ms']:5.1f}ms "
+              f"{s['jitter_p95_ms']:5.1f}ms {s['jitter_p99_ms']:5.1f}ms {sizes:>18} "
+              f"{s['decode_errors'] + s['resyncs']:>6} {link}")
+    print()
+
+
+async def run(addresses, interval=1.0, duration=None, sample_interval=None, fields=None):
+    hub = BleHub(asyncio.get_running_loop(), CHARACTERISTIC_UUID).start()
+    # Messabstand und Sensorwerte nach jedem Verbinden einstellen (neuere Firmware)
+    commands = b""
+    if sample_interval is not None:
+        commands += encode_command(COMMAND_INTERVAL, sample_interval)
+    if fields:
+        commands += encode_command(COMMAND_FIELDS, fields)
+
+    def on_status(key, monitor, status):
+        monitor.on_status(status)
+        if status == STATUS_CONNECTED and commands:
+            hub.write(key, commands)
+
+    monitors = []
+    for key, address in enumerate(addresses, start=1):
+        monitor = LinkMonitor(address)
+        monitors.append(monitor)
+        hub.add_device(key, address, monitor.on_notify,
+                       on_status=lambda status, key=key, monitor=monitor: on_status(key, monitor, status))
+
+    start = time.monotonic()
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            await asyncio.sleep(interval)
+            print_report(monitors)
+    finally:
+        await hub.shutdown()
+    return [monitor.snapshot() for monitor in monitors]
+
 
 if __name__ == "__main__":
-    address = "64:e8:33:88:5e:e2"  # Ersetze durch die BLE-Adresse deines ESP32-C3
-    asyncio.run(run(address))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Misst die Qualität der BLE-Verbindung zu einem oder mehreren Controllern.")
+    parser.add_argument("addresses", nargs="*", default=DEFAULT_ADDRESSES, help="BLE-Adressen der Controller")
+    parser.add_argument("--interval", type=float, default=1.0, help="Ausgabeintervall in Sekunden")
+    parser.add_argument("--duration", type=float, default=None, help="Messdauer in Sekunden (Standard: endlos)")
+    parser.add_argument("--sample-interval", type=float, default=None,
+                        help="Messabstand des Controllers in Sekunden (Standard: wie die Firmware)")
+    parser.add_argument("--fields", nargs="+", choices=SENSOR_FIELDS, default=None,
+                        help="nur diese Sensorwerte senden lassen")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.addresses, args.interval, args.duration, args.sample_interval, args.fields))
+    except KeyboardInterrupt:
+        pass
@@ -1,14 +1,22 @@
 import tkinter as tk
-from bleak import BleakClient
-import asyncio
-import json
-from asyncio import Event
-import threading
-from queue import Queue
+import math
+from ble_frame import decode_samples, is_binary_frame
+from ble_stream import FrameReassembler
+from physics import Body, advance
+from game_loop import GameLoop
+from ble_input import InputQueue
+from imu_filter import InputFilter, LinearPredictor
+from ble_hub import BleHub, STATUS_CONNECTED
+from device_cache import DeviceCache, controller_addresses
+from sensor_log import install_from_env
+from renderer import TkRenderer, RECTANGLE, OVAL
+from pong_ai import PongAI, DIFFICULTIES
 
 # UUIDs für den BLE-Service und die Charakteristik
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+# Nur falls noch kein Controller bekannt ist (siehe device_cache.py)
+BLUETOOTH_DEVICE1 = "64:e8:33:88:5e:e2"
 
 # Game settings
 WIN_WIDTH = 1000
@@ -19,90 +27,76 @@ BALL_SIZE = 20
 PLAYER_SPEED = 5
 FG_COLOR = "black"
 BG_COLOR = "white"
+AI_LEVEL = "mittel"  # Computergegner: "leicht", "mittel" oder "schwer"
 
 class Paddle:
-    def __init__(self, canvas, x, y):
-        self.canvas = canvas
-        self.rect = canvas.create_rectangle(x, y, x + PADDLE_WIDTH, y + PADDLE_HEIGHT, fill=FG_COLOR)
-        self.speed = 0
+    def __init__(self, renderer, x, y):
+        self.renderer = renderer
+        self.body = Body(x, y, PADDLE_WIDTH, PADDLE_HEIGHT)
+        self.item = renderer.create(RECTANGLE, self.body.bbox(), FG_COLOR)
 
     def move(self):
-        self.canvas.move(self.rect, 0, self.speed)
+        self.body.y += self.body.vy
         self.limit_within_screen()
 
     def limit_within_screen(self):
-        pos = self.canvas.coords(self.rect)
-        if pos[1] < 0:
-            self.canvas.move(self.rect, 0, -pos[1])
-        elif pos[3] > WIN_HEIGHT:
-            self.canvas.move(self.rect, 0, WIN_HEIGHT - pos[3])
+        body = self.body
+        if body.y < 0:
+            body.y = 0
+        elif body.bottom > WIN_HEIGHT:
+            body.y = WIN_HEIGHT - body.height
+
+    def sync(self):
+        self.renderer.move(self.item, self.body.bbox())
 
     def set_speed(self, speed):
-        self.speed = speed
+        self.body.vy = speed
 
     def get_position(self):
-        return self.canvas.coords(self.rect)
+        return self.body.bbox()
 
 class Ball:
-    def __init__(self, canvas):
-        self.canvas = canvas
-        self.oval = canvas.create_oval(WIN_WIDTH // 2 - BALL_SIZE // 2, WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                                     WIN_WIDTH // 2 + BALL_SIZE // 2, WIN_HEIGHT // 2 + BALL_SIZE // 2, fill=FG_COLOR)
-        self.x_velocity = 4
-        self.y_velocity = 4
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.body = Body(0, 0, BALL_SIZE, BALL_SIZE, 4, 4)
+        self.body.center_at(WIN_WIDTH // 2, WIN_HEIGHT // 2)
+        self.item = renderer.create(OVAL, self.body.bbox(), FG_COLOR)
         self.base_speed = 4  # Grundgeschwindigkeit für Normalisierung nach Kollisionen
 
-    def move(self):
-        self.canvas.move(self.oval, self.x_velocity, self.y_velocity)
-        self.check_wall_collisions()
-
-    def check_wall_collisions(self):
-        pos = self.canvas.coords(self.oval)
-        
-        # Obere und untere Wand
-        if pos[1] <= 0:  # Obere Wand
-            self.y_velocity = abs(self.y_velocity)  # Erzwinge positive y-Geschwindigkeit
-            self.canvas.move(self.oval, 0, -pos[1])  # Verhindere Steckenbleiben
-        elif pos[3] >= WIN_HEIGHT:  # Untere Wand
-            self.y_velocity = -abs(self.y_velocity)  # Erzwinge negative y-Geschwindigkeit
-            self.canvas.move(self.oval, 0, WIN_HEIGHT - pos[3])  # Verhindere Steckenbleiben
+    def move(self, paddles):
+        # Swept-Test gegen Schläger und obere/untere Wand, damit der Ball auch bei
+        # hoher Geschwindigkeit nicht durch den Schläger fliegt; die seitlichen
+        # Ränder bleiben offen (verpasster Ball)
+        bodies = tuple(paddle.body for paddle in paddles)
+        advance(self.body, (None, 0, None, WIN_HEIGHT), lambda *area: bodies, self.bounce_off_paddle)
+
+    def bounce_off_paddle(self, paddle):
+        pos = self.body.bbox()
+        paddle_pos = paddle.bbox()
+
+        # Berechne Auftreffpunkt relativ zur Paddlemitte
+        paddle_center = (paddle_pos[3] + paddle_pos[1]) / 2
+        ball_center = (pos[3] + pos[1]) / 2
+        relative_intersect = (ball_center - paddle_center) / (PADDLE_HEIGHT / 2)
         
-        # Rechte Wand
-        if pos[2] >= WIN_WIDTH:  # Rechte Wand
-            self.x_velocity = -abs(self.x_velocity)  # Erzwinge negative x-Geschwindigkeit
-            self.canvas.move(self.oval, WIN_WIDTH - pos[2], 0)  # Verhindere Steckenbleiben
-
-    def check_paddle_collision(self, paddle):
-        pos = self.canvas.coords(self.oval)
-        paddle_pos = paddle.get_position()
+        # Bounce angle zwischen -45 und 45 Grad
+        bounce_angle = relative_intersect * 45
         
-        if (paddle_pos[0] < pos[2] < paddle_pos[2] or paddle_pos[0] < pos[0] < paddle_pos[2]) and \
-           (paddle_pos[1] < pos[3] < paddle_pos[3] or paddle_pos[1] < pos[1] < paddle_pos[3]):
-            
-            # Berechne Auftreffpunkt relativ zur Paddlemitte
-            paddle_center = (paddle_pos[3] + paddle_pos[1]) / 2
-            ball_center = (pos[3] + pos[1]) / 2
-            relative_intersect = (ball_center - paddle_center) / (PADDLE_HEIGHT / 2)
-            
-            # Bounce angle zwischen -45 und 45 Grad
-            bounce_angle = relative_intersect * 45
-            
-            # Setze neue Geschwindigkeiten basierend auf dem Bounce Angle
-            import math
-            self.x_velocity = abs(self.base_speed * math.cos(math.radians(bounce_angle)))
-            self.y_velocity = self.base_speed * math.sin(math.radians(bounce_angle))
+        # Setze neue Geschwindigkeiten basierend auf dem Bounce Angle, weg vom Schläger
+        direction = 1 if paddle_pos[0] < WIN_WIDTH / 2 else -1
+        self.body.vx = direction * abs(self.base_speed * math.cos(math.radians(bounce_angle)))
+        self.body.vy = self.base_speed * math.sin(math.radians(bounce_angle))
+
+    def sync(self):
+        self.renderer.move(self.item, self.body.bbox())
 
     def reset(self):
         # Zentriere den Ball
-        self.canvas.coords(self.oval, 
-                          WIN_WIDTH // 2 - BALL_SIZE // 2,
-                          WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                          WIN_WIDTH // 2 + BALL_SIZE // 2,
-                          WIN_HEIGHT // 2 + BALL_SIZE // 2)
+        self.body.center_at(WIN_WIDTH // 2, WIN_HEIGHT // 2)
         
         # Setze Geschwindigkeit zurück und starte nach links
-        self.x_velocity = -self.base_speed
-        self.y_velocity = 0
+        self.body.vx = -self.base_speed
+        self.body.vy = 0
 
 class PongGame:
     def __init__(self, root):
@@ -111,77 +105,79 @@ class PongGame:
         self.canvas = tk.Canvas(root, width=WIN_WIDTH, height=WIN_HEIGHT, bg=BG_COLOR)
         self.canvas.pack()
 
-        self.left_paddle = Paddle(self.canvas, 10, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2)
-        self.ball = Ball(self.canvas)
+        # Änderungen werden gesammelt und einmal pro Frame gezeichnet
+        self.renderer = TkRenderer(self.canvas)
+        self.left_paddle = Paddle(self.renderer, 10, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.right_paddle = Paddle(self.renderer, WIN_WIDTH - 10 - PADDLE_WIDTH, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.ball = Ball(self.renderer)
+        # Der rechte Schläger wird vom Computer gespielt
+        self.ai = PongAI(self.ball.body, self.right_paddle.body, WIN_WIDTH, WIN_HEIGHT, **DIFFICULTIES[AI_LEVEL])
+        self.renderer.flush()
         
-        self.ble_queue = Queue()
+        # Weckt den Tk-Thread, sobald Daten da sind (statt alle 100 ms nachzusehen)
+        self.ble_queue = InputQueue(self.root, self.process_ble_data)
+        # Sensordaten werden gesammelt und einmal pro Tick gefiltert,
+        # zwischen zwei Samples wird der Steuerwert extrapoliert
+        self.input_filter = InputFilter(predictor=LinearPredictor)
+        self.ble_reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
         self.connected = False
         
-        # Start BLE connection in a separate thread
-        self.ble_thread = threading.Thread(target=self.run_ble_loop)
-        self.ble_thread.daemon = True
-        self.ble_thread.start()
+        # BLE-Verbindung läuft als Task auf der asyncio-Schleife des Hubs
+        # Zuletzt verbundener Controller zuerst, die feste Adresse nur als Ersatz
+        self.device_cache = DeviceCache()
+        self.ble_address = controller_addresses({1: BLUETOOTH_DEVICE1}, self.device_cache, SERVICE_UUID)[1]
+        self.ble_hub = BleHub(characteristic_uuid=CHARACTERISTIC_UUID).start()
+        self.ble_hub.add_device(1, self.ble_address, self.notification_handler, on_status=self.on_ble_status)
         
         # Start game update loop
-        self.update_game()
-        
-        # Check BLE queue periodically
-        self.root.after(100, self.check_ble_queue)
-
-    def check_ble_queue(self):
-        try:
-            while not self.ble_queue.empty():
-                data = self.ble_queue.get_nowait()
-                self.process_ble_data(data)
-        except Exception as e:
-            print(f"Error processing BLE queue: {e}")
-        finally:
-            self.root.after(100, self.check_ble_queue)
+        self.game_loop = GameLoop(self.root, self.update_game, self.render)
+        self.game_loop.start()
 
     def process_ble_data(self, data):
         try:
-            json_str = data.decode('utf-8')
-            joystick_data = json.loads(json_str)
-            ax = joystick_data.get("Ax", 0)
-            self.left_paddle.set_speed(ax * PLAYER_SPEED)
+            self.input_filter.push_batch(1, decode_samples(data))
         except Exception as e:
             print(f"Error processing BLE data: {e}")
 
     def notification_handler(self, sender, data):
-        self.ble_queue.put(data)
-
-    def run_ble_loop(self):
-        async def run_ble():
-            while True:
-                try:
-                    async with BleakClient("64:e8:33:88:5e:e2") as client:
-                        print("Connected to BLE device")
-                        self.connected = True
-                        await client.start_notify(CHARACTERISTIC_UUID, self.notification_handler)
-                        await Event().wait()  # Run forever
-                except Exception as e:
-                    print(f"BLE Error: {e}")
-                    self.connected = False
-                    await asyncio.sleep(1)  # Wait before retrying
-
-        asyncio.run(run_ble())
+        for frame in self.ble_reassembler.feed(data):
+            self.ble_queue.put(bytes(frame))
+
+    def on_ble_status(self, status):
+        print(f"BLE: {status}")
+        self.connected = status == STATUS_CONNECTED
+        self.device_cache.record_status(self.ble_address, status, SERVICE_UUID)
 
     def update_game(self):
-        self.ball.move()
-        self.ball.check_paddle_collision(self.left_paddle)
+        # None: seit `stale_after` nichts gekommen, Schläger anhalten statt weiterrutschen
+        value = self.input_filter.value(1)
+        self.left_paddle.set_speed(0 if value is None else value * PLAYER_SPEED)
+
+        self.right_paddle.set_speed(self.ai.update())
+
+        self.ball.move((self.left_paddle, self.right_paddle))
         
-        # Ball-Reset wird jetzt nur noch ausgelöst, wenn der Ball die linke Wand berührt
-        ball_pos = self.ball.canvas.coords(self.ball.oval)
-        if ball_pos[0] <= 0:  # Ball hat linke Wand berührt
+        # Ball-Reset, wenn ein Schläger den Ball verpasst hat
+        if self.ball.body.x <= 0 or self.ball.body.right >= WIN_WIDTH:
             self.ball.reset()
 
         self.left_paddle.move()
-        self.root.after(20, self.update_game)
+        self.right_paddle.move()
+
+    def render(self):
+        self.ball.sync()
+        self.left_paddle.sync()
+        self.right_paddle.sync()
+        self.renderer.flush()
 
 def main():
+    install_from_env()
     root = tk.Tk()
     game = PongGame(root)
     root.mainloop()
+    print(f"BLE-Queue: {game.ble_queue.stats()}")
+    print(f"Eingaben: {game.input_filter.stats(1)}")
+    game.ble_hub.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
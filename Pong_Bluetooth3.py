@@ -1,169 +1,123 @@
 from tkinter import messagebox
 import tkinter as tk
-from bleak import BleakClient
 import asyncio
-import json
 import threading
-import time
 import logging
+from physics import PongPhysics
+from game_loop import GameLoop
+from imu_filter import InputFilter, LinearPredictor, TILT_FIELDS
+from ble_hub import BleHub
+from controller_registry import ControllerRegistry
+from device_cache import DeviceCache, controller_addresses
+from sensor_log import install_from_env
+from renderer import TkRenderer, RECTANGLE, OVAL
+from pong_ai import PongAI, DIFFICULTIES
+from pong_config import (SERVICE_UUID, CHARACTERISTIC_UUID, WIN_WIDTH, WIN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT,
+                         BALL_SIZE, BALL_SPEED, PADDLE_SPEED)
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Bluetooth MAC-Adressen
-BLUETOOTH_DEVICE1 = "64:E8:33:88:5E:E2"
-BLUETOOTH_DEVICE2 = "64:E8:33:88:9E:36"
-SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
-CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
-
-# Spielfeldgrößen
-WIN_WIDTH = 800
-WIN_HEIGHT = 600
-PADDLE_WIDTH = 10
-PADDLE_HEIGHT = 100
-BALL_SIZE = 20
-BALL_SPEED = 5
-PADDLE_SPEED = 4
+# Bluetooth MAC-Adressen der Controller, Schlüssel ist der Spielerplatz. Nur
+# Ersatz, solange kein Controller bekannt ist (siehe device_cache.py)
+CONTROLLER_ADDRESSES = {
+    1: "64:E8:33:88:5E:E2",
+    2: "64:E8:33:88:9E:36",
+}
+
+# Messabstand der Controller während des Spiels (100 Hz); außerhalb des
+# Spiels (Einstellungen, Spielende) senden sie gar nicht
+PLAY_INTERVAL = 0.01
+
+# Tasten (hoch, runter) je Spielerplatz bei Tastatursteuerung
+KEY_BINDINGS = {
+    1: ("Up", "Down"),
+    2: ("w", "s"),
+}
 
 class Paddle:
-    def __init__(self, canvas, x, y, color="white"):
-        self.canvas = canvas
-        self.id = canvas.create_rectangle(x, y, x + PADDLE_WIDTH, y + PADDLE_HEIGHT, fill=color)
-        self.speed = 0
-        
-    def move(self):
-        pos = self.canvas.coords(self.id)
-        if 0 <= pos[1] + self.speed <= WIN_HEIGHT - PADDLE_HEIGHT:
-            self.canvas.move(self.id, 0, self.speed)
-            
+    def __init__(self, renderer, body, color="white"):
+        self.renderer = renderer
+        self.body = body
+        self.id = renderer.create(RECTANGLE, body.bbox(), color)
+
+    def sync(self):
+        self.renderer.move(self.id, self.body.bbox())
+
     def get_coords(self):
-        return self.canvas.coords(self.id)
+        return self.body.bbox()
     
     def set_speed(self, speed):
-        self.speed = speed  
+        self.body.vy = speed
 
 class Ball:
-    def __init__(self, canvas, x, y, color="white"):
-        self.canvas = canvas
-        self.id = canvas.create_oval(x - BALL_SIZE // 2, y - BALL_SIZE // 2,
-                                   x + BALL_SIZE // 2, y + BALL_SIZE // 2, fill=color)
-        self.dx = BALL_SPEED
-        self.dy = BALL_SPEED
-        
-    def move(self):
-        self.canvas.move(self.id, self.dx, self.dy)
-        
+    def __init__(self, renderer, body, color="white"):
+        self.renderer = renderer
+        self.body = body
+        self.id = renderer.create(OVAL, body.bbox(), color)
+
+    def sync(self):
+        self.renderer.move(self.id, self.body.bbox())
+
     def get_coords(self):
-        return self.canvas.coords(self.id)
-    
-    def reset(self):
-        self.canvas.coords(self.id, WIN_WIDTH // 2 - BALL_SIZE // 2, WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                          WIN_WIDTH // 2 + BALL_SIZE // 2, WIN_HEIGHT // 2 + BALL_SIZE // 2)
-        self.dx = BALL_SPEED
-        self.dy = BALL_SPEED
+        return self.body.bbox()
 
 class BluetoothManager:
     def __init__(self, parent, loop):
         self.parent = parent
         self.loop = loop
-        self.client1 = None
-        self.client2 = None
-        self.device1_connected = False
-        self.device2_connected = False
-        self.device1_status = "Nicht verbunden"
-        self.device2_status = "Nicht verbunden"
-        self.stop_event = threading.Event()
-        self.device_threads = {}
-        self.last_update1 = 0
-        self.last_update2 = 0
-
-    def start_device_thread(self, address, device_num):
-        thread = threading.Thread(target=self.device_connection_loop, args=(address, device_num), daemon=True)
-        thread.name = f"BLE-Device-{device_num}"  # Für bessere Nachverfolgbarkeit
-        self.device_threads[device_num] = thread
-        thread.start()
-
-    def device_connection_loop(self, address, device_num):
-        while not self.stop_event.is_set():
-            try:
-                asyncio.run_coroutine_threadsafe(self.connect_device(address, device_num), self.loop).result()
-                while self.is_device_connected(device_num) and not self.stop_event.is_set():
-                    time.sleep(0.05)  # Noch kürzere Wartezeit für schnellere Reaktion
-            except Exception as e:
-                logger.error(f"Fehler im Gerät-{device_num}-Thread: {e}")
-            logger.info(f"Verbindung zu Gerät {device_num} verloren. Erneuter Versuch in 1 Sekunde...")
-            time.sleep(1)
+        # Alle Controller laufen als Tasks auf der gemeinsamen asyncio-Schleife,
+        # jeder Spielerplatz ist ein Eintrag in der Registry
+        self.hub = BleHub(loop, CHARACTERISTIC_UUID).start()
+        self.controllers = ControllerRegistry(self.hub, self.on_samples, self.on_status)
+        self.streaming = False
+        # Zuletzt verbundene Controller zuerst, die festen Adressen nur als Ersatz
+        self.device_cache = DeviceCache()
+        self.addresses = controller_addresses(CONTROLLER_ADDRESSES, self.device_cache, SERVICE_UUID)
+
+    def connect_device(self, address, device_num):
+        # Einstellungen gelten ab dem Verbinden, der Controller sendet also nie umsonst
+        self.controllers.add(device_num, address)
+        self.controllers.set_fields(TILT_FIELDS, device_num)
+        self.controllers.set_interval(PLAY_INTERVAL, device_num)
+        if not self.streaming:
+            self.controllers.pause(device_num)
+
+    def set_streaming(self, active):
+        """Controller senden lassen (im Spiel) oder pausieren (Einstellungen, Spielende)."""
+        if active == self.streaming:
+            return
+        self.streaming = active
+        if active:
+            # Alte Samples von vor der Pause nicht in die Vorhersage einbeziehen
+            self.parent.input_filter.reset()
+            self.controllers.resume()
+        else:
+            self.controllers.pause()
 
     def is_device_connected(self, device_num):
-        return self.device1_connected if device_num == 1 else self.device2_connected
-
-    async def connect_device(self, address, device_num):
-        try:
-            client = BleakClient(address)
-            await client.connect(timeout=5.0)
-            logger.info(f"Gerät {device_num} verbunden")
-            if device_num == 1:
-                self.client1 = client
-                self.device1_connected = True
-            else:
-                self.client2 = client
-                self.device2_connected = True
-
-            await client.start_notify(CHARACTERISTIC_UUID, 
-                                   self.notification_handler1 if device_num == 1 else self.notification_handler2)
-            self.update_device_status(device_num, "Verbunden")
-        except Exception as e:
-            logger.error(f"Fehler beim Verbinden mit Gerät {device_num}: {e}")
-            self.update_device_status(device_num, "Verbindung fehlgeschlagen")
-            if device_num == 1:
-                self.device1_connected = False
-            else:
-                self.device2_connected = False
-            raise
+        return self.controllers.is_connected(device_num)
 
-    def update_device_status(self, device_num, status):
-        if device_num == 1:
-            self.device1_status = status
-        else:
-            self.device2_status = status
+    def device_status(self, device_num):
+        return self.controllers.status(device_num)
+
+    def link_summary(self, device_num):
+        return self.controllers.link_summary(device_num)
+
+    def on_samples(self, device_num, samples, timestamp):
+        #logger.debug(f"Spieler {device_num} - Ax: {samples[-1].get('Ax', 0)}")
+        self.parent.input_filter.push_batch(device_num, samples, timestamp)
+
+    def on_status(self, device_num, status):
+        controller = self.controllers.get(device_num)
+        if controller is not None:
+            self.device_cache.record_status(controller.address, status, SERVICE_UUID)
         self.parent.root.after(0, self.parent.update_status_labels)
 
-    def notification_handler1(self, sender, data):
-        try:
-            current_time = time.time()
-            joystick_data = json.loads(data.decode('utf-8'))
-            speed = joystick_data.get("Ax", 0) * PADDLE_SPEED
-            #logger.debug(f"Spieler 1 - Speed: {speed}, Zeit seit letztem Update: {current_time - self.last_update1:.3f}s")
-            self.last_update1 = current_time
-            self.parent.root.after(0, lambda: self.parent.set_paddle_speed(1, speed))
-        except Exception as e:
-            logger.error(f"Fehler bei der Verarbeitung der BLE-Daten für Gerät 1: {e}")
-
-    def notification_handler2(self, sender, data):
-        try:
-            current_time = time.time()
-            joystick_data = json.loads(data.decode('utf-8'))
-            speed = joystick_data.get("Ax", 0) * PADDLE_SPEED
-            #logger.debug(f"Spieler 2 - Speed: {speed}, Zeit seit letztem Update: {current_time - self.last_update2:.3f}s")
-            self.last_update2 = current_time
-            self.parent.root.after(0, lambda: self.parent.set_paddle_speed(2, speed))
-        except Exception as e:
-            logger.error(f"Fehler bei der Verarbeitung der BLE-Daten für Gerät 2: {e}")
-
-    def stop_all_threads(self):
-        self.stop_event.set()
-        for thread in self.device_threads.values():
-            thread.join()
+    def disconnect_device(self, device_num):
+        self.controllers.remove(device_num)
 
     async def cleanup_connections(self):
-        self.stop_all_threads()
-        if self.client1 and self.client1.is_connected:
-            await self.client1.disconnect()
-        if self.client2 and self.client2.is_connected:
-            await self.client2.disconnect()
-        self.device1_connected = False
-        self.device2_connected = False
+        await self.controllers.shutdown()
 
 class PongGame:
     def __init__(self, root, loop):
@@ -171,8 +125,9 @@ class PongGame:
         self.loop = loop
         self.root.title("Pong Game")
         self.players = 0
-        self.player1_control = "keyboard"
-        self.player2_control = "keyboard"
+        # Steuerung je Spielerplatz: "keyboard" oder "bluetooth"
+        self.controls = {1: "keyboard", 2: "keyboard"}
+        self.ai = None  # Computergegner im 1-Spieler-Modus
         
         self.main_frame = tk.Frame(root)
         self.main_frame.pack(fill=tk.BOTH, expand=True)
@@ -180,22 +135,28 @@ class PongGame:
         self.status_frame = tk.Frame(self.main_frame, bg="black")
         self.status_frame.pack(fill=tk.X)
         
-        self.status_label1 = tk.Label(self.status_frame, text="Spieler 1: Nicht aktiviert", fg="white", bg="black")
-        self.status_label1.pack(side=tk.LEFT, padx=10, pady=5)
-        
-        self.status_label2 = tk.Label(self.status_frame, text="Spieler 2: Nicht aktiviert", fg="white", bg="black")
-        self.status_label2.pack(side=tk.RIGHT, padx=10, pady=5)
+        self.status_labels = {}
+        for player_num, side in ((1, tk.LEFT), (2, tk.RIGHT)):
+            label = tk.Label(self.status_frame, text=f"Spieler {player_num}: Nicht aktiviert", fg="white", bg="black")
+            label.pack(side=side, padx=10, pady=5)
+            self.status_labels[player_num] = label
         
         self.canvas = tk.Canvas(self.main_frame, width=WIN_WIDTH, height=WIN_HEIGHT, bg="black")
         self.canvas.pack()
+        # Änderungen werden gesammelt und einmal pro Frame gezeichnet
+        self.renderer = TkRenderer(self.canvas)
         
         self.control_frame = tk.Frame(self.main_frame)
         self.control_frame.pack(fill=tk.X, pady=10)
         
+        # Controller-Samples werden gesammelt und einmal pro Spiel-Tick gefiltert,
+        # zwischen zwei Samples wird der Steuerwert extrapoliert
+        self.input_filter = InputFilter(predictor=LinearPredictor)
         self.bt_manager = BluetoothManager(self, self.loop)
         
         self.game_started = False
         self.running = False
+        self.game_loop = GameLoop(self.root, self.update_game, self.sync_canvas)
         
         self.player1_lives = 5
         self.player2_lives = 5
@@ -207,12 +168,20 @@ class PongGame:
         self.lives_label2.pack(side=tk.RIGHT, padx=10, pady=5)
 
         self.show_game_setup()
+        # Verbindungsqualität in der Statuszeile einmal pro Sekunde auffrischen
+        self.root.after(1000, self.refresh_link_status)
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def on_closing(self):
         logger.info("Anwendung wird geschlossen...")
         self.running = False
+        self.game_loop.stop()
+        logger.info(f"Frame-Statistik: {self.game_loop.stats.summary()}")
+        for paddle_num in (1, 2):
+            logger.info(f"Eingaben Spieler {paddle_num}: {self.input_filter.stats(paddle_num)}")
+        for device_num, stats in self.bt_manager.controllers.stats().items():
+            logger.info(f"Verbindung Gerät {device_num}: {stats}")
         asyncio.run_coroutine_threadsafe(self.bt_manager.cleanup_connections(), self.loop)
         self.root.destroy()
 
@@ -236,6 +205,7 @@ class PongGame:
         
         tk.Label(self.setup_frame, text="Spieler 2:").grid(row=2, column=0, padx=5, pady=5)
         self.p2_control = tk.StringVar(value="keyboard")
+        self.control_vars = {1: self.p1_control, 2: self.p2_control}
         self.p2_kb_radio = tk.Radiobutton(self.setup_frame, text="Tastatur", variable=self.p2_control, value="keyboard", 
                        command=lambda: self.handle_control_change(2))
         self.p2_kb_radio.grid(row=2, column=1, padx=5, pady=5)
@@ -248,8 +218,13 @@ class PongGame:
             self.p2_kb_radio.config(state=tk.DISABLED)
             self.p2_bt_radio.config(state=tk.DISABLED)
         
+        tk.Label(self.setup_frame, text="Computer:").grid(row=3, column=0, padx=5, pady=5)
+        self.ai_level = tk.StringVar(value="mittel")
+        self.ai_menu = tk.OptionMenu(self.setup_frame, self.ai_level, *DIFFICULTIES)
+        self.ai_menu.grid(row=3, column=1, columnspan=2, padx=5, pady=5)
+        
         self.start_button = tk.Button(self.setup_frame, text="Spiel starten", command=self.initialize_game)
-        self.start_button.grid(row=3, column=0, columnspan=3, pady=10)
+        self.start_button.grid(row=4, column=0, columnspan=3, pady=10)
         
         self.update_status_labels()
 
@@ -261,143 +236,153 @@ class PongGame:
             self.p2_kb_radio.config(state=tk.DISABLED)
             self.p2_bt_radio.config(state=tk.DISABLED)
             self.p2_control.set("keyboard")
-            self.player2_control = "keyboard"
-            self.status_label2.config(text="Spieler 2: Nicht aktiviert")
-            if self.bt_manager.device2_connected:
+            self.controls[2] = "keyboard"
+            self.ai_menu.config(state=tk.NORMAL)
+            self.status_labels[2].config(text="Spieler 2: Computer")
+            if self.bt_manager.is_device_connected(2):
                 self.disconnect_player_device(2)
         else:
             self.p2_kb_radio.config(state=tk.NORMAL)
             self.p2_bt_radio.config(state=tk.NORMAL)
+            self.ai_menu.config(state=tk.DISABLED)
             self.handle_control_change(2)
 
     def handle_control_change(self, player_num):
-        if player_num == 1:
-            self.player1_control = self.p1_control.get()
-            if self.player1_control == "bluetooth":
-                self.status_label1.config(text=f"Spieler 1: Wird verbunden...")
-                self.connect_player_device(1)
-            else:
-                self.status_label1.config(text="Spieler 1: Tastatur")
-                self.disconnect_player_device(1)
+        label = self.status_labels[player_num]
+        if player_num > self.player_var.get():
+            label.config(text=f"Spieler {player_num}: Computer")
+            return
+        self.controls[player_num] = self.control_vars[player_num].get()
+        if self.controls[player_num] == "bluetooth":
+            label.config(text=f"Spieler {player_num}: Wird verbunden...")
+            self.connect_player_device(player_num)
         else:
-            if self.player_var.get() == 2:
-                self.player2_control = self.p2_control.get()
-                if self.player2_control == "bluetooth":
-                    self.status_label2.config(text=f"Spieler 2: Wird verbunden...")
-                    self.connect_player_device(2)
-                else:
-                    self.status_label2.config(text="Spieler 2: Tastatur")
-                    self.disconnect_player_device(2)
-            else:
-                self.status_label2.config(text="Spieler 2: Nicht aktiviert")
+            label.config(text=f"Spieler {player_num}: Tastatur")
+            self.disconnect_player_device(player_num)
 
     def connect_player_device(self, player_num):
-        if (player_num == 1 and self.player1_control == "bluetooth") or \
-           (player_num == 2 and self.player2_control == "bluetooth"):
-            self.bt_manager.start_device_thread(BLUETOOTH_DEVICE1 if player_num == 1 else BLUETOOTH_DEVICE2, player_num)
+        if self.controls[player_num] == "bluetooth":
+            self.bt_manager.connect_device(self.bt_manager.addresses[player_num], player_num)
 
     def disconnect_player_device(self, player_num):
-        if (player_num == 1 and self.player1_control == "bluetooth") or \
-           (player_num == 2 and self.player2_control == "bluetooth"):
-            asyncio.run_coroutine_threadsafe(
-                self.bt_manager.cleanup_connections(),
-                self.loop
-            )
+        # Nur den Controller dieses Spielers trennen, der andere bleibt verbunden
+        self.bt_manager.disconnect_device(player_num)
 
     def initialize_game(self):
         self.players = self.player_var.get()
-        self.player1_control = self.p1_control.get()
-        self.player2_control = self.p2_control.get() if self.players == 2 else "keyboard"
+        for player_num, var in self.control_vars.items():
+            self.controls[player_num] = var.get() if player_num <= self.players else "keyboard"
         
         self.setup_frame.destroy()
         self.start_game()
-        self.update_game()
+        self.game_loop.start()
 
     def update_status_labels(self):
-        if self.player1_control == "bluetooth":
-            self.status_label1.config(text=f"Spieler 1: {self.bt_manager.device1_status}")
-        else:
-            self.status_label1.config(text="Spieler 1: Tastatur")
-            
-        if self.players == 2:
-            if self.player2_control == "bluetooth":
-                self.status_label2.config(text=f"Spieler 2: {self.bt_manager.device2_status}")
+        for player_num, label in self.status_labels.items():
+            if player_num > max(self.players, 1):
+                label.config(text=f"Spieler {player_num}: Computer ({self.ai_level.get()})")
+            elif self.controls[player_num] == "bluetooth":
+                text = f"Spieler {player_num}: {self.bt_manager.device_status(player_num)}"
+                link = self.bt_manager.link_summary(player_num)
+                if link:
+                    # Samples pro Tick, von denen nur das neueste den Schläger bewegt
+                    coalesced = self.input_filter.stats(player_num)["coalesced_avg"]
+                    link += f", {coalesced:.1f} zusammengefasst/Tick"
+                label.config(text=f"{text} ({link})" if link else text)
             else:
-                self.status_label2.config(text="Spieler 2: Tastatur")
-        else:
-            self.status_label2.config(text="Spieler 2: Nicht aktiviert")
+                label.config(text=f"Spieler {player_num}: Tastatur")
+
+    def refresh_link_status(self):
+        if self.bt_manager.controllers.slots():
+            self.update_status_labels()
+        self.root.after(1000, self.refresh_link_status)
 
     def start_game(self):
-        self.paddle1 = Paddle(self.canvas, 20, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2)
-        self.paddle2 = Paddle(self.canvas, WIN_WIDTH - 30, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2) if self.players == 2 else None
-        self.ball = Ball(self.canvas, WIN_WIDTH // 2, WIN_HEIGHT // 2)
+        self.create_entities()
         
         self.running = True
         self.game_started = True
+        self.bt_manager.set_streaming(True)
         
-        if self.player1_control == "keyboard":
-            self.root.bind("<Up>", lambda e: self.set_paddle_speed(1, -PADDLE_SPEED))
-            self.root.bind("<Down>", lambda e: self.set_paddle_speed(1, PADDLE_SPEED))
-            self.root.bind("<KeyRelease-Up>", lambda e: self.set_paddle_speed(1, 0))
-            self.root.bind("<KeyRelease-Down>", lambda e: self.set_paddle_speed(1, 0))
-            
-        if self.players == 2 and self.player2_control == "keyboard":
-            self.root.bind("<w>", lambda e: self.set_paddle_speed(2, -PADDLE_SPEED))
-            self.root.bind("<s>", lambda e: self.set_paddle_speed(2, PADDLE_SPEED))
-            self.root.bind("<KeyRelease-w>", lambda e: self.set_paddle_speed(2, 0))
-            self.root.bind("<KeyRelease-s>", lambda e: self.set_paddle_speed(2, 0))
+        for player_num, (up, down) in KEY_BINDINGS.items():
+            if player_num > self.players or self.controls[player_num] != "keyboard":
+                continue
+            self.root.bind(f"<{up}>", lambda e, n=player_num: self.set_paddle_speed(n, -PADDLE_SPEED))
+            self.root.bind(f"<{down}>", lambda e, n=player_num: self.set_paddle_speed(n, PADDLE_SPEED))
+            self.root.bind(f"<KeyRelease-{up}>", lambda e, n=player_num: self.set_paddle_speed(n, 0))
+            self.root.bind(f"<KeyRelease-{down}>", lambda e, n=player_num: self.set_paddle_speed(n, 0))
         
         self.reset_button = tk.Button(self.control_frame, text="Neu starten", command=self.reset_game)
         self.reset_button.pack(side=tk.LEFT, padx=10)
 
     def reset_game(self):
         self.running = False
-        self.canvas.delete("all")
+        self.renderer.release_all()  # Figuren werden von create_entities() wiederverwendet
         if hasattr(self, 'reset_button'):
             self.reset_button.destroy()
         self.player1_lives = 5
         self.player2_lives = 5
         self.update_lives_labels()
         
-        self.paddle1 = Paddle(self.canvas, 20, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2)
-        self.paddle2 = Paddle(self.canvas, WIN_WIDTH - 30, WIN_HEIGHT // 2 - PADDLE_HEIGHT // 2) if self.players == 2 else None
-        self.ball = Ball(self.canvas, WIN_WIDTH // 2, WIN_HEIGHT // 2)
+        self.create_entities()
         
         self.running = True
         self.game_started = True
+        self.bt_manager.set_streaming(True)
+
+    def create_entities(self):
+        # Im 1-Spieler-Modus spielt der Computer den rechten Schläger
+        self.physics = PongPhysics(WIN_WIDTH, WIN_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, BALL_SPEED)
+        self.paddle1 = Paddle(self.renderer, self.physics.paddle1)
+        self.paddle2 = Paddle(self.renderer, self.physics.paddle2)
+        self.paddles = {1: self.paddle1, 2: self.paddle2}
+        self.ball = Ball(self.renderer, self.physics.ball)
+        self.ai = None
+        if self.players == 1:
+            self.ai = PongAI(self.physics.ball, self.physics.paddle2, WIN_WIDTH, WIN_HEIGHT,
+                             **DIFFICULTIES[self.ai_level.get()])
+        self.renderer.flush()
+
+    def sync_canvas(self):
+        # Canvas nur einmal pro Frame an den Physik-Zustand anpassen
+        for paddle in self.paddles.values():
+            paddle.sync()
+        self.ball.sync()
+        self.renderer.flush()
 
     def update_lives_labels(self):
         self.lives_label1.config(text=f"Leben Spieler 1: {self.player1_lives}")
-        self.lives_label2.config(text=f"Leben Spieler 2: {self.player2_lives}")
+        name = "Computer" if self.players == 1 else "Spieler 2"
+        self.lives_label2.config(text=f"Leben {name}: {self.player2_lives}")
 
     def set_paddle_speed(self, paddle_num, speed):
-        if paddle_num == 1:
-            self.paddle1.set_speed(speed)
-            #logger.debug(f"Set paddle 1 speed to {speed}")
-        elif paddle_num == 2 and self.paddle2:
-            self.paddle2.set_speed(speed)
-            #logger.debug(f"Set paddle 2 speed to {speed}")
+        paddle = self.paddles.get(paddle_num)
+        if paddle:
+            paddle.set_speed(speed)
+            #logger.debug(f"Set paddle {paddle_num} speed to {speed}")
 
     def update_game(self):
+        # Ein Physik-Schritt, wird von GameLoop mit festem Takt aufgerufen
         if self.running:
-            self.paddle1.move()
-            if self.paddle2:
-                self.paddle2.move()
+            self.apply_bluetooth_input()
+            if self.ai:
+                self.set_paddle_speed(2, self.ai.update())
             self.move_ball()
-            self.root.after(20, self.update_game)
+        if not self.running:  # Spiel beendet, Fenster evtl. schon geschlossen
+            self.game_loop.stop()
 
-    def move_ball(self):
-        self.ball.move()
-        pos = self.ball.get_coords()
+    def apply_bluetooth_input(self):
+        for paddle_num in self.bt_manager.controllers.slots():
+            # None: seit `stale_after` nichts gekommen, Schläger anhalten statt weiterrutschen
+            value = self.input_filter.value(paddle_num)
+            self.set_paddle_speed(paddle_num, 0 if value is None else value * PADDLE_SPEED)
 
-        if pos[1] <= 0 or pos[3] >= WIN_HEIGHT:
-            self.ball.dy = -self.ball.dy
-        if pos[0] <= 0:
+    def move_ball(self):
+        result = self.physics.step()
+        if result == PongPhysics.MISS_LEFT:
             self.player1_loses_life()
-        elif pos[2] >= WIN_WIDTH:
+        elif result == PongPhysics.MISS_RIGHT:
             self.player2_loses_life()
-        if self.check_collision(self.paddle1, pos) or (self.paddle2 and self.check_collision(self.paddle2, pos)):
-            self.ball.dx = -self.ball.dx
 
     def player1_loses_life(self):
         self.player1_lives -= 1
@@ -405,7 +390,7 @@ class PongGame:
         if self.player1_lives == 0:
             self.end_game(winner=2)
         else:
-            self.ball.reset()
+            self.physics.reset_ball()
 
     def player2_loses_life(self):
         self.player2_lives -= 1
@@ -413,26 +398,26 @@ class PongGame:
         if self.player2_lives == 0:
             self.end_game(winner=1)
         else:
-            self.ball.reset()
+            self.physics.reset_ball()
 
     def end_game(self, winner):
         self.running = False
-        message = f"Spieler {winner} gewinnt! Möchtest du nochmal spielen?"
+        self.bt_manager.set_streaming(False)  # während der Rückfrage nicht funken
+        name = "Der Computer" if winner == 2 and self.players == 1 else f"Spieler {winner}"
+        message = f"{name} gewinnt! Möchtest du nochmal spielen?"
         if messagebox.askyesno("Spiel beendet", message):
             self.reset_game()
         else:
             self.root.destroy()
 
-    def check_collision(self, paddle, ball_pos):
-        paddle_pos = paddle.get_coords()
-        return (paddle_pos[0] < ball_pos[2] and paddle_pos[2] > ball_pos[0] and
-                paddle_pos[1] < ball_pos[3] and paddle_pos[3] > ball_pos[1])
-
 def run_event_loop(loop):
     asyncio.set_event_loop(loop)
     loop.run_forever()
 
 def main():
+    # Logging konfigurieren (erst hier, damit ein Import nichts umstellt)
+    logging.basicConfig(level=logging.DEBUG)
+    install_from_env()
     loop = asyncio.new_event_loop()
     event_loop_thread = threading.Thread(target=run_event_loop, args=(loop,), daemon=True)
     event_loop_thread.start()
@@ -0,0 +1,20 @@
+"""Spielfeld, Blöcke und Geschwindigkeiten von Arkanoid_Bluetooth2.py.
+
+Eigenes Modul, damit headless Programme (match_sim.py) dieselben Maße
+verwenden, ohne das Spiel samt tkinter und bleak zu importieren.
+"""
+
+SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
+CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+
+# Spielfeldgrößen
+WIN_WIDTH = 1000
+WIN_HEIGHT = 600
+PADDLE_WIDTH = 100
+PADDLE_HEIGHT = 10
+BALL_SIZE = 20
+BALL_SPEED = 5
+PLAYER_SPEED = 3
+BLOCK_WIDTH = 100
+BLOCK_HEIGHT = 30
+LIVES = 5
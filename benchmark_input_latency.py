@@ -0,0 +1,205 @@
+"""Misst die Eingabelatenz vom Senden einer Notification bis zum gezeichneten Schläger.
+
+Statt eines ESP32 liefert fake_ble.FakeBleakClient die Frames. Durchlaufen
+wird der echte Eingabepfad der Spiele: Notification-Handler, Reassembler,
+Queue bzw. Filterstufe, Spiel-Tick und Zeichnen. Jeder simulierte Frame trägt
+einen eindeutigen Ax-Wert; sobald die daraus berechnete Geschwindigkeit
+beim Zeichnen am Schläger ankommt, wird die Zeit seit dem Senden erfasst.
+Frames, deren Wert nie gezeichnet wurde (z.B. weil ein neuerer Frame ihn
+im selben Tick überholt hat), zählen als nicht angezeigt. Damit die Werte
+wiedererkennbar bleiben, läuft die Filterstufe dabei ungefiltert
+(imu_filter.raw_pipeline).
+
+Braucht ein Display (oder xvfb-run), aber keine Bluetooth-Hardware:
+
+    python benchmark_input_latency.py --game pong --rate 10 50 100
+    python benchmark_input_latency.py --rate 100 200 --mtu 247   # gebündelte Frames
+"""
+
+import argparse
+import asyncio
+import functools
+import threading
+import time
+import tkinter as tk
+
+from ble_hub import BleHub
+from fake_ble import FakeBleakClient
+from imu_filter import InputFilter, raw_pipeline
+
+HISTOGRAM_BUCKETS_MS = (5, 10, 20, 50, 100, 200)
+
+
+class LatencyProbe:
+    """Prüft nach jedem gezeichneten Frame, ob ein neuer Eingabewert sichtbar ist."""
+
+    def __init__(self, log, read_speed, speed_factor):
+        self.log = log
+        self.read_speed = read_speed
+        self.speed_factor = speed_factor
+        self.latencies = []
+        self.shown = set()
+        self._last_speed = None
+
+    def wrap(self, render):
+        def probed_render():
+            render()
+            self.check()
+        return probed_render
+
+    def check(self):
+        speed = self.read_speed()
+        if speed == self._last_speed:
+            return
+        self._last_speed = speed
+        now = time.monotonic()
+        ax = round(speed / self.speed_factor, 2)
+        for seq, sent, sample in reversed(self.log[-100:]):
+            if round(sample["Ax"], 2) == ax:
+                if seq not in self.shown:
+                    self.shown.add(seq)
+                    self.latencies.append(now - sent)
+                return
+
+
+def histogram(latencies):
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for latency in latencies:
+        ms = latency * 1000
+        for i, limit in enumerate(HISTOGRAM_BUCKETS_MS):
+            if ms < limit:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"< {limit} ms" for limit in HISTOGRAM_BUCKETS_MS] + [f">= {HISTOGRAM_BUCKETS_MS[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+def summarize(name, probe, log, lost, extra=None):
+    latencies = sorted(probe.latencies)
+
+    def pct(fraction):
+        return 1000 * latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0.0
+
+    result = {
+        "scenario": name,
+        "sent": len(log),
+        "lost_on_air": len(lost),
+        "shown": len(probe.shown),
+        "not_shown": len(log) - len(probe.shown),
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+        "histogram": histogram(latencies),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def print_result(result):
+    print(f"== {result['scenario']}")
+    print(f"   gesendet {result['sent']}, auf Funkstrecke verloren {result['lost_on_air']}, "
+          f"angezeigt {result['shown']}, nicht angezeigt {result['not_shown']}")
+    print(f"   Latenz p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+          f"p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+    total = max(1, sum(count for _, count in result["histogram"]))
+    for label, count in result["histogram"]:
+        print(f"   {label:>10} {count:6d} {'#' * round(40 * count / total)}")
+    for key, value in result.items():
+        if key not in ("scenario", "sent", "lost_on_air", "shown", "not_shown", "p50_ms", "p95_ms",
+                       "p99_ms", "max_ms", "histogram"):
+            print(f"   {key}: {value}")
+    print()
+
+
+def use_fake_clients(log, lost, **options):
+    BleHub.client_factory = functools.partial(FakeBleakClient, log=log, lost=lost, **options)
+
+
+def run_pong(duration, **options):
+    import Pong_Bluetooth3
+
+    Pong_Bluetooth3.PLAY_INTERVAL = None  # Messrate bestimmt --rate, nicht das Spiel
+    log, lost = [], []
+    use_fake_clients(log, lost, **options)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=Pong_Bluetooth3.run_event_loop, args=(loop,), daemon=True).start()
+
+    root = tk.Tk()
+    game = Pong_Bluetooth3.PongGame(root, loop)
+    game.input_filter = InputFilter(raw_pipeline)
+    game.player_var.set(1)
+    game.p1_control.set("bluetooth")
+    game.handle_control_change(1)
+    game.initialize_game()
+    # Der Ball soll während der Messung kein Spielende auslösen
+    game.player1_lives = game.player2_lives = 10 ** 9
+
+    probe = LatencyProbe(log, lambda: game.paddle1.body.vy, Pong_Bluetooth3.PADDLE_SPEED)
+    game.game_loop.render = probe.wrap(game.game_loop.render)
+    root.after(int(duration * 1000), root.quit)
+    root.mainloop()
+
+    game.game_loop.stop()
+    asyncio.run_coroutine_threadsafe(game.bt_manager.cleanup_connections(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    extra = {"filter": game.input_filter.stats(1), "frames": game.game_loop.stats.summary()}
+    root.destroy()
+    return probe, log, lost, extra
+
+
+def run_arkanoid(duration, **options):
+    import Arkanoid_Bluetooth2
+
+    log, lost = [], []
+    use_fake_clients(log, lost, **options)
+
+    root = tk.Tk()
+    game = Arkanoid_Bluetooth2.ArkanoidGame(root)
+    game.input_filter = InputFilter(raw_pipeline)
+    game.start_game()
+    # Kein Spielende während der Messung
+    game.lives = 10 ** 9
+    game.check_win = lambda: None
+
+    probe = LatencyProbe(log, lambda: game.paddle.body.vx, Arkanoid_Bluetooth2.PLAYER_SPEED)
+    game.game_loop.render = probe.wrap(game.game_loop.render)
+    root.after(int(duration * 1000), root.quit)
+    root.mainloop()
+
+    game.game_loop.stop()
+    game.ble_hub.stop()
+    extra = {"queue": game.ble_queue.stats(), "filter": game.input_filter.stats(1), "frames": game.game_loop.stats.summary()}
+    root.destroy()
+    return probe, log, lost, extra
+
+
+GAMES = {"pong": run_pong, "arkanoid": run_arkanoid}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game", choices=sorted(GAMES) + ["all"], default="all")
+    parser.add_argument("--rate", type=float, nargs="+", default=[10.0, 50.0, 100.0], help="Senderate in Hz")
+    parser.add_argument("--jitter", type=float, default=0.005, help="zufällige Sendeverzögerung in Sekunden")
+    parser.add_argument("--loss", type=float, default=0.0, help="Anteil verlorener Notifications")
+    parser.add_argument("--payload", choices=["binary", "json"], default="binary")
+    parser.add_argument("--size", type=int, default=None, help="Größe der JSON-Frames in Byte")
+    parser.add_argument("--duration", type=float, default=5.0, help="Messdauer pro Szenario in Sekunden")
+    parser.add_argument("--mtu", type=int, default=23, help="ausgehandelte MTU; ab 45 bündelt der Controller")
+    args = parser.parse_args()
+
+    games = sorted(GAMES) if args.game == "all" else [args.game]
+    for game in games:
+        for rate in args.rate:
+            probe, log, lost, extra = GAMES[game](args.duration, rate_hz=rate, jitter=args.jitter,
+                                                  loss=args.loss, payload=args.payload, size=args.size, mtu=args.mtu,
+                                                  seed=1)
+            print_result(summarize(f"{game}, {rate:g} Hz, {args.payload}", probe, log, lost, extra))
+
+
+if __name__ == "__main__":
+    main()
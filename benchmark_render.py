@@ -0,0 +1,88 @@
+"""Misst die Zeichenkosten von Arkanoid ohne Display.
+
+Das Spiel läuft mit der echten Physik und den Spielobjekten aus
+Arkanoid_Bluetooth2, gezeichnet wird aber mit dem FramebufferRenderer in
+ein NumPy-Array. Der Schläger folgt dem Ball, damit laufend Blöcke
+abgeräumt werden. Am Ende wird eine Prüfsumme des Bildes ausgegeben; bei
+gleichem Seed muss sie gleich bleiben (Screenshot-Vergleich).
+
+    python benchmark_render.py --rows 20 --block-width 50 --block-height 15
+    python benchmark_render.py --full-redraw      # zum Vergleich: jedes Frame alles zeichnen
+"""
+
+import argparse
+import hashlib
+import random
+import time
+
+from physics import ArkanoidPhysics
+from renderer import FramebufferRenderer, RECTANGLE
+import Arkanoid_Bluetooth2 as arkanoid
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(frames=2000, rows=20, block_width=50, block_height=15, seed=1, full_redraw=False, screenshot=None):
+    rng = random.Random(seed)
+    renderer = FramebufferRenderer(arkanoid.WIN_WIDTH, arkanoid.WIN_HEIGHT, bg=arkanoid.BG_COLOR)
+    if full_redraw:
+        renderer.FULL_REDRAW_REGIONS = -1
+    physics = ArkanoidPhysics(arkanoid.WIN_WIDTH, arkanoid.WIN_HEIGHT, arkanoid.PADDLE_WIDTH, arkanoid.PADDLE_HEIGHT,
+                              arkanoid.BALL_SIZE, arkanoid.BALL_SPEED, block_width, block_height, block_rows=rows)
+    paddle = arkanoid.Paddle(renderer, physics.paddle)
+    ball = arkanoid.Ball(renderer, physics.ball)
+    blocks = {body: renderer.create(RECTANGLE, body.bbox(), rng.choice(arkanoid.BLOCK_COLORS))
+              for body in physics.blocks}
+    renderer.flush()
+    print(f"{len(blocks)} Blöcke, {frames} Frames")
+
+    step_times = []
+    render_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        # Schläger folgt dem Ball
+        offset = physics.ball.x + physics.ball.width / 2 - (physics.paddle.x + physics.paddle.width / 2)
+        physics.paddle.vx = max(-arkanoid.BALL_SPEED * 2, min(arkanoid.BALL_SPEED * 2, offset))
+        for block in physics.step():
+            renderer.release(blocks.pop(block))
+        if physics.ball_lost():
+            physics.reset_ball()
+        middle = time.perf_counter()
+        paddle.sync()
+        ball.sync()
+        renderer.flush()
+        end = time.perf_counter()
+        step_times.append(middle - start)
+        render_times.append(end - middle)
+        if not blocks:
+            break
+
+    render_sorted = sorted(render_times)
+    step_sorted = sorted(step_times)
+    print(f"Zeichnen: p50 {1000 * percentile(render_sorted, 0.5):.3f} ms, "
+          f"p95 {1000 * percentile(render_sorted, 0.95):.3f} ms, max {1000 * render_sorted[-1]:.3f} ms")
+    print(f"Physik:   p50 {1000 * percentile(step_sorted, 0.5):.3f} ms, "
+          f"p95 {1000 * percentile(step_sorted, 0.95):.3f} ms")
+    print(f"Renderer: {renderer.stats()}")
+    print(f"Übrige Blöcke: {len(blocks)}, Prüfsumme: {hashlib.sha1(renderer.pixels.tobytes()).hexdigest()}")
+    if screenshot:
+        renderer.save_ppm(screenshot)
+        print(f"Bild gespeichert: {screenshot}")
+    return renderer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--block-width", type=int, default=50)
+    parser.add_argument("--block-height", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--full-redraw", action="store_true", help="jedes Frame das ganze Bild neu zeichnen")
+    parser.add_argument("--screenshot", help="letztes Bild als PPM speichern")
+    args = parser.parse_args()
+    run(args.frames, args.rows, args.block_width, args.block_height, args.seed, args.full_redraw, args.screenshot)
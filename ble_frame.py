@@ -0,0 +1,329 @@
+"""Dekodierung der Sensor-Frames, die der Controller per BLE-Notification sendet.
+
+Der Controller sendet entweder das alte JSON-Format (ein Objekt mit
+"Ax", "Ay", "Az", "T", "Gx", "Gy", "Gz" und "player", abgeschlossen mit
+"\\n") oder ein kompaktes Binärformat mit fester Länge. Das Binärformat
+beginnt immer mit FRAME_MAGIC; ein JSON-Frame beginnt mit "{". Daran wird
+das Format automatisch erkannt, ältere Firmware funktioniert also weiter.
+
+Binärformat Version 1 (Little Endian, 17 Byte, passt in eine Notification
+mit Standard-MTU von 23 Byte):
+
+    uint8   magic    (FRAME_MAGIC)
+    uint8   version  (1)
+    uint8   player
+    int16   Ax, Ay, Az   in 1/100 m/s²
+    int16   T            in 1/100 °C
+    int16   Gx, Gy, Gz   in 1/500 rad/s
+
+Binärformat Version 2 (20 Byte, füllt eine Notification mit Standard-MTU
+genau aus) ist Version 1 mit zwei zusätzlichen Feldern nach `player`:
+
+    uint8   seq      Frame-Zähler, läuft nach 255 über
+    uint16  ms       millis() des Controllers beim Messen, modulo 65536
+
+Daran erkennt der Host verlorene und vertauschte Notifications und kann
+Laufzeitschwankungen von Sendeschwankungen trennen (siehe link_stats.py).
+Die JSON-Frames enthalten dieselben Felder als "seq" und "ms".
+
+Binärformat Version 3 bündelt mehrere Messungen in einer Notification,
+so viele, wie in die ausgehandelte MTU passen (`batch_capacity()`):
+
+    uint8   magic, version (3), player
+    uint8   count    Anzahl Messungen
+    uint8   seq      Zähler der ersten Messung, die weiteren zählen hoch
+    count x
+        uint16  ms             Messzeitpunkt wie in Version 2
+        int16   Ax .. Gz       wie in Version 1
+
+Binärformat Version 4 ist Version 3 mit nur einem Teil der Sensorwerte
+(Befehl COMMAND_FIELDS, siehe unten). Nach `seq` folgt
+
+    uint8   fields   Bitmaske, Bit i steht für SENSOR_FIELDS[i]
+
+und jede Messung enthält nach `ms` nur die gesetzten Werte in der
+Reihenfolge von SENSOR_FIELDS. Fehlende Werte fehlen auch im Dict.
+
+`decode_samples()` liefert die Messungen aller Versionen als Liste in
+Messreihenfolge, `sample_ages()` wie lange jede vor der letzten gemessen wurde.
+
+Befehle schreibt der Host auf dieselbe Charakteristik (`encode_command()`),
+mehrere Befehle dürfen in einem Schreibvorgang aneinanderhängen:
+
+    uint8   magic    (FRAME_MAGIC)
+    uint8   befehl
+    ...     Argument, je nach Befehl
+
+    COMMAND_INTERVAL  uint16 ms   Abstand der Messungen, 0 = Standard der Firmware
+    COMMAND_PAUSE     -           keine Messungen und Notifications mehr
+    COMMAND_RESUME    -           wieder senden
+    COMMAND_FIELDS    uint8 Maske nur diese Sensorwerte senden (Version 4)
+
+Die Firmware setzt alle Einstellungen beim Trennen zurück; ältere Firmware
+ignoriert die Befehle und sendet wie bisher.
+"""
+
+import json
+import struct
+
+FRAME_MAGIC = 0xA5
+FRAME_VERSION_1 = 1
+FRAME_VERSION_2 = 2
+FRAME_VERSION_3 = 3
+FRAME_VERSION_4 = 4
+
+ACCEL_SCALE = 100.0
+TEMP_SCALE = 100.0
+GYRO_SCALE = 500.0
+
+SENSOR_FIELDS = ("Ax", "Ay", "Az", "T", "Gx", "Gy", "Gz")
+_SCALES = (ACCEL_SCALE, ACCEL_SCALE, ACCEL_SCALE, TEMP_SCALE, GYRO_SCALE, GYRO_SCALE, GYRO_SCALE)
+ALL_FIELDS = (1 << len(SENSOR_FIELDS)) - 1
+
+COMMAND_INTERVAL = 0x01
+COMMAND_PAUSE = 0x02
+COMMAND_RESUME = 0x03
+COMMAND_FIELDS = 0x04
+MAX_INTERVAL_MS = 65535
+
+_FRAME_V1 = struct.Struct("<BBB7h")
+FRAME_V1_SIZE = _FRAME_V1.size
+_FRAME_V2 = struct.Struct("<BBBBH7h")
+FRAME_V2_SIZE = _FRAME_V2.size
+_BATCH_HEADER = struct.Struct("<BBBBB")
+_BATCH_SAMPLE = struct.Struct("<H7h")
+_FIELDS_HEADER = struct.Struct("<BBBBBB")
+_COMMAND = struct.Struct("<BB")
+BATCH_SAMPLE_SIZE = _BATCH_SAMPLE.size
+ATT_HEADER_SIZE = 3  # eine Notification trägt höchstens MTU - 3 Byte
+DEFAULT_MTU = 23     # ohne Aushandlung
+
+
+class FrameError(ValueError):
+    """Ein empfangener Frame konnte nicht dekodiert werden."""
+
+
+def is_binary_frame(data):
+    return len(data) > 0 and data[0] == FRAME_MAGIC
+
+
+def decode_binary_frame(data, offset=0):
+    """Dekodiert einen Binär-Frame ab `offset` in ein Dict wie beim JSON-Format."""
+    if len(data) - offset < FRAME_V1_SIZE:
+        raise FrameError(f"Binär-Frame zu kurz: {len(data) - offset} Byte")
+    magic, version = data[offset], data[offset + 1]
+    if magic != FRAME_MAGIC:
+        raise FrameError(f"Ungültiges Magic-Byte: {magic:#04x}")
+    if version in (FRAME_VERSION_3, FRAME_VERSION_4):
+        raise FrameError("Frame mit mehreren Messungen, decode_samples() verwenden")
+    if version == FRAME_VERSION_1:
+        _magic, _version, player, ax, ay, az, t, gx, gy, gz = _FRAME_V1.unpack_from(data, offset)
+        extra = {}
+    elif version == FRAME_VERSION_2:
+        if len(data) - offset < FRAME_V2_SIZE:
+            raise FrameError(f"Binär-Frame zu kurz: {len(data) - offset} Byte")
+        _magic, _version, player, seq, ms, ax, ay, az, t, gx, gy, gz = _FRAME_V2.unpack_from(data, offset)
+        extra = {"seq": seq, "ms": ms}
+    else:
+        raise FrameError(f"Unbekannte Frame-Version: {version}")
+    return _sample(player, ax, ay, az, t, gx, gy, gz, **extra)
+
+
+def _sample(player, ax, ay, az, t, gx, gy, gz, **extra):
+    return {
+        "Ax": ax / ACCEL_SCALE,
+        "Ay": ay / ACCEL_SCALE,
+        "Az": az / ACCEL_SCALE,
+        "T": t / TEMP_SCALE,
+        "Gx": gx / GYRO_SCALE,
+        "Gy": gy / GYRO_SCALE,
+        "Gz": gz / GYRO_SCALE,
+        "player": player,
+        **extra,
+    }
+
+
+def _fixed(sample):
+    def clamp(value):
+        return max(-32768, min(32767, int(round(value))))
+
+    return (clamp(sample.get("Ax", 0) * ACCEL_SCALE),
+            clamp(sample.get("Ay", 0) * ACCEL_SCALE),
+            clamp(sample.get("Az", 0) * ACCEL_SCALE),
+            clamp(sample.get("T", 0) * TEMP_SCALE),
+            clamp(sample.get("Gx", 0) * GYRO_SCALE),
+            clamp(sample.get("Gy", 0) * GYRO_SCALE),
+            clamp(sample.get("Gz", 0) * GYRO_SCALE))
+
+
+def field_mask(fields):
+    """Bitmaske zu Feldnamen aus SENSOR_FIELDS; eine Zahl wird unverändert übernommen."""
+    if isinstance(fields, int):
+        mask = fields
+    else:
+        unknown = set(fields) - set(SENSOR_FIELDS)
+        if unknown:
+            raise ValueError(f"Unbekannte Sensorwerte: {sorted(unknown)}")
+        mask = sum(1 << i for i, name in enumerate(SENSOR_FIELDS) if name in fields)
+    if not 0 < mask <= ALL_FIELDS:
+        raise ValueError(f"Ungültige Feldmaske: {mask:#x}")
+    return mask
+
+
+def mask_fields(mask):
+    return tuple(name for i, name in enumerate(SENSOR_FIELDS) if mask & (1 << i))
+
+
+def batch_capacity(mtu, fields=ALL_FIELDS):
+    """Wie viele Messungen ein Frame der Version 3 (oder 4 mit `fields`) bei dieser MTU aufnehmen kann."""
+    mask = field_mask(fields)
+    if mask == ALL_FIELDS:
+        return max(0, (mtu - ATT_HEADER_SIZE - _BATCH_HEADER.size) // BATCH_SAMPLE_SIZE)
+    sample_size = 2 + 2 * len(mask_fields(mask))
+    return max(0, (mtu - ATT_HEADER_SIZE - _FIELDS_HEADER.size) // sample_size)
+
+
+def decode_batch_frame(data, offset=0):
+    """Dekodiert einen Frame der Version 3 oder 4 in eine Liste von Dicts, älteste Messung zuerst."""
+    if len(data) - offset < _BATCH_HEADER.size:
+        raise FrameError(f"Batch-Frame zu kurz: {len(data) - offset} Byte")
+    magic, version, player, count, seq = _BATCH_HEADER.unpack_from(data, offset)
+    if magic != FRAME_MAGIC or version not in (FRAME_VERSION_3, FRAME_VERSION_4):
+        raise FrameError(f"Kein Batch-Frame: Magic {magic:#04x}, Version {version}")
+    if version == FRAME_VERSION_4:
+        return _decode_fields_frame(data, offset)
+    offset += _BATCH_HEADER.size
+    if len(data) - offset < count * BATCH_SAMPLE_SIZE:
+        raise FrameError(f"Batch-Frame mit {count} Messungen hat nur {len(data) - offset} Byte Nutzdaten")
+    samples = []
+    for i, (ms, *values) in enumerate(_BATCH_SAMPLE.iter_unpack(
+            data[offset:offset + count * BATCH_SAMPLE_SIZE])):
+        samples.append(_sample(player, *values, seq=(seq + i) % 256, ms=ms))
+    return samples
+
+
+def _decode_fields_frame(data, offset):
+    if len(data) - offset < _FIELDS_HEADER.size:
+        raise FrameError(f"Batch-Frame zu kurz: {len(data) - offset} Byte")
+    _magic, _version, player, count, seq, mask = _FIELDS_HEADER.unpack_from(data, offset)
+    if not 0 < mask <= ALL_FIELDS:
+        raise FrameError(f"Ungültige Feldmaske: {mask:#x}")
+    indices = [i for i in range(len(SENSOR_FIELDS)) if mask & (1 << i)]
+    layout = struct.Struct(f"<H{len(indices)}h")
+    offset += _FIELDS_HEADER.size
+    if len(data) - offset < count * layout.size:
+        raise FrameError(f"Batch-Frame mit {count} Messungen hat nur {len(data) - offset} Byte Nutzdaten")
+    samples = []
+    for i, (ms, *values) in enumerate(layout.iter_unpack(data[offset:offset + count * layout.size])):
+        sample = {SENSOR_FIELDS[index]: value / _SCALES[index] for index, value in zip(indices, values)}
+        sample.update(player=player, seq=(seq + i) % 256, ms=ms)
+        samples.append(sample)
+    return samples
+
+
+def encode_batch_frame(samples, player=1, seq=0, times=None, fields=ALL_FIELDS):
+    """Gegenstück zur Firmware: `samples` mit ihren Messzeiten `times` (ms) als ein Frame.
+
+    Ohne `fields` entsteht ein Frame der Version 3, sonst der Version 4 mit
+    nur diesen Sensorwerten.
+    """
+    if times is None:
+        times = [sample.get("ms", 0) for sample in samples]
+    mask = field_mask(fields)
+    if mask == ALL_FIELDS:
+        parts = [_BATCH_HEADER.pack(FRAME_MAGIC, FRAME_VERSION_3, player, len(samples), seq % 256)]
+        for sample, ms in zip(samples, times):
+            parts.append(_BATCH_SAMPLE.pack(int(ms) % 65536, *_fixed(sample)))
+        return b"".join(parts)
+    indices = [i for i in range(len(SENSOR_FIELDS)) if mask & (1 << i)]
+    layout = struct.Struct(f"<H{len(indices)}h")
+    parts = [_FIELDS_HEADER.pack(FRAME_MAGIC, FRAME_VERSION_4, player, len(samples), seq % 256, mask)]
+    for sample, ms in zip(samples, times):
+        values = _fixed(sample)
+        parts.append(layout.pack(int(ms) % 65536, *(values[i] for i in indices)))
+    return b"".join(parts)
+
+
+def encode_binary_frame(sample, player=1, seq=None, ms=None):
+    """Gegenstück zur Firmware, z.B. für Tests oder einen simulierten Controller.
+
+    Mit `seq` wird ein Frame der Version 2 erzeugt (`ms` ist dann die Sendezeit
+    in Millisekunden), sonst Version 1.
+    """
+    if seq is None:
+        return _FRAME_V1.pack(FRAME_MAGIC, FRAME_VERSION_1, player, *_fixed(sample))
+    return _FRAME_V2.pack(FRAME_MAGIC, FRAME_VERSION_2, player, seq % 256, int(ms or 0) % 65536, *_fixed(sample))
+
+
+def decode_frame(data):
+    """Dekodiert einen Frame in beiden Formaten (Binär oder JSON als bytes/str)."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if is_binary_frame(data):
+        return decode_binary_frame(data)
+    try:
+        return json.loads(bytes(data).rstrip(b"\x00"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise FrameError(f"Ungültiger JSON-Frame: {e}") from e
+
+
+def decode_samples(data):
+    """Wie decode_frame(), gibt aber immer eine Liste zurück - bei Version 3 mehrere Messungen."""
+    if (not isinstance(data, str) and len(data) > 1 and data[0] == FRAME_MAGIC
+            and data[1] in (FRAME_VERSION_3, FRAME_VERSION_4)):
+        return decode_batch_frame(data)
+    return [decode_frame(data)]
+
+
+def sample_ages(samples):
+    """Sekunden, die jede Messung vor der letzten der Liste gemessen wurde (0 ohne "ms").
+
+    Damit bekommen gebündelte Messungen, die gemeinsam ankommen, trotzdem
+    ihre eigenen Zeitstempel: Ankunftszeit minus Alter.
+    """
+    last = samples[-1].get("ms") if samples else None
+    if last is None:
+        return [0.0] * len(samples)
+    return [((last - sample.get("ms", last)) % 65536) / 1000.0 for sample in samples]
+
+
+def encode_command(command, value=None):
+    """Befehl an den Controller, siehe Modulbeschreibung.
+
+    `value` ist bei COMMAND_INTERVAL der Messabstand in Sekunden (None = Standard
+    der Firmware), bei COMMAND_FIELDS Feldnamen oder eine Bitmaske.
+    """
+    header = _COMMAND.pack(FRAME_MAGIC, command)
+    if command == COMMAND_INTERVAL:
+        ms = 0 if value is None else round(1000 * value)
+        if not 0 <= ms <= MAX_INTERVAL_MS:
+            raise ValueError(f"Messabstand außerhalb 0..{MAX_INTERVAL_MS} ms: {ms}")
+        return header + struct.pack("<H", ms)
+    if command == COMMAND_FIELDS:
+        return header + bytes([field_mask(ALL_FIELDS if value is None else value)])
+    if command in (COMMAND_PAUSE, COMMAND_RESUME):
+        return header
+    raise ValueError(f"Unbekannter Befehl: {command}")
+
+
+def decode_commands(data):
+    """Gegenstück zu encode_command(): Liste von (Befehl, Argument), mehrere Befehle dürfen aneinanderhängen."""
+    commands = []
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < _COMMAND.size or data[offset] != FRAME_MAGIC:
+            raise FrameError(f"Kein Befehl ab Byte {offset}: {bytes(data).hex()}")
+        command = data[offset + 1]
+        if command == COMMAND_INTERVAL and len(data) - offset >= 4:
+            ms = struct.unpack_from("<H", data, offset + 2)[0]
+            commands.append((command, ms / 1000.0 if ms else None))
+            offset += 4
+        elif command == COMMAND_FIELDS and len(data) - offset >= 3:
+            commands.append((command, field_mask(data[offset + 2])))
+            offset += 3
+        elif command in (COMMAND_PAUSE, COMMAND_RESUME):
+            commands.append((command, None))
+            offset += 2
+        else:
+            raise FrameError(f"Unbekannter oder unvollständiger Befehl: {bytes(data).hex()}")
+    return commands
@@ -0,0 +1,315 @@
+"""Gemeinsame BLE-Verbindungsverwaltung für beliebig viele Controller.
+
+Alle Controller laufen als Tasks auf einer einzigen asyncio-Schleife in
+einem Hintergrund-Thread. Ein Verbindungsabbruch wird über den
+`disconnected_callback` von Bleak gemeldet, es wird also nicht gepollt.
+Ein weiterer Controller kostet nur eine weitere Coroutine, keinen Thread.
+
+Jeder Controller hat eine eigene Zustandsmaschine
+
+    idle -> connecting -> connected -> backoff -> connecting -> ...
+                      \-> backoff           (Verbindungsfehler)
+    jeder Zustand -> stopped                 (remove_device / shutdown)
+
+Nach einem Verbindungsabbruch wird sofort (nach `retry_delay`) neu
+verbunden, nach fehlgeschlagenen Verbindungsversuchen wächst die Wartezeit
+exponentiell bis `backoff_max`, mit Zufallsanteil, damit mehrere Controller
+nicht im Gleichtakt funken. Verbindungsaufbauten laufen nacheinander, ein
+wackliger Controller blockiert das Funkmodul also höchstens für einen
+Versuch und trennt nie die anderen.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from bleak import BleakClient  # geprüft mit bleak 3.0.2, siehe _request_mtu()
+
+from ble_frame import DEFAULT_MTU
+
+logger = logging.getLogger(__name__)
+
+CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+
+STATUS_CONNECTING = "Wird verbunden..."
+STATUS_CONNECTED = "Verbunden"
+STATUS_FAILED = "Verbindung fehlgeschlagen"
+STATUS_LOST = "Verbindung verloren"
+STATUS_STOPPED = "Nicht verbunden"
+
+STATE_IDLE = "idle"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_BACKOFF = "backoff"
+STATE_STOPPED = "stopped"
+
+
+class _Device:
+    __slots__ = ("key", "address", "on_notify", "on_status", "retry_delay", "task", "client",
+                 "state", "attempts", "failures", "consecutive_failures", "disconnects",
+                 "lost_at", "reconnect_times", "backoff", "mtu", "writes")
+
+    def __init__(self, key, address, on_notify, on_status, retry_delay):
+        self.key = key
+        self.address = address
+        self.on_notify = on_notify
+        self.on_status = on_status
+        self.retry_delay = retry_delay
+        self.task = None
+        self.client = None
+        self.state = STATE_IDLE
+        self.attempts = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.disconnects = 0
+        self.lost_at = None
+        self.reconnect_times = deque(maxlen=50)
+        self.backoff = 0.0
+        self.mtu = None
+        self.writes = 0
+
+    def stats(self):
+        times = self.reconnect_times
+        return {
+            "address": self.address,
+            "state": self.state,
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "disconnects": self.disconnects,
+            "backoff_s": self.backoff,
+            "reconnect_last_s": times[-1] if times else None,
+            "reconnect_avg_s": sum(times) / len(times) if times else None,
+            "mtu": self.mtu,
+            "writes": self.writes,
+        }
+
+
+class BleHub:
+    """Verwaltet die Verbindungen zu mehreren Controllern auf einer asyncio-Schleife.
+
+    Wird keine Schleife übergeben, legt `start()` eine eigene in einem
+    Daemon-Thread an. Alle öffentlichen Methoden außer `shutdown()` dürfen
+    aus jedem Thread aufgerufen werden.
+
+    `client_factory` ersetzt BleakClient, z.B. durch fake_ble.FakeBleakClient
+    für Messungen ohne Funk-Hardware oder sensor_log.ReplayClient. Ist
+    `recorder` gesetzt (sensor_log.SensorRecorder), werden alle
+    Notifications aufgezeichnet, bevor sie an `on_notify` gehen.
+    """
+
+    client_factory = None
+    recorder = None
+
+    def __init__(self, loop=None, characteristic_uuid=CHARACTERISTIC_UUID, connect_timeout=5.0,
+                 backoff_factor=2.0, backoff_max=30.0, max_parallel_connects=1, clock=time.monotonic):
+        self.loop = loop
+        self.characteristic_uuid = characteristic_uuid
+        self.connect_timeout = connect_timeout
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.max_parallel_connects = max_parallel_connects
+        self.clock = clock
+        self._random = random.Random()
+        self._connect_slots = None  # Semaphore, wird im Loop-Thread angelegt
+        self._own_loop = loop is None
+        self._thread = None
+        self._devices = {}  # nur im Loop-Thread verwenden
+
+    def start(self):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        if self._own_loop and self._thread is None:
+            self._thread = threading.Thread(target=self._run_loop, name="BLE-Hub", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """Führt eine Coroutine auf der Hub-Schleife aus und gibt ein concurrent Future zurück."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def add_device(self, key, address, on_notify, on_status=None, retry_delay=1.0):
+        """Verbindet (und hält verbunden) einen Controller.
+
+        `on_notify(sender, data)` und `on_status(status)` werden im Loop-Thread
+        aufgerufen. Mit `retry_delay=None` wird nach einem Fehler oder
+        Verbindungsabbruch nicht erneut verbunden; sonst ist `retry_delay` die
+        Wartezeit nach einem Abbruch und die Basis für den Backoff nach
+        fehlgeschlagenen Versuchen.
+        """
+        device = _Device(key, address, on_notify, on_status, retry_delay)
+        self.loop.call_soon_threadsafe(self._spawn, device)
+
+    def remove_device(self, key):
+        """Trennt einen Controller; die übrigen bleiben unberührt."""
+        self.loop.call_soon_threadsafe(self._cancel, key)
+
+    def write(self, key, data, response=True):
+        """Schreibt `data` (z.B. ble_frame.encode_command()) auf die Charakteristik eines Controllers.
+
+        Gibt ein concurrent Future zurück, das True ergibt, wenn geschrieben
+        wurde, und False, wenn der Controller gerade nicht verbunden ist.
+        """
+        return self.run(self._write(key, bytes(data), response))
+
+    async def _write(self, key, data, response):
+        device = self._devices.get(key)
+        if device is None or device.state != STATE_CONNECTED or device.client is None:
+            return False
+        try:
+            await device.client.write_gatt_char(self.characteristic_uuid, data, response=response)
+        except Exception as e:
+            logger.error(f"Fehler beim Schreiben an Gerät {device.key}: {e}")
+            return False
+        device.writes += 1
+        return True
+
+    def _spawn(self, device):
+        self._cancel(device.key)
+        self._devices[device.key] = device
+        device.task = self.loop.create_task(self._run_device(device))
+
+    def _cancel(self, key):
+        device = self._devices.pop(key, None)
+        if device is not None and device.task is not None:
+            device.task.cancel()
+
+    def _set_status(self, device, status):
+        if device.on_status is not None:
+            try:
+                device.on_status(status)
+            except Exception as e:
+                logger.error(f"Fehler im Status-Callback für {device.address}: {e}")
+
+    def _next_delay(self, device):
+        if device.consecutive_failures == 0:
+            delay = device.retry_delay  # Abbruch einer funktionierenden Verbindung: schnell neu verbinden
+        else:
+            delay = min(self.backoff_max,
+                        device.retry_delay * self.backoff_factor ** (device.consecutive_failures - 1))
+        return delay * self._random.uniform(0.5, 1.0)
+
+    async def _connect(self, device, client):
+        if self._connect_slots is None:
+            self._connect_slots = asyncio.Semaphore(self.max_parallel_connects)
+        async with self._connect_slots:
+            device.attempts += 1
+            await client.connect(timeout=self.connect_timeout)
+            device.mtu = await self._request_mtu(device, client)
+            on_notify = device.on_notify
+            if self.recorder is not None:
+                on_notify = self.recorder.notify_wrapper(device.address, on_notify)
+            await client.start_notify(self.characteristic_uuid, on_notify)
+
+    async def _request_mtu(self, device, client):
+        """Sorgt für die größte MTU, die beide Seiten können, und gibt sie zurück.
+
+        Windows, macOS und Android handeln die MTU beim Verbinden selbst aus
+        (bleak fragt unter Android 517 an). BlueZ tut das auch, meldet das
+        Ergebnis aber erst nach `_acquire_mtu()` - sonst sähe es nach 23 aus
+        und die Firmware-Bündelung bliebe ungenutzt.
+
+        `_backend._acquire_mtu` ist nicht öffentlich; geprüft mit bleak 3.0.2.
+        Fällt es in einer neueren Version weg, bleibt es unter BlueZ bei 23 -
+        deshalb die Warnung unten.
+        """
+        acquire = getattr(getattr(client, "_backend", None), "_acquire_mtu", None)
+        if acquire is not None:
+            try:
+                await acquire()
+            except Exception as e:
+                logger.warning(f"MTU von Gerät {device.key} nicht abfragbar: {e}")
+        mtu = getattr(client, "mtu_size", None)
+        if mtu is None or mtu <= DEFAULT_MTU:
+            logger.warning(f"Gerät {device.key}: MTU {mtu}, der Controller sendet ungebündelt "
+                           f"(ältere Firmware, oder bleak meldet die ausgehandelte MTU nicht)")
+        else:
+            logger.info(f"Gerät {device.key}: MTU {mtu}")
+        return mtu
+
+    async def _disconnect(self, device, client):
+        if not client.is_connected:
+            return
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.error(f"Fehler beim Trennen von Gerät {device.key}: {e}")
+
+    async def _run_device(self, device):
+        try:
+            while True:
+                disconnected = asyncio.Event()
+                factory = self.client_factory or BleakClient
+                client = factory(device.address, disconnected_callback=lambda _client: disconnected.set())
+                device.client = client
+                device.state = STATE_CONNECTING
+                self._set_status(device, STATUS_CONNECTING)
+                try:
+                    await self._connect(device, client)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    device.failures += 1
+                    device.consecutive_failures += 1
+                    logger.error(f"Fehler beim Verbinden mit Gerät {device.key}: {e}")
+                    self._set_status(device, STATUS_FAILED)
+                    await self._disconnect(device, client)
+                else:
+                    device.state = STATE_CONNECTED
+                    device.consecutive_failures = 0
+                    if device.lost_at is not None:
+                        device.reconnect_times.append(self.clock() - device.lost_at)
+                        device.lost_at = None
+                    logger.info(f"Gerät {device.key} ({device.address}) verbunden")
+                    self._set_status(device, STATUS_CONNECTED)
+                    await disconnected.wait()
+                    device.disconnects += 1
+                    device.lost_at = self.clock()
+                    logger.info(f"Verbindung zu Gerät {device.key} verloren")
+                    self._set_status(device, STATUS_LOST)
+
+                if device.retry_delay is None:
+                    device.state = STATE_STOPPED
+                    return
+                device.backoff = self._next_delay(device)
+                device.state = STATE_BACKOFF
+                logger.info(f"Gerät {device.key}: neuer Versuch in {device.backoff:.1f} s")
+                await asyncio.sleep(device.backoff)
+        finally:
+            device.state = STATE_STOPPED
+            client = device.client
+            device.client = None
+            if client is not None:
+                await self._disconnect(device, client)
+            if device.key not in self._devices:  # entfernt und nicht ersetzt
+                self._set_status(device, STATUS_STOPPED)
+
+    def stats(self):
+        """Zustand und Zähler aller Controller, Schlüssel wie bei `add_device()`."""
+        # Nur lesende Zugriffe auf einfache Attribute, daher auch aus anderen Threads vertretbar
+        return {key: device.stats() for key, device in list(self._devices.items())}
+
+    async def shutdown(self):
+        """Trennt alle Controller (im Loop-Thread aufrufen, z.B. über `run()`)."""
+        tasks = [device.task for device in self._devices.values() if device.task is not None]
+        for key in list(self._devices):
+            self._cancel(key)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout=5.0):
+        """Trennt alle Controller und beendet eine eigene Schleife (aus anderem Thread aufrufen)."""
+        if self.loop is None or not self.loop.is_running():
+            return
+        try:
+            self.run(self.shutdown()).result(timeout)
+        except Exception as e:
+            logger.error(f"Fehler beim Beenden des BLE-Hubs: {e}")
+        if self._own_loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
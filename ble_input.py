@@ -0,0 +1,85 @@
+"""Übergabe von Controller-Eingaben vom BLE-Thread an den Tk-Thread.
+
+Die BLE-Callbacks laufen im asyncio-Thread, das Spiel im Tk-Thread.
+InputQueue verarbeitet jeden Frame: Statt die Queue alle 100 ms abzufragen,
+weckt der BLE-Thread den Tk-Thread per `root.after(0, ...)`, sobald die
+Queue nicht mehr leer ist, und alles Angesammelte wird in einem Rutsch
+abgearbeitet.
+
+Das frühere "letzter Wert gewinnt"-Postfach ist in imu_filter.InputFilter
+aufgegangen: es sammelt alle Samples bis zum nächsten Spiel-Tick und zählt,
+wie viele davon in einem Tick zusammengefasst wurden.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class InputQueue:
+    """Queue vom BLE-Thread zum Tk-Thread mit Aufwecken statt Polling.
+
+    `handler(item)` wird im Tk-Thread aufgerufen, pro Aufwecken für höchstens
+    `max_batch` Einträge. Bleibt danach etwas übrig, wird sofort erneut
+    geweckt, damit Tk zwischendurch zeichnen kann.
+    """
+
+    def __init__(self, root, handler, max_batch=64, clock=time.monotonic, history=500):
+        self.root = root
+        self.handler = handler
+        self.max_batch = max_batch
+        self.clock = clock
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._wakeup_pending = False
+        self.wakeups = 0
+        self.processed = 0
+        self._wait_times = deque(maxlen=history)
+        self._max_wait = 0.0
+
+    def put(self, item):
+        """Aus dem BLE-Thread aufrufen."""
+        self._items.append((self.clock(), item))
+        with self._lock:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        self.root.after(0, self._drain)
+
+    def _drain(self):
+        with self._lock:
+            # Vor dem Leeren zurücksetzen: alles, was ab jetzt kommt, weckt erneut
+            self._wakeup_pending = False
+        self.wakeups += 1
+        items = self._items
+        for _ in range(self.max_batch):
+            try:
+                queued_at, item = items.popleft()
+            except IndexError:
+                break
+            wait = self.clock() - queued_at
+            self._wait_times.append(wait)
+            if wait > self._max_wait:
+                self._max_wait = wait
+            self.processed += 1
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"Fehler beim Verarbeiten der BLE-Daten: {e}")
+        if items:
+            with self._lock:
+                if self._wakeup_pending:
+                    return
+                self._wakeup_pending = True
+            self.root.after(0, self._drain)
+
+    def stats(self):
+        """Wartezeit in der Queue (Millisekunden) und Anzahl Aufwachvorgänge."""
+        waits = sorted(self._wait_times)
+        return {
+            "processed": self.processed,
+            "wakeups": self.wakeups,
+            "wait_avg_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_ms": 1000 * waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+            "wait_max_ms": 1000 * self._max_wait,
+        }
@@ -1,27 +1,103 @@
 import asyncio
 from bleak import BleakScanner, BleakClient
+from device_cache import DeviceCache
 
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
 
-async def check_device(device):
-    try:
-        async with BleakClient(device.address) as client:
-            services = client.services  # Verwendung der `services`-Eigenschaft statt `get_services()`
-            for service in services:
-                for characteristic in service.characteristics:
-                    if characteristic.uuid.lower() == CHARACTERISTIC_UUID.lower():
-                        print(f"Gefundenes Gerät mit passender Characteristic: {device.name} ({device.address})")
-                        return
-    except Exception as e:
-        print(f"Fehler bei {device.address}: {e}")
+SCAN_TIMEOUT = 5.0
+PROBE_TIMEOUT = 8.0      # maximale Zeit für Verbindung + Service-Abfrage pro Gerät
+MAX_PARALLEL_PROBES = 4  # gleichzeitige Verbindungsversuche
+
+# Ergebnis-Arten
+MATCH_ADVERTISED = "advertised"  # Service-UUID steht in der Advertisement
+MATCH_PROBED = "probed"          # Characteristic beim Verbinden gefunden
+NO_MATCH = "no_match"
+PROBE_ERROR = "error"
+
+
+async def find_characteristic(address):
+    async with BleakClient(address) as client:
+        services = client.services  # Verwendung der `services`-Eigenschaft statt `get_services()`
+        for service in services:
+            for characteristic in service.characteristics:
+                if characteristic.uuid.lower() == CHARACTERISTIC_UUID.lower():
+                    return True
+    return False
+
+
+async def check_device(device, semaphore, timeout=PROBE_TIMEOUT):
+    """Verbindet sich mit dem Gerät und sucht die Characteristic in den Services."""
+    async with semaphore:
+        try:
+            found = await asyncio.wait_for(find_characteristic(device.address), timeout)
+            return (MATCH_PROBED if found else NO_MATCH), None
+        except asyncio.TimeoutError:
+            return PROBE_ERROR, f"Zeitüberschreitung nach {timeout:.0f} s"
+        except Exception as e:
+            return PROBE_ERROR, str(e) or type(e).__name__
+
+
+def classify_advertisement(advertisement):
+    """Entscheidet anhand der Advertisement, ob ein Gerät geprüft werden muss.
+
+    Gibt MATCH_ADVERTISED, NO_MATCH oder None (unklar, Verbindung nötig) zurück.
+    """
+    service_uuids = [str(uuid).lower() for uuid in advertisement.service_uuids]
+    if SERVICE_UUID.lower() in service_uuids:
+        return MATCH_ADVERTISED
+    if service_uuids:
+        # Gerät kündigt andere Services an, unser Service wäre mit dabei
+        return NO_MATCH
+    return None
+
+
+async def scan(scan_timeout=SCAN_TIMEOUT, probe_timeout=PROBE_TIMEOUT, max_parallel=MAX_PARALLEL_PROBES):
+    """Sucht Controller und gibt eine Liste von Dicts zurück.
+
+    Jedes Dict enthält address, name, rssi, result (MATCH_ADVERTISED,
+    MATCH_PROBED, NO_MATCH oder PROBE_ERROR) und ggf. error.
+    """
+    discovered = await BleakScanner.discover(timeout=scan_timeout, return_adv=True)
+
+    results = []
+    ambiguous = []
+    for device, advertisement in discovered.values():
+        entry = {
+            "address": device.address,
+            "name": device.name or advertisement.local_name,
+            "rssi": advertisement.rssi,
+            "result": classify_advertisement(advertisement),
+            "error": None,
+        }
+        results.append(entry)
+        if entry["result"] is None:
+            ambiguous.append((entry, device))
+
+    # Nur Geräte ohne Service-Liste in der Advertisement werden verbunden, parallel aber begrenzt
+    semaphore = asyncio.Semaphore(max_parallel)
+    probes = await asyncio.gather(*(check_device(device, semaphore, probe_timeout) for _, device in ambiguous))
+    for (entry, _), (result, error) in zip(ambiguous, probes):
+        entry["result"] = result
+        entry["error"] = error
+
+    results.sort(key=lambda entry: entry["rssi"] if entry["rssi"] is not None else -999, reverse=True)
+    return results
+
 
 async def main():
     print("Scanne nach BLE-Geräten...")
-    devices = await BleakScanner.discover()
-    
-    for device in devices:
-        await check_device(device)
+    results = await scan()
+    cache = DeviceCache()
+
+    for entry in results:
+        if entry["result"] in (MATCH_ADVERTISED, MATCH_PROBED):
+            cache.record_seen(entry["address"], entry["name"], entry["rssi"], SERVICE_UUID)
+            print(f"Gefundenes Gerät mit passender Characteristic: {entry['name']} ({entry['address']}, "
+                  f"RSSI {entry['rssi']} dBm, {entry['result']})")
+        elif entry["result"] == PROBE_ERROR:
+            print(f"Fehler bei {entry['address']}: {entry['error']}")
+    print(f"{len(results)} Geräte geprüft.")
 
 if __name__ == "__main__":
     asyncio.run(main())
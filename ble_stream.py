@@ -0,0 +1,122 @@
+"""Zusammensetzen von Frames aus fragmentierten BLE-Notifications.
+
+Ein JSON-Frame des Controllers kann auf mehrere Notifications verteilt
+ankommen und wird mit einem Trennzeichen ("\\n") abgeschlossen. Der
+FrameReassembler sammelt die Daten in einem vorab angelegten Puffer und
+liefert vollständige Frames als memoryview, ohne sie zu kopieren.
+"""
+
+DEFAULT_MAX_FRAME_SIZE = 512
+
+
+class FrameReassembler:
+    """Setzt Frames aus einem Byte-Strom zusammen.
+
+    Die gelieferten memoryviews zeigen direkt in den internen Puffer und sind
+    nur gültig, bis der Generator von `feed()` weiterläuft. Wer einen Frame
+    aufheben will, muss ihn mit `bytes(frame)` kopieren.
+
+    Frames, die länger als `max_frame_size` werden, gelten als Müll: sie
+    werden bis zum nächsten Trennzeichen verworfen und als Resync gezählt.
+    Ist `start_byte` gesetzt, werden Bytes vor dem ersten `start_byte` eines
+    Frames ebenfalls verworfen. Notifications, für die `passthrough(data)`
+    wahr ist (z.B. Binär-Frames), werden bei leerem Puffer direkt geliefert.
+    """
+
+    def __init__(self, max_frame_size=DEFAULT_MAX_FRAME_SIZE, delimiter=b"\n",
+                 start_byte=None, passthrough=None):
+        self.max_frame_size = max_frame_size
+        self.delimiter = delimiter
+        self.start_byte = start_byte
+        self.passthrough = passthrough
+        self._buf = bytearray(4 * (max_frame_size + len(delimiter)))
+        self._view = memoryview(self._buf)
+        self._start = 0  # Beginn des noch unvollständigen Frames
+        self._scan = 0   # ab hier wurde noch nicht nach dem Trennzeichen gesucht
+        self._end = 0    # Ende der gültigen Daten
+        self._discarding = False
+        self.frames = 0
+        self.resync_count = 0
+        self.dropped_bytes = 0
+
+    @property
+    def pending(self):
+        """Anzahl gepufferter Bytes, die noch keinen vollständigen Frame ergeben."""
+        return self._end - self._start
+
+    def reset(self):
+        self._start = self._scan = self._end = 0
+        self._discarding = False
+
+    def feed(self, data):
+        """Nimmt neue Daten auf und liefert alle darin abgeschlossenen Frames."""
+        if self.passthrough is not None and self._end == self._start and self.passthrough(data):
+            self.frames += 1
+            yield memoryview(data)
+            return
+
+        view = memoryview(data)
+        chunk_size = len(self._buf) - self.max_frame_size - len(self.delimiter)
+        for offset in range(0, len(view), chunk_size):
+            yield from self._feed_chunk(view[offset:offset + chunk_size])
+
+    def _compact(self):
+        pending = self._end - self._start
+        if self._start:
+            self._buf[0:pending] = self._buf[self._start:self._end]
+            self._scan -= self._start
+            self._start = 0
+            self._end = pending
+
+    def _drop_pending(self):
+        self.dropped_bytes += self._end - self._start
+        self._start = self._scan = self._end = 0
+
+    def _feed_chunk(self, chunk):
+        size = len(chunk)
+        if self._end + size > len(self._buf):
+            self._compact()
+        self._view[self._end:self._end + size] = chunk
+        self._end += size
+
+        buf = self._buf
+        delimiter = self.delimiter
+        while True:
+            pos = buf.find(delimiter, self._scan, self._end)
+            if pos < 0:
+                self._scan = max(self._start, self._end - len(delimiter) + 1)
+                break
+            frame_start = self._start
+            self._start = self._scan = pos + len(delimiter)
+
+            if self._discarding:
+                # Rest eines zu langen Frames bis einschließlich Trennzeichen verwerfen
+                self._discarding = False
+                self.dropped_bytes += self._start - frame_start
+                continue
+            if pos - frame_start > self.max_frame_size:
+                self.resync_count += 1
+                self.dropped_bytes += self._start - frame_start
+                continue
+            if self.start_byte is not None:
+                first = buf.find(self.start_byte, frame_start, pos)
+                if first < 0:
+                    if pos > frame_start:
+                        self.resync_count += 1
+                        self.dropped_bytes += pos - frame_start
+                    continue
+                if first > frame_start:
+                    self.resync_count += 1
+                    self.dropped_bytes += first - frame_start
+                    frame_start = first
+            if pos > frame_start:
+                self.frames += 1
+                yield self._view[frame_start:pos]
+
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+        elif self._end - self._start > self.max_frame_size:
+            if not self._discarding:
+                self.resync_count += 1
+                self._discarding = True
+            self._drop_pending()
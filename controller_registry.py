@@ -0,0 +1,207 @@
+"""Zuordnung beliebig vieler Controller zu Spielerplätzen.
+
+Jeder Controller ist ein kleiner Datensatz (Platz, Adresse, Status,
+Frame-Zerleger, Verbindungsqualität). Alle Notifications laufen durch dieselbe Methode;
+der Hub bekommt pro Gerät nur eine an den Platz gebundene Variante davon,
+und der Datensatz wird per Dict-Zugriff gefunden. Ein weiterer Spieler ist
+damit ein weiterer Eintrag, keine weitere Methode und kein weiterer Zweig.
+
+    registry = ControllerRegistry(hub, on_samples=lambda slot, samples, timestamp: ...)
+    registry.add(3, "64:E8:33:88:5E:E2")
+    registry.is_connected(3)
+
+Über die Charakteristik lässt sich der Controller auch steuern (siehe
+Befehle in ble_frame.py): `pause()`/`resume()` schalten das Senden ab und
+an, `set_interval()` ändert den Messabstand, `set_fields()` die gesendeten
+Sensorwerte. Die Einstellungen merkt sich der Datensatz; da die Firmware
+sie beim Trennen vergisst, werden sie nach jedem Verbinden neu geschrieben.
+"""
+
+import logging
+import time
+from functools import partial
+
+from ble_frame import (ALL_FIELDS, COMMAND_FIELDS, COMMAND_INTERVAL, COMMAND_PAUSE, COMMAND_RESUME,
+                       decode_samples, encode_command, field_mask, is_binary_frame, sample_ages)
+from ble_hub import STATUS_CONNECTED, STATUS_STOPPED
+from ble_stream import FrameReassembler
+from link_stats import LinkStats
+
+logger = logging.getLogger(__name__)
+
+
+class Controller:
+    __slots__ = ("slot", "address", "status", "connected", "reassembler", "link", "errors",
+                 "interval", "fields", "paused")
+
+    def __init__(self, slot, address, clock):
+        self.slot = slot
+        self.address = address
+        self.status = STATUS_STOPPED
+        self.connected = False
+        self.reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
+        self.link = LinkStats(clock=clock)
+        self.errors = 0
+        self.interval = None    # Messabstand in Sekunden, None = Standard der Firmware
+        self.fields = ALL_FIELDS
+        self.paused = False
+
+    def commands(self):
+        """Befehle, die die Firmware von ihren Standardwerten auf diese Einstellungen bringen."""
+        commands = []
+        if self.interval is not None:
+            commands.append(encode_command(COMMAND_INTERVAL, self.interval))
+        if self.fields != ALL_FIELDS:
+            commands.append(encode_command(COMMAND_FIELDS, self.fields))
+        if self.paused:
+            commands.append(encode_command(COMMAND_PAUSE))
+        return b"".join(commands)
+
+
+class ControllerRegistry:
+    """Verwaltet die Controller aller Spielerplätze über einen gemeinsamen BleHub.
+
+    `on_samples(slot, samples, timestamp)` bekommt die Messungen jedes
+    Frames als Liste (bei gebündelten Frames mehrere, siehe
+    InputFilter.push_batch) und die Ankunftszeit nach `clock`,
+    `on_status(slot, status)` jede Statusänderung; beide werden im
+    Loop-Thread des Hubs aufgerufen, nur die Meldung von `remove()` im
+    aufrufenden Thread.
+    """
+
+    def __init__(self, hub, on_samples, on_status=None, clock=time.monotonic):
+        self.hub = hub
+        self.on_samples = on_samples
+        self.on_status = on_status
+        self.clock = clock
+        self._controllers = {}  # Platz -> Controller
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def __iter__(self):
+        return iter(list(self._controllers.values()))
+
+    def __contains__(self, slot):
+        return slot in self._controllers
+
+    def get(self, slot):
+        return self._controllers.get(slot)
+
+    def add(self, slot, address, retry_delay=1.0):
+        """Verbindet `address` als Controller für `slot`; ein bisheriger Controller dort wird ersetzt."""
+        if slot in self._controllers:
+            self.remove(slot)
+        controller = self._controllers[slot] = Controller(slot, address, self.clock)
+        self.hub.add_device(slot, address, partial(self._on_notify, slot),
+                            on_status=partial(self._on_status, slot), retry_delay=retry_delay)
+        return controller
+
+    def remove(self, slot):
+        """Trennt nur den Controller dieses Platzes, die anderen bleiben verbunden."""
+        controller = self._controllers.pop(slot, None)
+        if controller is not None:
+            self.hub.remove_device(slot)
+            # Der Hub meldet "gestoppt" erst nach dem Entfernen, also nicht mehr an uns
+            if self.on_status:
+                self.on_status(slot, STATUS_STOPPED)
+
+    def slots(self):
+        return sorted(self._controllers)
+
+    def is_connected(self, slot):
+        controller = self._controllers.get(slot)
+        return controller is not None and controller.connected
+
+    def status(self, slot):
+        controller = self._controllers.get(slot)
+        return controller.status if controller is not None else STATUS_STOPPED
+
+    def link_stats(self, slot):
+        """Verbindungsqualität (siehe link_stats.LinkStats.stats), oder None ohne Controller."""
+        controller = self._controllers.get(slot)
+        return controller.link.stats() if controller is not None else None
+
+    def link_summary(self, slot):
+        controller = self._controllers.get(slot)
+        if controller is None or not controller.connected:
+            return ""
+        return "pausiert" if controller.paused else controller.link.summary()
+
+    def pause(self, slot=None):
+        """Controller von `slot` (ohne: alle) hört auf zu messen und zu senden."""
+        for controller in self._select(slot):
+            if not controller.paused:
+                controller.paused = True
+                self._send(controller, encode_command(COMMAND_PAUSE))
+
+    def resume(self, slot=None):
+        for controller in self._select(slot):
+            if controller.paused:
+                controller.paused = False
+                controller.link.reset()  # die Pause ist keine Lücke und kein Jitter
+                self._send(controller, encode_command(COMMAND_RESUME))
+
+    def set_interval(self, interval, slot=None):
+        """Messabstand in Sekunden (None = Standard der Firmware) für `slot` oder alle Controller."""
+        for controller in self._select(slot):
+            if controller.interval != interval:
+                controller.interval = interval
+                self._send(controller, encode_command(COMMAND_INTERVAL, interval))
+
+    def set_fields(self, fields, slot=None):
+        """Nur diese Sensorwerte senden lassen (Namen aus ble_frame.SENSOR_FIELDS oder Bitmaske)."""
+        mask = field_mask(fields)
+        for controller in self._select(slot):
+            if controller.fields != mask:
+                controller.fields = mask
+                self._send(controller, encode_command(COMMAND_FIELDS, mask))
+
+    def _select(self, slot):
+        if slot is None:
+            return list(self._controllers.values())
+        controller = self._controllers.get(slot)
+        return [controller] if controller is not None else []
+
+    def _send(self, controller, data):
+        # Nicht verbunden: wird beim nächsten Verbinden mit commands() nachgeholt
+        if controller.connected and data:
+            self.hub.write(controller.slot, data)
+
+    def _on_notify(self, slot, sender, data):
+        controller = self._controllers.get(slot)
+        if controller is None:
+            return  # Notification kam nach remove()
+        now = self.clock()
+        controller.link.on_notification(len(data), now)
+        try:
+            for frame in controller.reassembler.feed(data):
+                samples = decode_samples(frame)
+                for sample, age in zip(samples, sample_ages(samples)):
+                    controller.link.on_frame(sample.get("seq"), sample.get("ms"), now - age)
+                self.on_samples(slot, samples, now)
+        except Exception as e:
+            controller.errors += 1
+            logger.error(f"Fehler bei der Verarbeitung der BLE-Daten für Platz {slot}: {e}")
+
+    def _on_status(self, slot, status):
+        controller = self._controllers.get(slot)
+        if controller is None:
+            return
+        controller.status = status
+        controller.connected = status == STATUS_CONNECTED
+        if controller.connected:
+            controller.link.reset()  # Controller zählt nach einem Neustart wieder ab 0
+            self._send(controller, controller.commands())
+        if self.on_status:
+            self.on_status(slot, status)
+
+    async def shutdown(self):
+        await self.hub.shutdown()
+        for controller in self._controllers.values():
+            controller.connected = False
+
+    def stats(self):
+        hub_stats = self.hub.stats()
+        return {slot: {"errors": controller.errors, "paused": controller.paused, **controller.link.stats(), **hub_stats.get(slot, {})}
+                for slot, controller in self._controllers.items()}
@@ -0,0 +1,137 @@
+"""Dauerhafte Liste bekannter Controller.
+
+Nach einem erfolgreichen Scan oder einer Verbindung wird der Controller in
+einer kleinen JSON-Datei gespeichert. Beim nächsten Start kann sich ein
+Spiel direkt mit einem bekannten Controller verbinden, statt zuerst 10
+Sekunden lang zu scannen. Einträge, die mehrmals hintereinander nicht
+erreichbar waren oder lange nicht gesehen wurden, werden verworfen.
+
+Die Spiele mit BleHub holen ihre Controller-Adressen über
+`controller_addresses()` und melden jeden Verbindungsstatus mit
+`DeviceCache.record_status()` zurück; fest eingetragene Adressen dienen
+nur noch als Ersatz, solange kein Controller bekannt ist.
+"""
+
+import json
+import os
+import threading
+import time
+
+from ble_hub import STATUS_CONNECTED, STATUS_FAILED
+
+SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".seminarkurs_controller.json")
+MAX_FAILURES = 3
+MAX_AGE = 30 * 24 * 3600  # Sekunden
+
+
+class DeviceCache:
+    """Bekannte Controller, Schlüssel ist die Adresse.
+
+    Jeder Eintrag enthält address, name, service_uuid, rssi, last_seen
+    (Unix-Zeit) und failures (Fehlversuche in Folge). Die Methoden dürfen
+    aus verschiedenen Threads aufgerufen werden; jede Änderung wird sofort
+    gespeichert.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_failures=MAX_FAILURES, max_age=MAX_AGE):
+        self.path = path
+        self.max_failures = max_failures
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = []
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Controller-Cache {self.path} nicht lesbar: {e}")
+            entries = []
+        now = time.time()
+        with self._lock:
+            self._entries = {
+                entry["address"]: entry for entry in entries
+                if "address" in entry and now - entry.get("last_seen", 0) <= self.max_age
+            }
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.values()), f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Controller-Cache {self.path} nicht schreibbar: {e}")
+
+    def candidates(self, service_uuid=SERVICE_UUID):
+        """Bekannte Controller für `service_uuid`, zuletzt gesehene zuerst."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()
+                       if entry.get("service_uuid", "").lower() == service_uuid.lower()]
+        entries.sort(key=lambda entry: entry.get("last_seen", 0), reverse=True)
+        return entries
+
+    def record_seen(self, address, name=None, rssi=None, service_uuid=SERVICE_UUID):
+        """Controller wurde beim Scan gefunden oder erfolgreich verbunden."""
+        with self._lock:
+            entry = self._entries.setdefault(address, {"address": address})
+            if name:
+                entry["name"] = name
+            if rssi is not None:
+                entry["rssi"] = rssi
+            entry["service_uuid"] = service_uuid
+            entry["last_seen"] = time.time()
+            entry["failures"] = 0
+            self._save()
+
+    def record_failure(self, address):
+        """Direktverbindung fehlgeschlagen; nach `max_failures` Fehlversuchen wird der Eintrag gelöscht."""
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return
+            entry["failures"] = entry.get("failures", 0) + 1
+            if entry["failures"] >= self.max_failures:
+                del self._entries[address]
+            self._save()
+
+    def record_status(self, address, status, service_uuid=SERVICE_UUID):
+        """Für Status-Callbacks von BleHub: verbunden zählt als gesehen, fehlgeschlagen als Fehlversuch."""
+        if status == STATUS_CONNECTED:
+            self.record_seen(address, service_uuid=service_uuid)
+        elif status == STATUS_FAILED:
+            self.record_failure(address)
+
+    def forget(self, address):
+        with self._lock:
+            if self._entries.pop(address, None) is not None:
+                self._save()
+
+
+def controller_addresses(fallback, cache, service_uuid=SERVICE_UUID):
+    """Adressen für die Spielerplätze `fallback` ({Platz: Adresse}), bekannte Controller zuerst.
+
+    Die zuletzt gesehenen Controller werden auf die Plätze verteilt; ein
+    Controller, der auch in `fallback` steht, behält dabei seinen Platz, die
+    übrigen werden nach Adresse sortiert, damit die Spieler nicht bei jedem
+    Start tauschen. Plätze ohne bekannten Controller bekommen die Adresse
+    aus `fallback`.
+    """
+    slots = sorted(fallback)
+    known = [entry["address"] for entry in cache.candidates(service_uuid)][:len(slots)]
+    known_upper = {address.upper(): address for address in known}
+    addresses = {}
+    for slot in slots:
+        address = known_upper.pop(fallback[slot].upper(), None)
+        if address is not None:
+            addresses[slot] = address
+    spare = sorted(known_upper.values())
+    for slot in slots:
+        if slot not in addresses:
+            addresses[slot] = spare.pop(0) if spare else fallback[slot]
+    return addresses
@@ -0,0 +1,182 @@
+"""Simulierter Controller als Ersatz für BleakClient.
+
+FakeBleakClient verhält sich nach außen wie ein verbundener BleakClient und
+sendet nach `start_notify()` Sensor-Frames mit einstellbarer Rate, Größe,
+Jitter und Verlustrate. Damit lassen sich die Spiele und der Eingabepfad
+ohne ESP32 und ohne Funk messen (siehe benchmark_input_latency.py).
+"""
+
+import asyncio
+import json
+import random
+import time
+
+from ble_frame import (ALL_FIELDS, COMMAND_FIELDS, COMMAND_INTERVAL, COMMAND_PAUSE, COMMAND_RESUME,
+                       batch_capacity, decode_commands, encode_batch_frame, encode_binary_frame)
+
+
+def default_sample(seq):
+    """Sensorwerte für Frame `seq`; Ax ist über 200 Frames eindeutig, damit man ihn im Spiel wiederfindet."""
+    return {"Ax": 1.0 + (seq % 200) / 100.0, "Ay": 0.0, "Az": 9.81, "T": 25.0,
+            "Gx": 0.0, "Gy": 0.0, "Gz": 0.0, "player": 1}
+
+
+def encode_sample(sample, payload="binary", size=None, seq=None, ms=None):
+    """Frame wie von der Firmware; mit `seq` (und `ms`) im Format mit Frame-Zähler."""
+    if payload == "binary":
+        return encode_binary_frame(sample, sample.get("player", 1), seq, ms)
+    if seq is not None:
+        sample = dict(sample, seq=seq % 256, ms=int(ms or 0))
+    text = json.dumps(sample, separators=(",", ":"))
+    if size is not None and len(text) + 1 < size:
+        text += " " * (size - len(text) - 1)  # Leerzeichen sind in JSON erlaubt
+    return (text + "\n").encode("utf-8")
+
+
+class FakeBleakClient:
+    """Stellt sich als BleakClient dar und erzeugt Notifications im Takt `rate_hz`.
+
+    Jeder gesendete Frame wird als (seq, Sendezeit, sample) in `log`
+    festgehalten (time.monotonic()). Frames, die wegen `loss` "verloren
+    gehen", stehen in `lost`. Mit `sequenced` tragen die Frames wie bei
+    aktueller Firmware einen Zähler und die Sendezeit.
+
+    Passen bei `mtu` mindestens zwei Messungen in eine Notification, werden
+    sie wie von der Firmware gebündelt (Version 3): gesendet wird, sobald der
+    Frame voll ist oder die älteste Messung `max_batch_age` Sekunden alt ist.
+    `rate_hz` ist dann die Messrate, nicht die Notification-Rate.
+
+    Befehle über `write_gatt_char()` (ble_frame.encode_command()) wirken wie
+    bei der Firmware und gelten bis zum Trennen; empfangene Befehle stehen
+    in `commands`.
+    """
+
+    def __init__(self, address, disconnected_callback=None, rate_hz=10.0, jitter=0.0, payload="binary",
+                 size=None, loss=0.0, sample=default_sample, seed=None, connect_delay=0.05, log=None, lost=None,
+                 sequenced=True, mtu=23, max_batch_age=0.04):
+        self.address = address
+        self.disconnected_callback = disconnected_callback
+        self.rate_hz = self.default_rate_hz = rate_hz
+        self.jitter = jitter
+        self.payload = payload
+        self.size = size
+        self.loss = loss
+        self.sample = sample
+        self.connect_delay = connect_delay
+        self.log = log if log is not None else []
+        self.lost = lost if lost is not None else []
+        self.sequenced = sequenced
+        self.mtu_size = mtu
+        self.max_batch_age = max_batch_age
+        self.fields = ALL_FIELDS
+        self.paused = False
+        self.commands = []
+        self.notifications = 0
+        self.services = []
+        self.is_connected = False
+        self._random = random.Random(seed)
+        self._task = None
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    @property
+    def batch(self):
+        """Messungen pro Notification wie bei der Firmware; 0 = einzelne Frames der Version 2 oder JSON."""
+        if self.payload != "binary" or not self.sequenced:
+            return 0
+        capacity = batch_capacity(self.mtu_size, self.fields)
+        if capacity >= 2 or (capacity == 1 and self.fields != ALL_FIELDS):
+            return capacity
+        return 0
+
+    async def connect(self, timeout=None):
+        await asyncio.sleep(self.connect_delay)
+        self.is_connected = True
+        # Die Firmware startet jede Verbindung mit ihren Standardwerten
+        self.rate_hz = self.default_rate_hz
+        self.fields = ALL_FIELDS
+        self.paused = False
+        self._resumed.set()
+        return True
+
+    async def write_gatt_char(self, characteristic, data, response=True):
+        for command, value in decode_commands(data):
+            self.commands.append((command, value))
+            if command == COMMAND_INTERVAL:
+                self.rate_hz = 1.0 / value if value else self.default_rate_hz
+            elif command == COMMAND_FIELDS:
+                self.fields = value
+            elif command == COMMAND_PAUSE:
+                self.paused = True
+                self._resumed.clear()
+            elif command == COMMAND_RESUME:
+                self.paused = False
+                self._resumed.set()
+
+    async def start_notify(self, characteristic, callback):
+        self._task = asyncio.get_running_loop().create_task(self._emit(characteristic, callback))
+
+    async def stop_notify(self, characteristic):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def disconnect(self):
+        await self.stop_notify(None)
+        was_connected = self.is_connected
+        self.is_connected = False
+        if was_connected and self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+        return True
+
+    async def _emit(self, characteristic, callback):
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        seq = 0
+        pending = []  # (seq, Messzeit in ms, sample) für den nächsten gebündelten Frame
+        fields = self.fields
+        while True:
+            if self.paused or self.fields != fields:
+                pending = []  # wie die Firmware: angefangener Frame wird verworfen
+                fields = self.fields
+                await self._resumed.wait()
+                due = loop.time()
+            due += 1.0 / self.rate_hz
+            batch_size = self.batch
+            if not batch_size:
+                delay = due - loop.time() + self._random.uniform(0.0, self.jitter)
+                await asyncio.sleep(max(0.0, delay))
+                if self.paused:
+                    continue
+                sample = self.sample(seq)
+                if self._random.random() < self.loss:
+                    self.lost.append(seq)
+                else:
+                    stamp = (seq, int(1000 * loop.time())) if self.sequenced else (None, None)
+                    data = bytearray(encode_sample(sample, self.payload, self.size, *stamp))
+                    self.log.append((seq, time.monotonic(), sample))
+                    self.notifications += 1
+                    callback(characteristic, data)
+                seq += 1
+                continue
+
+            # Messen im Takt, der Jitter trifft nur das Senden
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            if self.paused or self.fields != fields:
+                continue
+            pending.append((seq, int(1000 * loop.time()), self.sample(seq)))
+            seq += 1
+            if len(pending) < batch_size and loop.time() - pending[0][1] / 1000 < self.max_batch_age:
+                continue
+            batch, pending = pending, []
+            if self.jitter:
+                await asyncio.sleep(self._random.uniform(0.0, self.jitter))
+            if self._random.random() < self.loss:
+                self.lost.extend(entry[0] for entry in batch)
+                continue
+            data = bytearray(encode_batch_frame([entry[2] for entry in batch], batch[0][2].get("player", 1),
+                                                batch[0][0], [entry[1] for entry in batch], fields))
+            sent = time.monotonic()
+            self.log.extend((entry[0], sent, entry[2]) for entry in batch)
+            self.notifications += 1
+            callback(characteristic, data)
@@ -0,0 +1,127 @@
+"""Spielschleife mit festem Physik-Takt für tkinter.
+
+Statt `root.after(20, update_game)` nach jedem Tick neu anzustoßen, misst
+GameLoop die tatsächlich vergangene Zeit mit einer monotonen Uhr und führt
+so viele Physik-Schritte mit fester Schrittweite aus, wie seitdem fällig
+sind (Akkumulator). Gezeichnet wird höchstens mit `render_rate`. Hängt der
+Rechner (z.B. während einer messagebox), werden nur `max_steps_per_frame`
+Schritte nachgeholt und der Rest verworfen, damit das Spiel nicht "rast".
+"""
+
+import time
+from collections import deque
+
+
+class FrameStats:
+    """Messwerte der letzten Frames (Zeiten in Sekunden)."""
+
+    def __init__(self, history=300):
+        self.frames = 0
+        self.steps = 0
+        self.dropped_steps = 0    # wegen max_steps_per_frame verworfene Physik-Schritte
+        self.skipped_frames = 0   # ausgefallene Render-Frames, weil der Tick zu spät kam
+        self.tick_durations = deque(maxlen=history)
+        self.lateness = deque(maxlen=history)
+
+    def record(self, duration, lateness):
+        self.frames += 1
+        self.tick_durations.append(duration)
+        self.lateness.append(lateness)
+
+    @staticmethod
+    def _percentile(values, fraction):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """Kennzahlen in Millisekunden, z.B. für Logging oder eine Statuszeile."""
+        durations = self.tick_durations
+        lateness = self.lateness
+        return {
+            "frames": self.frames,
+            "steps": self.steps,
+            "dropped_steps": self.dropped_steps,
+            "skipped_frames": self.skipped_frames,
+            "tick_avg_ms": 1000 * sum(durations) / len(durations) if durations else 0.0,
+            "tick_max_ms": 1000 * max(durations, default=0.0),
+            "late_avg_ms": 1000 * sum(lateness) / len(lateness) if lateness else 0.0,
+            "late_p95_ms": 1000 * self._percentile(lateness, 0.95),
+        }
+
+
+class GameLoop:
+    """Ruft `update()` mit `sim_rate` pro Sekunde und `render()` höchstens mit `render_rate` auf.
+
+    `render()` wird nur aufgerufen, wenn seit dem letzten Frame mindestens ein
+    Physik-Schritt ausgeführt wurde.
+    """
+
+    def __init__(self, root, update, render=None, sim_rate=50, render_rate=60, max_steps_per_frame=5,
+                 clock=time.perf_counter):
+        self.root = root
+        self.update = update
+        self.render = render
+        self.dt = 1.0 / sim_rate
+        self.frame_interval = 1.0 / render_rate
+        self.max_steps_per_frame = max_steps_per_frame
+        self.clock = clock
+        self.stats = FrameStats()
+        self.running = False
+        self._after_id = None
+        self._accumulator = 0.0
+        self._last = 0.0
+        self._due = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._accumulator = 0.0
+        self._last = self._due = self.clock()
+        self._after_id = self.root.after(0, self._tick)
+
+    def stop(self):
+        self.running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass  # Fenster ist evtl. schon zerstört
+            self._after_id = None
+
+    def _tick(self):
+        self._after_id = None
+        if not self.running:
+            return
+        start = self.clock()
+        lateness = max(0.0, start - self._due)
+        self._accumulator += start - self._last
+        self._last = start
+
+        steps = 0
+        while self._accumulator >= self.dt and steps < self.max_steps_per_frame:
+            self.update()
+            self._accumulator -= self.dt
+            steps += 1
+            if not self.running:  # update() hat das Spiel beendet
+                return
+        self.stats.steps += steps
+        if self._accumulator >= self.dt:
+            dropped = int(self._accumulator / self.dt)
+            self.stats.dropped_steps += dropped
+            self._accumulator -= dropped * self.dt
+
+        if steps and self.render is not None:
+            self.render()
+        now = self.clock()
+        self.stats.record(now - start, lateness)
+
+        self._due += self.frame_interval
+        if self._due < now:
+            missed = int((now - self._due) / self.frame_interval) + 1
+            self.stats.skipped_frames += missed
+            self._due += missed * self.frame_interval
+        delay_ms = max(0, int(round((self._due - now) * 1000)))
+        self._after_id = self.root.after(delay_ms, self._tick)
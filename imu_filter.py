@@ -0,0 +1,432 @@
+"""Filterstufe für die Sensordaten der Controller.
+
+Bisher wurde Ax direkt in eine Geschwindigkeit umgerechnet, jedes
+Sensorrauschen wurde so zu Zittern des Schlägers. InputFilter sammelt die
+Samples pro Controller und filtert sie gesammelt einmal pro Spiel-Tick mit
+NumPy. Dabei sind alle Samples eines Ticks eine Matrix; jeder Filter
+arbeitet auf ganzen Spalten statt auf einzelnen Werten.
+
+Ein Sample ist eine Zeile mit den Spalten aus COLUMNS. Die Filter lesen
+und schreiben Spalten über ihren Namen:
+
+    LowPass            exponentieller Tiefpass
+    DeadZone           kleine Ausschläge um die Ruhelage werden zu 0
+    ComplementaryFilter  Neigung aus Beschleunigung (langsam, aber ohne Drift)
+                         und Gyroskop (schnell, aber mit Drift) kombiniert
+    ResponseCurve      Kennlinie (linear, quadratisch, kubisch, expo) und
+                       Skalierung auf den Steuerwert
+
+Die Spiele verwenden den Steuerwert "x" (bzw. "y") im Wertebereich von Ax,
+also etwa -9.81 bis 9.81.
+
+Die Firmware sendet nur alle 100 ms, die Spiele laufen mit 20 ms pro Tick.
+Mit einem LinearPredictor schätzt `InputFilter.value()` den Steuerwert
+zwischen zwei Samples aus dem Trend der letzten Samples, statt ihn fünf
+Ticks lang stehen zu lassen.
+
+Kommen umgekehrt mehrere Samples pro Tick, fließen alle in den Filter, für
+den Steuerwert zählt aber nur das neueste. Wie viele pro Tick so
+zusammengefasst werden, steht in `update()["coalesced"]` und (geglättet)
+in `stats()["coalesced_avg"]`.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from ble_frame import sample_ages
+
+G = 9.81
+COLUMNS = ("t", "Ax", "Ay", "Az", "Gx", "Gy", "Gz", "tilt_x", "tilt_y", "x", "y")
+SENSOR_COLUMNS = COLUMNS[1:7]
+MAX_BATCH = 64  # größere Batches werden in Stücken gefiltert
+
+
+def column(name):
+    try:
+        return COLUMNS.index(name)
+    except ValueError:
+        raise ValueError(f"Unbekannte Spalte {name!r}") from None
+
+
+_decay_cache = {}
+
+
+def _decay_matrix(coeff, n):
+    """Untere Dreiecksmatrix mit coeff**(i-j), gecacht pro (coeff, n)."""
+    key = (coeff, n)
+    matrix = _decay_cache.get(key)
+    if matrix is None:
+        exponent = np.subtract.outer(np.arange(n), np.arange(n))
+        matrix = np.where(exponent >= 0, coeff ** np.maximum(exponent, 0), 0.0)
+        if len(_decay_cache) > 256:
+            _decay_cache.clear()
+        _decay_cache[key] = matrix
+    return matrix
+
+
+def linear_recurrence(u, coeff, y0):
+    """Berechnet y[k] = coeff * y[k-1] + u[k] für alle Zeilen von `u` auf einmal.
+
+    `u` hat die Form (n, Spalten), `y0` ist der Zustand vor der ersten
+    Zeile. Statt einer Python-Schleife wird mit einer Dreiecksmatrix
+    multipliziert; lange Batches werden in Stücken von MAX_BATCH gerechnet.
+    """
+    out = np.empty_like(u)
+    y = np.asarray(y0, dtype=float)
+    for start in range(0, len(u), MAX_BATCH):
+        chunk = u[start:start + MAX_BATCH]
+        n = len(chunk)
+        powers = coeff ** np.arange(1, n + 1)
+        out[start:start + n] = _decay_matrix(coeff, n) @ chunk + np.outer(powers, y)
+        y = out[start + n - 1]
+    return out
+
+
+class LowPass:
+    """Exponentieller Tiefpass y = alpha * x + (1 - alpha) * y_alt.
+
+    Kleines `alpha` glättet stärker, verzögert aber auch mehr.
+    """
+
+    def __init__(self, alpha=0.4, fields=SENSOR_COLUMNS):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha muss in (0, 1] liegen")
+        self.alpha = alpha
+        self.columns = [column(name) for name in fields]
+        self.state = None
+
+    def __call__(self, batch):
+        x = batch[:, self.columns]
+        if self.state is None:
+            self.state = x[0].copy()
+        y = linear_recurrence(self.alpha * x, 1.0 - self.alpha, self.state)
+        batch[:, self.columns] = y
+        self.state = y[-1].copy()
+
+
+class DeadZone:
+    """Setzt Werte mit Betrag unter `threshold` auf 0 und verschiebt den Rest, damit es keinen Sprung gibt."""
+
+    def __init__(self, threshold, fields=("x", "y")):
+        self.threshold = threshold
+        self.columns = [column(name) for name in fields]
+
+    def __call__(self, batch):
+        x = batch[:, self.columns]
+        batch[:, self.columns] = np.sign(x) * np.maximum(np.abs(x) - self.threshold, 0.0)
+
+
+class ComplementaryFilter:
+    """Neigungswinkel tilt_x und tilt_y (rad) aus Beschleunigung und Gyroskop.
+
+    tilt_x ist positiv, wenn Ax positiv ist (Drehung um die y-Achse, Rate
+    -Gy), tilt_y entsprechend für Ay (Drehung um die x-Achse, Rate Gx).
+    Die Beschleunigung allein reagiert auch auf Stöße, das Gyroskop allein
+    driftet; gewichtet mit `alpha` für das Gyroskop bekommt man beides nicht.
+    """
+
+    MAX_DT = 0.1  # Pausen im Datenstrom nicht als lange Drehung integrieren
+
+    def __init__(self, alpha=0.98):
+        self.alpha = alpha
+        self._t = column("t")
+        self._accel = [column("Ax"), column("Ay"), column("Az")]
+        self._rates = [column("Gy"), column("Gx")]
+        self._tilt = [column("tilt_x"), column("tilt_y")]
+        self.state = None
+        self.last_t = None
+
+    def __call__(self, batch):
+        ax, ay, az = (batch[:, i] for i in self._accel)
+        accel_tilt = np.column_stack((np.arctan2(ax, np.hypot(ay, az)),
+                                      np.arctan2(ay, np.hypot(ax, az))))
+        rates = batch[:, self._rates] * np.array([-1.0, 1.0])
+
+        t = batch[:, self._t]
+        previous = t[0] if self.last_t is None else self.last_t
+        dt = np.clip(np.diff(t, prepend=previous), 0.0, self.MAX_DT)
+        if self.state is None:
+            self.state = accel_tilt[0].copy()
+
+        u = self.alpha * rates * dt[:, None] + (1.0 - self.alpha) * accel_tilt
+        tilt = linear_recurrence(u, self.alpha, self.state)
+        batch[:, self._tilt] = tilt
+        self.state = tilt[-1].copy()
+        self.last_t = t[-1]
+
+
+class ResponseCurve:
+    """Bildet `source` über eine Kennlinie auf `target` ab.
+
+    Der Eingang wird durch `limit` geteilt und auf -1..1 begrenzt, dann
+    durch die Kennlinie geschickt und mit `scale` multipliziert. "expo"
+    mischt linear und kubisch: feinfühlig um die Mitte, voller Ausschlag
+    bleibt erreichbar.
+    """
+
+    CURVES = ("linear", "quadratic", "cubic", "expo")
+
+    def __init__(self, source, target, limit, curve="linear", expo=0.3, scale=G):
+        if curve not in self.CURVES:
+            raise ValueError(f"Unbekannte Kennlinie {curve!r}")
+        self.source = column(source)
+        self.target = column(target)
+        self.limit = limit
+        self.curve = curve
+        self.expo = expo
+        self.scale = scale
+
+    def __call__(self, batch):
+        x = np.clip(batch[:, self.source] / self.limit, -1.0, 1.0)
+        if self.curve == "quadratic":
+            x = x * np.abs(x)
+        elif self.curve == "cubic":
+            x = x ** 3
+        elif self.curve == "expo":
+            x = (1.0 - self.expo) * x + self.expo * x ** 3
+        batch[:, self.target] = x * self.scale
+
+
+# Sensorwerte, die default_pipeline() liest; mehr muss ein Controller dafür
+# nicht senden (ControllerRegistry.set_fields)
+TILT_FIELDS = ("Ax", "Ay", "Az", "Gx", "Gy")
+
+
+def default_pipeline():
+    """Neigungssteuerung: geglättet, gyro-gestützt, mit Totzone um die Ruhelage."""
+    return [
+        LowPass(alpha=0.4, fields=("Ax", "Ay", "Az")),
+        ComplementaryFilter(alpha=0.98),
+        ResponseCurve("tilt_x", "x", limit=math.radians(60), curve="expo"),
+        ResponseCurve("tilt_y", "y", limit=math.radians(60), curve="expo"),
+        DeadZone(0.3, fields=("x", "y")),
+    ]
+
+
+def raw_pipeline():
+    """Ungefiltert: x und y sind Ax und Ay (begrenzt auf ±G), wie vor der Filterstufe."""
+    return [
+        ResponseCurve("Ax", "x", limit=G),
+        ResponseCurve("Ay", "y", limit=G),
+    ]
+
+
+class SampleRing:
+    """Ringpuffer fester Größe für Sample-Zeilen."""
+
+    def __init__(self, capacity, width=len(COLUMNS)):
+        self.data = np.zeros((capacity, width))
+        self.capacity = capacity
+        self.head = 0  # nächste Schreibposition
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, rows):
+        rows = rows[-self.capacity:]
+        index = (self.head + np.arange(len(rows))) % self.capacity
+        self.data[index] = rows
+        self.head = (self.head + len(rows)) % self.capacity
+        self.count = min(self.capacity, self.count + len(rows))
+
+    def latest(self, n=None):
+        """Die letzten `n` Zeilen (älteste zuerst) als Kopie."""
+        n = self.count if n is None else min(n, self.count)
+        index = (self.head - n + np.arange(n)) % self.capacity
+        return self.data[index]
+
+
+class LinearPredictor:
+    """Extrapoliert einen Steuerwert linear aus den letzten `window` Samples.
+
+    Die Vorhersage reicht höchstens `max_horizon` Sekunden über das letzte
+    Sample hinaus und wird auf ±`limit` begrenzt. Kommt ein neues Sample,
+    gilt sofort wieder dessen Wert; die Abweichung der Vorhersage zu diesem
+    Zeitpunkt wird als Vorhersagefehler gespeichert.
+    """
+
+    def __init__(self, window=3, max_horizon=0.1, limit=G, history=500):
+        self.max_horizon = max_horizon
+        self.limit = limit
+        self.times = deque(maxlen=window)
+        self.values = deque(maxlen=window)
+        self.errors = deque(maxlen=history)
+        self.slope = 0.0
+
+    def observe(self, times, values):
+        for t, value in zip(times, values):
+            if self.times and t > self.times[-1]:
+                self.errors.append(self.predict(t) - value)
+            self.times.append(float(t))
+            self.values.append(float(value))
+        self._fit()
+
+    def _fit(self):
+        t = np.array(self.times)
+        v = np.array(self.values)
+        dt = t - t.mean()
+        denominator = np.dot(dt, dt)
+        self.slope = float(np.dot(dt, v - v.mean()) / denominator) if denominator > 0 else 0.0
+
+    def predict(self, now):
+        if not self.times:
+            return None
+        horizon = min(max(now - self.times[-1], 0.0), self.max_horizon)
+        value = self.values[-1] + self.slope * horizon
+        if self.limit is not None:
+            value = max(-self.limit, min(self.limit, value))
+        return value
+
+    def stats(self):
+        errors = np.abs(np.array(self.errors))
+        if not len(errors):
+            return {"predictions": 0, "error_mean": 0.0, "error_rms": 0.0, "error_p95": 0.0}
+        return {
+            "predictions": len(errors),
+            "error_mean": float(errors.mean()),
+            "error_rms": float(np.sqrt(np.mean(errors ** 2))),
+            "error_p95": float(np.percentile(errors, 95)),
+        }
+
+
+PREDICT_FIELDS = ("x", "y")
+
+
+class _DeviceState:
+    __slots__ = ("pending", "pipeline", "ring", "predictors", "samples", "batches", "max_batch",
+                 "coalesced", "coalesced_avg", "dropped")
+
+    def __init__(self, pipeline, capacity, predictor):
+        # Begrenzt: läuft noch kein Spiel-Tick (Menü, vor "Start"), bleiben nur
+        # die neuesten `capacity` Samples liegen
+        self.pending = deque(maxlen=capacity)
+        self.pipeline = pipeline
+        self.ring = SampleRing(capacity)
+        self.predictors = {name: predictor() for name in PREDICT_FIELDS} if predictor else {}
+        self.samples = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.coalesced = 0          # Samples, die nicht die neuesten ihres Ticks waren
+        self.coalesced_avg = 0.0    # geglättet pro Tick mit Samples
+        self.dropped = 0            # vor dem Filtern verworfen, weil `pending` voll war
+
+
+class InputFilter:
+    """Gemeinsame Filterstufe aller Spiele, ein Zustand pro Controller.
+
+    `push()` darf aus jedem Thread aufgerufen werden und legt das Sample nur
+    ab; zwischen zwei `update()` werden höchstens `capacity` Samples
+    aufgehoben, ältere verworfen. `update()` (im Spiel-Tick) filtert alle seither angekommenen Samples
+    als einen Batch und gibt das neueste gefilterte Sample als Dict zurück,
+    oder None, wenn nichts Neues kam.
+
+    `value()` gibt dagegen in jedem Tick einen Steuerwert zurück - mit
+    `predictor` (z.B. LinearPredictor) zwischen den Samples extrapoliert.
+    """
+
+    def __init__(self, make_pipeline=default_pipeline, capacity=256, clock=time.monotonic,
+                 predictor=None, stale_after=0.5):
+        self.make_pipeline = make_pipeline
+        self.capacity = capacity
+        self.clock = clock
+        self.predictor = predictor
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def _device(self, device):
+        state = self._devices.get(device)
+        if state is None:
+            state = self._devices[device] = _DeviceState(self.make_pipeline(), self.capacity, self.predictor)
+        return state
+
+    def push(self, device, sample, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        row = [timestamp] + [sample.get(name, 0.0) for name in SENSOR_COLUMNS]
+        with self._lock:
+            state = self._device(device)
+            if len(state.pending) == state.pending.maxlen:
+                state.dropped += 1
+            state.pending.append(row)
+
+    def push_batch(self, device, samples, timestamp=None):
+        """Alle Messungen eines Frames (ble_frame.decode_samples); `timestamp` gilt für die letzte.
+
+        Die älteren Messungen bekommen ihren Zeitstempel aus dem Messzeitpunkt
+        des Controllers, sonst sähe der Filter einen gebündelten Frame als
+        mehrere Messungen im Abstand 0.
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        for sample, age in zip(samples, sample_ages(samples)):
+            self.push(device, sample, timestamp - age)
+
+    def update(self, device):
+        with self._lock:
+            state = self._devices.get(device)
+            if state is None or not state.pending:
+                return None
+            rows = list(state.pending)
+            state.pending.clear()
+
+        batch = np.zeros((len(rows), len(COLUMNS)))
+        batch[:, :len(SENSOR_COLUMNS) + 1] = rows
+        for stage in state.pipeline:
+            stage(batch)
+        state.ring.extend(batch)
+        state.samples += len(rows)
+        state.batches += 1
+        state.max_batch = max(state.max_batch, len(rows))
+        coalesced = len(rows) - 1
+        state.coalesced += coalesced
+        state.coalesced_avg += (coalesced - state.coalesced_avg) / 16
+        for name, predictor in state.predictors.items():
+            predictor.observe(batch[:, 0], batch[:, column(name)])
+        return dict(zip(COLUMNS, batch[-1].tolist()), coalesced=coalesced)
+
+    def value(self, device, field="x", now=None):
+        """Aktueller Steuerwert von `field`, oder None, wenn seit `stale_after` Sekunden nichts kam."""
+        self.update(device)
+        state = self._devices.get(device)
+        if state is None or not len(state.ring):
+            return None
+        if now is None:
+            now = self.clock()
+        last = state.ring.latest(1)[0]
+        if now - last[0] > self.stale_after:
+            return None
+        predictor = state.predictors.get(field)
+        if predictor is not None:
+            return predictor.predict(now)
+        return float(last[column(field)])
+
+    def history(self, device, n=None):
+        """Die letzten gefilterten Samples eines Controllers als Matrix (Spalten wie COLUMNS)."""
+        state = self._devices.get(device)
+        if state is None:
+            return np.zeros((0, len(COLUMNS)))
+        return state.ring.latest(n)
+
+    def reset(self, device=None):
+        """Verwirft Filterzustand und Puffer, z.B. nach einem Controllerwechsel."""
+        with self._lock:
+            if device is None:
+                self._devices.clear()
+            else:
+                self._devices.pop(device, None)
+
+    def stats(self, device):
+        state = self._devices.get(device)
+        if state is None:
+            return {"samples": 0, "batches": 0, "max_batch": 0, "coalesced": 0, "coalesced_avg": 0.0, "dropped": 0}
+        stats = {"samples": state.samples, "batches": state.batches, "max_batch": state.max_batch,
+                 "coalesced": state.coalesced, "coalesced_avg": state.coalesced_avg, "dropped": state.dropped}
+        for name, predictor in state.predictors.items():
+            stats[f"prediction_{name}"] = predictor.stats()
+        return stats
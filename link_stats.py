@@ -0,0 +1,184 @@
+"""Verbindungsqualität eines Controllers aus Frame-Zähler und Sendezeit.
+
+Frames der Version 2 (siehe ble_frame.py) tragen einen Zähler `seq` und die
+Sendezeit `ms` des Controllers. Daraus ergibt sich pro Controller:
+
+    Verlust      Lücken im Zähler; kommt ein Frame später doch noch, zählt
+                 er nicht als verloren, sondern als vertauscht. Ob ein
+                 Zähler zurückliegt oder nach einer langen Lücke übergelaufen
+                 ist, entscheidet die Sendezeit; die Zahl fehlender Frames
+                 ergibt sich dann aus der Lücke in der Sendezeit
+    Jitter       Schwankung der Laufzeit (Ankunft minus Sendezeit), geglättet
+                 wie in RFC 3550 - Schwankungen, die schon beim Senden
+                 entstehen (Firmware hängt), sind damit herausgerechnet
+    Durchsatz    Frames und Bytes pro Sekunde der letzten `window` Sekunden
+
+Hohe Verlust- oder Jitterwerte deuten auf die Funkstrecke, gute Werte bei
+trotzdem ruckelndem Spiel auf den Rechner (dann GameLoop.stats ansehen).
+Ältere Firmware ohne Zähler liefert nur Durchsatz und Ankunftsabstände.
+"""
+
+import time
+from collections import deque
+
+SEQ_MODULO = 256
+CLOCK_MODULO = 65536  # ms
+
+
+class LinkStats:
+    """Messwerte eines Controllers; `on_notification()` pro Notification, `on_frame()` pro Frame.
+
+    `reset()` beim Neuverbinden aufrufen, sonst zählt ein Neustart des
+    Controllers als große Lücke.
+    """
+
+    def __init__(self, window=5.0, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.notifications = 0
+        self.bytes = 0
+        self._recent = deque()  # (Ankunft, Bytes) der letzten `window` Sekunden
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.sequenced = 0      # Frames mit Zähler
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.jitter = 0.0       # Sekunden
+        self.last_arrival = None
+        self.interval = 0.0     # geglätteter Ankunftsabstand, Sekunden
+        self._seq = None        # höchster bisher gesehener Zähler, nicht umlaufend
+        self._device_time = None
+        self._device_interval = None  # geglätteter Abstand der Frames in ms (Controller-Uhr)
+        self._transit = None
+
+    def on_notification(self, size, now=None):
+        if now is None:
+            now = self.clock()
+        self.notifications += 1
+        self.bytes += size
+        self._recent.append((now, size))
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def on_frame(self, seq=None, ms=None, now=None):
+        if now is None:
+            now = self.clock()
+        self.frames += 1
+        if self.last_arrival is not None:
+            self.interval += (now - self.last_arrival - self.interval) / 16
+        self.last_arrival = now
+        if seq is None:
+            return
+
+        self.sequenced += 1
+        seq %= SEQ_MODULO
+        if ms is not None:
+            ms %= CLOCK_MODULO
+        if self._seq is None:
+            self._seq = seq
+        else:
+            delta = (seq - self._seq) % SEQ_MODULO
+            elapsed = self._elapsed(ms)
+            if elapsed is not None and elapsed < 0:
+                # Sendezeit liegt zurück: verspäteter Frame, war schon als verloren gezählt
+                self.reordered += 1
+                self.lost = max(0, self.lost - 1)
+                return
+            if delta == 0 and not elapsed:
+                self.duplicates += 1
+                return
+            if elapsed is None and delta >= SEQ_MODULO // 2:
+                # Ohne Sendezeit: Zähler liegt zurück
+                self.reordered += 1
+                self.lost = max(0, self.lost - 1)
+                return
+            step = self._step(delta, elapsed)
+            if step == 1 and elapsed:
+                if self._device_interval is None:
+                    self._device_interval = float(elapsed)
+                else:
+                    self._device_interval += (elapsed - self._device_interval) / 16
+            self.lost += step - 1
+            self._seq += step
+
+        if ms is None:
+            return
+        if self._device_time is None:
+            self._device_time = ms
+        else:
+            self._device_time += (ms - self._device_time) % CLOCK_MODULO
+        transit = now - self._device_time / 1000.0
+        if self._transit is not None:
+            self.jitter += (abs(transit - self._transit) - self.jitter) / 16
+        self._transit = transit
+
+    def _elapsed(self, ms):
+        """ms seit dem letzten Frame nach der Controller-Uhr, negativ für ältere Frames, None ohne Zeit."""
+        if ms is None or self._device_time is None:
+            return None
+        elapsed = (ms - self._device_time) % CLOCK_MODULO
+        return elapsed - CLOCK_MODULO if elapsed >= CLOCK_MODULO // 2 else elapsed
+
+    def _step(self, delta, elapsed):
+        """Um wie viele Frames der Zähler seit dem letzten weitergelaufen ist.
+
+        Der Zähler kennt nur `delta` modulo 256. Nach einer Lücke von mehr als
+        256 Frames sagt die Sendezeit, wie oft er dazwischen übergelaufen ist.
+        """
+        if delta == 0:
+            delta = SEQ_MODULO  # Sendezeit lief weiter, also genau ein Umlauf
+        if not elapsed or not self._device_interval:
+            return delta
+        turns = round((elapsed / self._device_interval - delta) / SEQ_MODULO)
+        return delta + SEQ_MODULO * max(0, turns)
+
+    def loss_rate(self):
+        expected = self.sequenced + self.lost
+        return self.lost / expected if expected else 0.0
+
+    def throughput(self, now=None):
+        """(Notifications pro Sekunde, Bytes pro Sekunde) der letzten `window` Sekunden."""
+        if now is None:
+            now = self.clock()
+        # list() zuerst: der BLE-Thread hängt evtl. gerade an
+        recent = [entry for entry in list(self._recent) if entry[0] >= now - self.window]
+        if len(recent) < 2:
+            return 0.0, 0.0
+        span = max(now - recent[0][0], recent[-1][0] - recent[0][0])
+        if span <= 0:
+            return 0.0, 0.0
+        return (len(recent) - 1) / span, sum(size for _t, size in recent[1:]) / span
+
+    def stats(self, now=None):
+        if now is None:
+            now = self.clock()
+        rate, byte_rate = self.throughput(now)
+        return {
+            "frames": self.frames,
+            "sequenced": self.sequenced > 0,
+            "lost": self.lost,
+            "loss_rate": self.loss_rate(),
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "jitter_ms": 1000 * self.jitter,
+            "interval_ms": 1000 * self.interval,
+            "samples_per_s": 1.0 / self.interval if self.interval > 0 else 0.0,
+            "notifications_per_s": rate,
+            "bytes_per_s": byte_rate,
+            "age_s": now - self.last_arrival if self.last_arrival is not None else None,
+        }
+
+    def summary(self, now=None):
+        """Kurzform für eine Statuszeile."""
+        stats = self.stats(now)
+        text = f"{stats['samples_per_s']:.0f} Hz"
+        if stats["notifications_per_s"] < 0.8 * stats["samples_per_s"]:
+            text += f" in {stats['notifications_per_s']:.0f} Notif./s"  # gebündelte Frames
+        if stats["sequenced"]:
+            text += f", Verlust {100 * stats['loss_rate']:.1f}%, Jitter {stats['jitter_ms']:.0f} ms"
+        if stats["age_s"] is not None and stats["age_s"] > 1.0:
+            text += f", seit {stats['age_s']:.0f} s still"
+        return text
@@ -0,0 +1,308 @@
+"""Simuliert viele Pong- und Arkanoid-Partien ohne Display, verteilt auf alle Kerne.
+
+Gedacht zum Abstimmen von Konstanten wie BALL_SPEED, PADDLE_SPEED und
+PLAYER_SPEED: statt von Hand zu spielen, werden tausende Partien mit
+geskripteten Spielern (oder aufgezeichneten Controller-Daten, siehe
+sensor_log.py) durchgerechnet und Ballwechsel, Punktestand und eine
+Prüfsumme über den gesamten Physikverlauf ausgewertet.
+
+Jede Partie bekommt einen eigenen Seed; bei gleichen Einstellungen ist das
+Ergebnis einschließlich Prüfsumme bitgenau gleich, egal auf wie vielen
+Prozessen gerechnet wird (`--verify` prüft das).
+
+    python match_sim.py pong --matches 2000 --paddle-speed 3 4 5
+    python match_sim.py arkanoid --matches 500 --player-speed 2 3 4 --ball-speed 5 6
+    python match_sim.py pong --recorded session.blelog
+    python match_sim.py pong --opponent schwer          # rechts spielt pong_ai.PongAI
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import random
+import struct
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from physics import PongPhysics, ArkanoidPhysics
+from pong_ai import PongAI, DIFFICULTIES
+import pong_config as pong
+import arkanoid_config as arkanoid
+
+SIM_RATE = 50        # Schritte pro Sekunde wie GameLoop
+MAX_TICKS = 3000     # Partie endet spätestens nach einer Minute Spielzeit
+_STATE = struct.Struct("<6d")
+
+
+class TrackingPlayer:
+    """Geskripteter Spieler: steuert den Schläger auf den Ball zu.
+
+    Er sieht den Ball mit `reaction` Schritten Verzögerung, schätzt seine
+    Position mit Fehler `noise` (Pixel) und kippt den Controller höchstens
+    bis `max_control` (Einheit wie Ax). Gibt pro Schritt einen Steuerwert
+    zurück, der wie im Spiel mit PADDLE_SPEED bzw. PLAYER_SPEED multipliziert wird.
+    """
+
+    def __init__(self, rng, reaction=8, noise=15.0, gain=0.1, max_control=5.0):
+        self.rng = rng
+        self.gain = gain
+        self.noise = noise
+        self.max_control = max_control
+        self.seen = deque(maxlen=reaction + 1)
+
+    def control(self, ball_position, paddle_position):
+        self.seen.append(ball_position)
+        target = self.seen[0] + self.rng.gauss(0.0, self.noise)
+        control = self.gain * (target - paddle_position)
+        return max(-self.max_control, min(self.max_control, control))
+
+
+class RecordedPlayer:
+    """Spielt aufgezeichnete Steuerwerte ab (einer pro Schritt), ab einem zufälligen Startpunkt."""
+
+    def __init__(self, rng, controls):
+        self.controls = controls
+        self.index = rng.randrange(len(controls))
+
+    def control(self, ball_position, paddle_position):
+        value = self.controls[self.index]
+        self.index = (self.index + 1) % len(self.controls)
+        return value
+
+
+def recorded_controls(path, device=0, sim_rate=SIM_RATE):
+    """Wandelt eine Aufzeichnung in Steuerwerte pro Schritt um, gefiltert wie im Spiel."""
+    from ble_frame import decode_samples, is_binary_frame, sample_ages
+    from ble_stream import FrameReassembler
+    from imu_filter import InputFilter, LinearPredictor
+    from sensor_log import SensorLog
+
+    with SensorLog(path) as log:
+        reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
+        samples = []
+        for t, _address, data in log.frames(device):
+            for frame in reassembler.feed(data):
+                try:
+                    batch = decode_samples(frame)
+                except ValueError:
+                    continue
+                samples.extend((t - age, sample) for sample, age in zip(batch, sample_ages(batch)))
+    if not samples:
+        raise ValueError(f"{path} enthält keine Sensordaten für Gerät {device}")
+
+    clock = [0.0]
+    input_filter = InputFilter(clock=lambda: clock[0], predictor=LinearPredictor)
+    controls = []
+    pending = iter(samples)
+    sample = next(pending, None)
+    for tick in range(int(samples[-1][0] * sim_rate) + 1):
+        clock[0] = tick / sim_rate
+        while sample is not None and sample[0] <= clock[0]:
+            input_filter.push(device, sample[1], timestamp=sample[0])
+            sample = next(pending, None)
+        # Wie in den Spielen: ohne frische Samples steht der Schläger
+        current = input_filter.value(device)
+        controls.append(0.0 if current is None else current)
+    return controls
+
+
+def make_player(spec, rng, controls):
+    if controls is not None:
+        return RecordedPlayer(rng, controls)
+    return TrackingPlayer(rng, spec["reaction"], spec["noise"])
+
+
+def _checksum_update(digest, *values):
+    digest.update(_STATE.pack(*values))
+
+
+def simulate_pong(spec, controls=None):
+    rng = random.Random(spec["seed"])
+    physics = PongPhysics(pong.WIN_WIDTH, pong.WIN_HEIGHT, pong.PADDLE_WIDTH, pong.PADDLE_HEIGHT,
+                          pong.BALL_SIZE, spec["ball_speed"])
+    player = make_player(spec, rng, controls)
+    ai = None
+    opponent = None
+    if spec.get("opponent"):
+        ai = PongAI(physics.ball, physics.paddle2, pong.WIN_WIDTH, pong.WIN_HEIGHT, rng=rng,
+                    **DIFFICULTIES[spec["opponent"]])
+    else:
+        opponent = make_player(spec, rng, controls)
+    paddle1, paddle2 = physics.paddle1, physics.paddle2
+    lives = [spec["lives"], spec["lives"]]
+    digest = hashlib.blake2b(digest_size=8)
+    rallies = []
+    hits_at_serve = 0
+    ticks = 0
+    while ticks < spec["max_ticks"] and min(lives) > 0:
+        ball = physics.ball
+        ball_y = ball.y + ball.height / 2
+        paddle1.vy = player.control(ball_y, paddle1.y + paddle1.height / 2) * spec["paddle_speed"]
+        if ai is not None:
+            paddle2.vy = ai.update()
+        else:
+            paddle2.vy = opponent.control(ball_y, paddle2.y + paddle2.height / 2) * spec["paddle_speed"]
+        result = physics.step()
+        ticks += 1
+        _checksum_update(digest, ball.x, ball.y, ball.vx, ball.vy, paddle1.y, paddle2.y)
+        if result is not None:
+            lives[0 if result == PongPhysics.MISS_LEFT else 1] -= 1
+            rallies.append(physics.paddle_hits - hits_at_serve)
+            hits_at_serve = physics.paddle_hits
+            physics.reset_ball()
+    return {
+        "seed": spec["seed"],
+        "ticks": ticks,
+        "rallies": rallies,
+        "score": f"{lives[0]}:{lives[1]}",
+        "checksum": digest.hexdigest(),
+    }
+
+
+def simulate_arkanoid(spec, controls=None):
+    rng = random.Random(spec["seed"])
+    physics = ArkanoidPhysics(arkanoid.WIN_WIDTH, arkanoid.WIN_HEIGHT, arkanoid.PADDLE_WIDTH,
+                              arkanoid.PADDLE_HEIGHT, arkanoid.BALL_SIZE, spec["ball_speed"],
+                              arkanoid.BLOCK_WIDTH, arkanoid.BLOCK_HEIGHT)
+    player = make_player(spec, rng, controls)
+    paddle = physics.paddle
+    ball = physics.ball
+    lives = spec["lives"]
+    score = 0
+    digest = hashlib.blake2b(digest_size=8)
+    rallies = []
+    hits_at_serve = 0
+    ticks = 0
+    while ticks < spec["max_ticks"] and lives > 0 and len(physics.blocks):
+        paddle.vx = player.control(ball.x + ball.width / 2, paddle.x + paddle.width / 2) * spec["paddle_speed"]
+        score += 10 * len(physics.step())
+        ticks += 1
+        _checksum_update(digest, ball.x, ball.y, ball.vx, ball.vy, paddle.x, float(len(physics.blocks)))
+        if physics.ball_lost():
+            lives -= 1
+            rallies.append(physics.paddle_hits - hits_at_serve)
+            hits_at_serve = physics.paddle_hits
+            physics.reset_ball()
+    if physics.paddle_hits > hits_at_serve:
+        rallies.append(physics.paddle_hits - hits_at_serve)
+    return {
+        "seed": spec["seed"],
+        "ticks": ticks,
+        "rallies": rallies,
+        "score": score,
+        "cleared": not len(physics.blocks),
+        "checksum": digest.hexdigest(),
+    }
+
+
+GAMES = {"pong": simulate_pong, "arkanoid": simulate_arkanoid}
+
+_controls = None  # aufgezeichnete Steuerwerte, einmal pro Prozess geladen
+
+
+def _init_worker(recorded):
+    global _controls
+    _controls = recorded_controls(recorded) if recorded else None
+
+
+def _run(spec):
+    return GAMES[spec["game"]](spec, _controls)
+
+
+def run_batch(specs, workers=None, recorded=None):
+    """Simuliert alle Partien, bei `workers=1` ohne Prozesspool. Ergebnisse in Reihenfolge von `specs`."""
+    if workers == 1:
+        _init_worker(recorded)
+        return [_run(spec) for spec in specs]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(specs) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(recorded,)) as pool:
+        return list(pool.map(_run, specs, chunksize=chunksize))
+
+
+def summarize(results):
+    rallies = sorted(r for result in results for r in result["rallies"])
+
+    def pct(fraction):
+        return rallies[min(len(rallies) - 1, int(fraction * len(rallies)))] if rallies else 0
+
+    batch_digest = hashlib.blake2b(digest_size=8)
+    for result in results:
+        batch_digest.update(bytes.fromhex(result["checksum"]))
+    scores = Counter(result["score"] for result in results)
+    summary = {
+        "matches": len(results),
+        "ticks_avg": sum(result["ticks"] for result in results) / len(results),
+        "rally_avg": sum(rallies) / len(rallies) if rallies else 0.0,
+        "rally_p50": pct(0.5),
+        "rally_p95": pct(0.95),
+        "scores": scores,
+        "checksum": batch_digest.hexdigest(),
+    }
+    if "cleared" in results[0]:
+        summary["cleared"] = sum(result["cleared"] for result in results) / len(results)
+    return summary
+
+
+def print_summary(label, summary):
+    print(f"== {label}")
+    print(f"   {summary['matches']} Partien, Ø {summary['ticks_avg'] / SIM_RATE:.1f} s Spielzeit, "
+          f"Ballwechsel Ø {summary['rally_avg']:.1f}, p50 {summary['rally_p50']}, p95 {summary['rally_p95']}")
+    if "cleared" in summary:
+        print(f"   alle Blöcke abgeräumt: {100 * summary['cleared']:.0f} %")
+    scores = summary["scores"]
+    if all(isinstance(score, int) for score in scores):
+        values = sorted(score for score, count in scores.items() for _ in range(count))
+        print(f"   Punkte Ø {sum(values) / len(values):.0f}, min {values[0]}, max {values[-1]}")
+    else:
+        common = ", ".join(f"{score} ({count})" for score, count in scores.most_common(6))
+        print(f"   Endstände (Leben): {common}")
+    print(f"   Prüfsumme {summary['checksum']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("game", choices=sorted(GAMES))
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="Seed der ersten Partie, die weiteren zählen hoch")
+    parser.add_argument("--ball-speed", type=float, nargs="+")
+    parser.add_argument("--paddle-speed", type=float, nargs="+", help="PADDLE_SPEED (Pong)")
+    parser.add_argument("--player-speed", type=float, nargs="+", help="PLAYER_SPEED (Arkanoid)")
+    parser.add_argument("--lives", type=int, default=5)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--reaction", type=int, default=8, help="Reaktionszeit der Spieler in Schritten")
+    parser.add_argument("--noise", type=float, default=15.0, help="Schätzfehler der Spieler in Pixeln")
+    parser.add_argument("--recorded", help="Sensor-Aufzeichnung statt geskripteter Spieler")
+    parser.add_argument("--opponent", choices=sorted(DIFFICULTIES), help="Pong: rechts spielt der Computergegner")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--verify", action="store_true", help="zusätzlich in einem Prozess rechnen und vergleichen")
+    args = parser.parse_args()
+
+    module = pong if args.game == "pong" else arkanoid
+    ball_speeds = args.ball_speed or [module.BALL_SPEED]
+    if args.game == "pong":
+        paddle_speeds = args.paddle_speed or [pong.PADDLE_SPEED]
+    else:
+        paddle_speeds = args.player_speed or [arkanoid.PLAYER_SPEED]
+
+    for ball_speed, paddle_speed in itertools.product(ball_speeds, paddle_speeds):
+        specs = [{
+            "game": args.game, "seed": args.seed + i, "ball_speed": ball_speed, "paddle_speed": paddle_speed,
+            "lives": args.lives, "max_ticks": args.max_ticks, "reaction": args.reaction, "noise": args.noise,
+            "opponent": args.opponent,
+        } for i in range(args.matches)]
+        start = time.perf_counter()
+        results = run_batch(specs, args.workers, args.recorded)
+        elapsed = time.perf_counter() - start
+        summary = summarize(results)
+        print_summary(f"{args.game}: Ball {ball_speed:g}, Schläger {paddle_speed:g} ({elapsed:.1f} s)", summary)
+        if args.verify:
+            serial = summarize(run_batch(specs, 1, args.recorded))
+            print("   deterministisch" if serial["checksum"] == summary["checksum"]
+                  else f"   ABWEICHUNG: einzeln {serial['checksum']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,747 @@
+"""Netzwerk-Pong: ein Rechner simuliert, beliebig viele Bildschirme zeigen an.
+
+Der Server (`python net_pong.py server`) rechnet das Spiel allein und
+autoritativ mit PongPhysics und den Konstanten aus pong_config. Die
+Clients (`python net_pong.py client HOST`) schicken nur ihren Steuerwert -
+von der Tastatur oder vom eigenen BLE-Controller, gefiltert wie im Spiel -
+und zeigen den Zustand an, den der Server verschickt. Ein Client ohne
+Spielerplatz ist Zuschauer. Ein freier Platz wird mit `--ai` vom
+Computergegner (pong_ai) gespielt, sonst bleibt der Schläger stehen.
+
+Protokoll (UDP, Little Endian, das erste Byte ist der Nachrichtentyp):
+
+    Client -> Server
+        HELLO     uint8 version, uint8 gewünschter Platz (0 = egal, SPECTATE = Zuschauer)
+        INPUT     uint8 player, uint32 seq, uint32 ack, float32 Steuerwert
+        BYE
+    Server -> Client
+        WELCOME   uint8 version, uint8 player (0 = Zuschauer), uint8 sim_rate,
+                  uint16 Breite, uint16 Höhe
+        SNAPSHOT  uint32 tick, uint32 base, uint16 mask, danach für jedes
+                  gesetzte Bit ein int16 (Felder in der Reihenfolge von FIELDS)
+
+Snapshots sind delta-komprimiert: `base` ist der neueste Snapshot, den der
+Client bestätigt hat (`ack` in INPUT), übertragen werden nur die Felder,
+die sich gegenüber diesem geändert haben. Ist `base` 0 oder dem Server zu
+alt, ist der Snapshot vollständig. Ein verlorenes Paket kostet also nur
+etwas mehr Daten im nächsten. Positionen und Geschwindigkeiten werden in
+1/POSITION_SCALE Pixel übertragen. INPUT wird mit fester Rate gesendet;
+ältere oder doppelte Pakete (seq) verwirft der Server.
+
+Die Clients zeigen den Zustand mit `interp_delay` Verzögerung an und
+interpolieren linear zwischen den beiden umgebenden Snapshots, so dass auch
+bei 20 Snapshots pro Sekunde und Paketverlust flüssig gezeichnet wird.
+
+    python net_pong.py server --port 5005 --ai mittel
+    python net_pong.py client 192.168.0.10 --ble 64:E8:33:88:5E:E2
+    python net_pong.py client 192.168.0.10 --spectate
+    python net_pong.py selftest --loss 0.1      # Server und zwei Clients über localhost
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+from physics import PongPhysics
+from pong_ai import PongAI, DIFFICULTIES
+import pong_config as pong
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 5005
+
+HELLO = 1
+INPUT = 2
+BYE = 3
+WELCOME = 16
+SNAPSHOT = 17
+
+SPECTATE = 255
+MAX_CONTROL = 10.0   # Steuerwerte werden auf +-MAX_CONTROL begrenzt (wie Ax in m/s²)
+
+FIELDS = ("ball_x", "ball_y", "ball_vx", "ball_vy", "paddle1", "paddle2", "lives1", "lives2", "winner")
+POSITION_SCALE = 16
+_SCALES = (POSITION_SCALE,) * 6 + (1, 1, 1)
+_BALL_FIELDS = 4     # ball_x .. ball_vy
+_DISCRETE = 6        # ab hier ganzzahlige Felder, werden nicht interpoliert
+
+_HEADER = struct.Struct("<B")
+_HELLO = struct.Struct("<BBB")
+_INPUT = struct.Struct("<BBIIf")
+_WELCOME = struct.Struct("<BBBBHH")
+_SNAPSHOT = struct.Struct("<BIIH")
+
+
+class ProtocolError(ValueError):
+    """Ein empfangenes Paket ist ungültig oder passt nicht zum Zustand."""
+
+
+def quantize(values):
+    """Physik-Werte in die ganzzahlige Form, in der sie übertragen werden."""
+    return tuple(max(-32768, min(32767, int(round(value * scale)))) for value, scale in zip(values, _SCALES))
+
+
+def dequantize(state):
+    return tuple(value / scale for value, scale in zip(state, _SCALES))
+
+
+def encode_snapshot(tick, state, base_tick=0, base=None):
+    """Snapshot `state` (quantisiert) als Delta zu `base`, bzw. vollständig ohne `base`."""
+    mask = 0
+    values = []
+    for i, value in enumerate(state):
+        if base is None or value != base[i]:
+            mask |= 1 << i
+            values.append(value)
+    header = _SNAPSHOT.pack(SNAPSHOT, tick, base_tick if base is not None else 0, mask)
+    return header + struct.pack(f"<{len(values)}h", *values)
+
+
+def decode_snapshot(data, baselines):
+    """Gibt (tick, state) zurück; `baselines` bildet Tick -> bereits bekannten State ab."""
+    if len(data) < _SNAPSHOT.size:
+        raise ProtocolError(f"Snapshot zu kurz: {len(data)} Byte")
+    _type, tick, base_tick, mask = _SNAPSHOT.unpack_from(data)
+    if mask >> len(FIELDS):
+        raise ProtocolError(f"Ungültige Feldmaske {mask:#06x}")
+    count = bin(mask).count("1")
+    if len(data) != _SNAPSHOT.size + 2 * count:
+        raise ProtocolError(f"Snapshot mit {count} Feldern hat {len(data)} Byte")
+    values = iter(struct.unpack_from(f"<{count}h", data, _SNAPSHOT.size))
+    if base_tick:
+        base = baselines.get(base_tick)
+        if base is None:
+            raise ProtocolError(f"Basis-Snapshot {base_tick} unbekannt")
+    else:
+        base = None
+    state = []
+    for i in range(len(FIELDS)):
+        if mask & (1 << i):
+            state.append(next(values))
+        elif base is not None:
+            state.append(base[i])
+        else:
+            raise ProtocolError(f"Vollständiger Snapshot ohne Feld {FIELDS[i]}")
+    return tick, tuple(state)
+
+
+class _Client:
+    __slots__ = ("address", "player", "seq", "control", "acked", "last_seen",
+                 "snapshots", "full_snapshots", "bytes_sent")
+
+    def __init__(self, address, player, now):
+        self.address = address
+        self.player = player
+        self.seq = -1
+        self.control = 0.0
+        self.acked = 0
+        self.last_seen = now
+        self.snapshots = 0
+        self.full_snapshots = 0
+        self.bytes_sent = 0
+
+
+class PongServer(asyncio.DatagramProtocol):
+    """Autoritativer Pong-Server; wird mit `loop.create_datagram_endpoint()` gestartet, dann `run()`.
+
+    Pro Sekunde werden `sim_rate` Physik-Schritte gerechnet und
+    `snapshot_rate` Snapshots an alle Clients geschickt. Meldet sich ein
+    Client `client_timeout` Sekunden nicht, wird sein Platz frei. Nach
+    Spielende beginnt nach `restart_delay` Sekunden eine neue Partie.
+    """
+
+    HISTORY = 64  # so viele Snapshots werden als mögliche Delta-Basis aufgehoben
+
+    def __init__(self, sim_rate=50, snapshot_rate=20, lives=5, ai=None, client_timeout=5.0,
+                 restart_delay=3.0, clock=time.monotonic):
+        self.sim_rate = sim_rate
+        self.snapshot_every = max(1, round(sim_rate / snapshot_rate))
+        self.lives_per_game = lives
+        self.ai_level = ai
+        self.client_timeout = client_timeout
+        self.restart_delay = restart_delay
+        self.clock = clock
+        self.transport = None
+        self.clients = {}   # Adresse -> _Client
+        self.history = {}   # Tick -> quantisierter State
+        self.serves = deque(maxlen=self.HISTORY)  # Ticks, mit denen ein neuer Aufschlag beginnt
+        self.tick = 0
+        self.running = False
+        self.received = 0
+        self.rejected = 0
+        self.new_game()
+
+    def new_game(self):
+        self.physics = PongPhysics(pong.WIN_WIDTH, pong.WIN_HEIGHT, pong.PADDLE_WIDTH, pong.PADDLE_HEIGHT,
+                                   pong.BALL_SIZE, pong.BALL_SPEED)
+        self.lives = [self.lives_per_game, self.lives_per_game]
+        self.winner = 0
+        self.ended_at = None
+        self.serves.append(self.tick + 1)
+        self.ais = {}
+        if self.ai_level:
+            for player, paddle in ((1, self.physics.paddle1), (2, self.physics.paddle2)):
+                self.ais[player] = PongAI(self.physics.ball, paddle, pong.WIN_WIDTH, pong.WIN_HEIGHT,
+                                          **DIFFICULTIES[self.ai_level])
+
+    # Netzwerk
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.received += 1
+        try:
+            self._handle(data, address)
+        except (ProtocolError, struct.error) as e:
+            self.rejected += 1
+            logger.debug(f"Paket von {address} verworfen: {e}")
+
+    def _handle(self, data, address):
+        if not data:
+            raise ProtocolError("Leeres Paket")
+        kind = data[0]
+        client = self.clients.get(address)
+        if kind == HELLO:
+            _type, version, wanted = _HELLO.unpack(data)
+            if version != PROTOCOL_VERSION:
+                raise ProtocolError(f"Protokollversion {version} statt {PROTOCOL_VERSION}")
+            if client is None:
+                client = self._join(address, wanted)
+            client.last_seen = self.clock()
+            self.transport.sendto(_WELCOME.pack(WELCOME, PROTOCOL_VERSION, client.player, self.sim_rate,
+                                                pong.WIN_WIDTH, pong.WIN_HEIGHT), address)
+        elif kind == INPUT:
+            if client is None:
+                raise ProtocolError("INPUT ohne HELLO")
+            _type, player, seq, ack, control = _INPUT.unpack(data)
+            if seq <= client.seq:
+                return  # verspätet oder doppelt
+            client.seq = seq
+            client.last_seen = self.clock()
+            if ack in self.history:
+                client.acked = max(client.acked, ack)
+            if player and player == client.player and control == control:  # NaN verwerfen
+                client.control = max(-MAX_CONTROL, min(MAX_CONTROL, control))
+        elif kind == BYE:
+            if client is not None:
+                self._leave(client, "abgemeldet")
+        else:
+            raise ProtocolError(f"Unbekannter Nachrichtentyp {kind}")
+
+    def _join(self, address, wanted):
+        taken = {client.player for client in self.clients.values()}
+        if wanted == SPECTATE:
+            player = 0
+        elif wanted in (1, 2) and wanted not in taken:
+            player = wanted
+        else:
+            player = next((p for p in (1, 2) if p not in taken), 0)
+        client = self.clients[address] = _Client(address, player, self.clock())
+        logger.info(f"{address} ist {'Spieler ' + str(player) if player else 'Zuschauer'}")
+        return client
+
+    def _leave(self, client, reason):
+        del self.clients[client.address]
+        logger.info(f"{client.address} {reason} (Snapshots: {client.snapshots}, "
+                    f"davon vollständig: {client.full_snapshots}, {client.bytes_sent} Byte)")
+
+    # Simulation
+
+    def state(self):
+        physics = self.physics
+        ball = physics.ball
+        return quantize((ball.x, ball.y, ball.vx, ball.vy, physics.paddle1.y, physics.paddle2.y,
+                         self.lives[0], self.lives[1], self.winner))
+
+    def step(self):
+        players = {client.player: client for client in self.clients.values() if client.player}
+        for player, paddle in ((1, self.physics.paddle1), (2, self.physics.paddle2)):
+            client = players.get(player)
+            if client is not None:
+                paddle.vy = client.control * pong.PADDLE_SPEED
+            elif player in self.ais:
+                paddle.vy = self.ais[player].update()
+            else:
+                paddle.vy = 0
+
+        if self.winner:
+            if self.clock() - self.ended_at >= self.restart_delay:
+                self.new_game()
+        else:
+            result = self.physics.step()
+            if result is not None:
+                loser = 0 if result == PongPhysics.MISS_LEFT else 1
+                self.lives[loser] -= 1
+                if self.lives[loser] == 0:
+                    self.winner = 2 - loser
+                    self.ended_at = self.clock()
+                    logger.info(f"Spieler {self.winner} gewinnt")
+                self.physics.reset_ball()
+                self.serves.append(self.tick + 1)
+        self.tick += 1
+
+    def broadcast(self):
+        state = self.state()
+        self.history[self.tick] = state
+        self.history.pop(self.tick - self.HISTORY * self.snapshot_every, None)
+        now = self.clock()
+        for client in list(self.clients.values()):
+            if now - client.last_seen > self.client_timeout:
+                self._leave(client, "antwortet nicht mehr")
+                continue
+            base = self.history.get(client.acked)
+            packet = encode_snapshot(self.tick, state, client.acked, base)
+            client.snapshots += 1
+            client.full_snapshots += base is None
+            client.bytes_sent += len(packet)
+            self.transport.sendto(packet, client.address)
+
+    async def run(self):
+        """Fester Takt wie GameLoop: fällige Schritte nachholen, höchstens 5 am Stück."""
+        dt = 1.0 / self.sim_rate
+        self.running = True
+        next_step = self.clock()
+        while self.running:
+            steps = 0
+            while self.clock() >= next_step and steps < 5:
+                self.step()
+                if self.tick % self.snapshot_every == 0:
+                    self.broadcast()
+                next_step += dt
+                steps += 1
+            if self.clock() >= next_step:
+                next_step = self.clock()  # Rückstand verwerfen
+            await asyncio.sleep(max(0.0, next_step - self.clock()))
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return {
+            "tick": self.tick,
+            "clients": {str(client.address): {"player": client.player, "snapshots": client.snapshots,
+                                              "full": client.full_snapshots, "bytes": client.bytes_sent}
+                        for client in self.clients.values()},
+            "received": self.received,
+            "rejected": self.rejected,
+        }
+
+
+class SnapshotInterpolator:
+    """Gibt den Server-Zustand mit fester Verzögerung zurück, linear interpoliert.
+
+    Die Zuordnung Server-Tick -> lokale Zeit folgt dem kleinsten beobachteten
+    Versatz (schnellstes Paket) sofort nach unten und nur langsam nach oben,
+    damit Laufzeitschwankungen nicht als Ruckeln sichtbar werden.
+    """
+
+    # Bewegt sich der Ball schneller, war es ein neuer Aufschlag: nicht interpolieren
+    MAX_BALL_STEP = 2 * POSITION_SCALE * pong.BALL_SPEED
+
+    def __init__(self, sim_rate, delay=0.1, capacity=32, clock=time.monotonic):
+        self.dt = 1.0 / sim_rate
+        self.delay = delay
+        self.clock = clock
+        self.offset = None
+        self.snapshots = deque(maxlen=capacity)  # (tick, state), aufsteigend
+        self.late = 0
+        self._lock = threading.Lock()
+
+    def add(self, tick, state, now=None):
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            if self.snapshots and tick <= self.snapshots[-1][0]:
+                self.late += 1
+                return
+            offset = now - tick * self.dt
+            if self.offset is None or offset < self.offset:
+                self.offset = offset
+            else:
+                self.offset += 0.01 * (offset - self.offset)
+            self.snapshots.append((tick, state))
+
+    def render_tick(self, now=None):
+        if now is None:
+            now = self.clock()
+        return (now - self.offset - self.delay) / self.dt
+
+    def sample(self, now=None):
+        """Zustand (Werte in Pixeln, siehe FIELDS) für die Anzeige, oder None vor dem ersten Snapshot."""
+        with self._lock:
+            if not self.snapshots:
+                return None
+            t = self.render_tick(now)
+            snapshots = self.snapshots
+            if t <= snapshots[0][0]:
+                return dequantize(snapshots[0][1])
+            if t >= snapshots[-1][0]:
+                return dequantize(snapshots[-1][1])  # Snapshots verspätet: letzten Stand halten
+            for (tick_a, a), (tick_b, b) in zip(snapshots, list(snapshots)[1:]):
+                if tick_a <= t <= tick_b:
+                    break
+        fraction = (t - tick_a) / (tick_b - tick_a)
+        limit = (tick_b - tick_a) * self.MAX_BALL_STEP
+        jump = abs(b[0] - a[0]) > limit or abs(b[1] - a[1]) > limit
+        state = []
+        for i, (value_a, value_b) in enumerate(zip(a, b)):
+            if i >= _DISCRETE or (jump and i < _BALL_FIELDS):
+                state.append(value_a if i >= _DISCRETE else value_b)
+            else:
+                state.append(value_a + (value_b - value_a) * fraction)
+        return dequantize(state)
+
+
+class NetClient(asyncio.DatagramProtocol):
+    """Client-Seite des Protokolls; `control` darf aus jedem Thread gesetzt werden.
+
+    Nach dem Start wird HELLO wiederholt, bis WELCOME kommt, danach wird
+    `control` mit `input_rate` an den Server geschickt (Zuschauer schicken
+    nur die Bestätigungen).
+    """
+
+    def __init__(self, want=0, input_rate=50, interp_delay=0.1, clock=time.monotonic):
+        self.want = want
+        self.input_rate = input_rate
+        self.interp_delay = interp_delay
+        self.clock = clock
+        self.transport = None
+        self.player = None      # nach WELCOME: 1, 2 oder 0 (Zuschauer)
+        self.field = None       # (Breite, Höhe) des Servers
+        self.interpolator = None
+        self.control = 0.0
+        self.seq = 0
+        self.ack = 0
+        self.baselines = {}
+        self.received = 0
+        self.bytes_received = 0
+        self.rejected = 0
+        self.running = False
+        self.welcomed = asyncio.Event()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.received += 1
+        self.bytes_received += len(data)
+        try:
+            self._handle(data)
+        except (ProtocolError, struct.error) as e:
+            self.rejected += 1
+            logger.debug(f"Paket vom Server verworfen: {e}")
+
+    def _handle(self, data):
+        if not data:
+            raise ProtocolError("Leeres Paket")
+        if data[0] == WELCOME:
+            _type, version, player, sim_rate, width, height = _WELCOME.unpack(data)
+            if version != PROTOCOL_VERSION:
+                raise ProtocolError(f"Protokollversion {version} statt {PROTOCOL_VERSION}")
+            if self.interpolator is None:
+                self.interpolator = SnapshotInterpolator(sim_rate, self.interp_delay, clock=self.clock)
+            self.player = player
+            self.field = (width, height)
+            self.welcomed.set()
+        elif data[0] == SNAPSHOT:
+            if self.interpolator is None:
+                return  # WELCOME ging verloren, kommt beim nächsten HELLO
+            tick, state = decode_snapshot(data, self.baselines)
+            self.baselines[tick] = state
+            if tick > self.ack:
+                self.ack = tick
+            self.interpolator.add(tick, state)
+        else:
+            raise ProtocolError(f"Unbekannter Nachrichtentyp {data[0]}")
+
+    def _prune(self):
+        # Nur die letzten Snapshots werden als Basis gebraucht
+        if len(self.baselines) > PongServer.HISTORY:
+            for tick in sorted(self.baselines)[:-PongServer.HISTORY]:
+                del self.baselines[tick]
+
+    async def run(self):
+        self.running = True
+        while self.running and not self.welcomed.is_set():
+            self.transport.sendto(_HELLO.pack(HELLO, PROTOCOL_VERSION, self.want))
+            try:
+                await asyncio.wait_for(self.welcomed.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+        interval = 1.0 / self.input_rate
+        while self.running:
+            self._prune()
+            self.seq += 1
+            self.transport.sendto(_INPUT.pack(INPUT, self.player, self.seq, self.ack, float(self.control)))
+            await asyncio.sleep(interval)
+
+    def close(self):
+        self.running = False
+        if self.transport is not None:
+            self.transport.sendto(_HEADER.pack(BYE))
+            self.transport.close()
+
+    def stats(self):
+        return {
+            "player": self.player,
+            "received": self.received,
+            "bytes_per_packet": self.bytes_received / self.received if self.received else 0.0,
+            "rejected": self.rejected,
+            "late": self.interpolator.late if self.interpolator else 0,
+        }
+
+
+async def connect(host, port=DEFAULT_PORT, **kwargs):
+    """Startet einen NetClient auf der laufenden Schleife, gibt (client, run-Task) zurück."""
+    loop = asyncio.get_running_loop()
+    _transport, client = await loop.create_datagram_endpoint(lambda: NetClient(**kwargs),
+                                                             remote_addr=(host, port))
+    return client, loop.create_task(client.run())
+
+
+async def serve(host="0.0.0.0", port=DEFAULT_PORT, **kwargs):
+    """Startet einen PongServer auf der laufenden Schleife, gibt (server, run-Task) zurück."""
+    loop = asyncio.get_running_loop()
+    _transport, server = await loop.create_datagram_endpoint(lambda: PongServer(**kwargs),
+                                                             local_addr=(host, port))
+    return server, loop.create_task(server.run())
+
+
+class PongClientWindow:
+    """Tk-Anzeige eines NetClient; steuert per Tastatur (Pfeiltasten) oder BLE-Controller."""
+
+    def __init__(self, root, client, ble_address=None):
+        import tkinter as tk
+        from ble_frame import decode_samples, is_binary_frame
+        from ble_stream import FrameReassembler
+        from ble_hub import BleHub
+        from game_loop import GameLoop
+        from imu_filter import InputFilter, LinearPredictor
+        from renderer import TkRenderer
+        from Pong_Bluetooth3 import Ball, Paddle
+
+        self.root = root
+        self.client = client
+        self.root.title("Pong (Netzwerk)")
+        self.status_label = tk.Label(root, text="Verbinde...", fg="white", bg="black")
+        self.status_label.pack(fill=tk.X)
+        self.canvas = tk.Canvas(root, width=pong.WIN_WIDTH, height=pong.WIN_HEIGHT, bg="black")
+        self.canvas.pack()
+        self.renderer = TkRenderer(self.canvas)
+        # Nur für die Geometrie, gerechnet wird auf dem Server
+        layout = PongPhysics(pong.WIN_WIDTH, pong.WIN_HEIGHT, pong.PADDLE_WIDTH, pong.PADDLE_HEIGHT,
+                             pong.BALL_SIZE, pong.BALL_SPEED)
+        self.bodies = (layout.ball, layout.paddle1, layout.paddle2)
+        self.ball = Ball(self.renderer, layout.ball)
+        self.paddles = (Paddle(self.renderer, layout.paddle1), Paddle(self.renderer, layout.paddle2))
+        self.renderer.flush()
+
+        self.key_control = 0.0
+        self.root.bind("<Up>", lambda e: self.set_key_control(-1.0))
+        self.root.bind("<Down>", lambda e: self.set_key_control(1.0))
+        self.root.bind("<KeyRelease-Up>", lambda e: self.set_key_control(0.0))
+        self.root.bind("<KeyRelease-Down>", lambda e: self.set_key_control(0.0))
+
+        self.input_filter = None
+        self.hub = None
+        if ble_address:
+            self.input_filter = InputFilter(predictor=LinearPredictor)
+            reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
+
+            def on_notify(sender, data):
+                for frame in reassembler.feed(data):
+                    try:
+                        self.input_filter.push_batch(1, decode_samples(frame))
+                    except ValueError as e:
+                        logger.error(f"Fehler bei der Verarbeitung der BLE-Daten: {e}")
+
+            self.hub = BleHub(characteristic_uuid=pong.CHARACTERISTIC_UUID).start()
+            self.hub.add_device(1, ble_address, on_notify,
+                                on_status=lambda status: logger.info(f"Controller: {status}"))
+
+        self.game_loop = GameLoop(self.root, self.update, self.render)
+        self.game_loop.start()
+
+    def set_key_control(self, direction):
+        # Tastatur entspricht vollem Ausschlag: Steuerwert 1 -> PADDLE_SPEED
+        self.key_control = direction
+
+    def update(self):
+        value = self.input_filter.value(1) if self.input_filter else None
+        self.client.control = value if value is not None else self.key_control
+
+    def render(self):
+        interpolator = self.client.interpolator
+        state = interpolator.sample() if interpolator else None
+        if state is None:
+            return
+        ball, paddle1, paddle2 = self.bodies
+        ball.x, ball.y = state[0], state[1]
+        paddle1.y, paddle2.y = state[4], state[5]
+        self.ball.sync()
+        for paddle in self.paddles:
+            paddle.sync()
+        self.renderer.flush()
+        lives1, lives2, winner = (int(value) for value in state[_DISCRETE:])
+        role = f"Spieler {self.client.player}" if self.client.player else "Zuschauer"
+        text = f"{role}   Leben: {lives1} : {lives2}"
+        if winner:
+            text += f"   Spieler {winner} gewinnt!"
+        self.status_label.config(text=text)
+
+    def close(self):
+        self.game_loop.stop()
+        if self.hub is not None:
+            self.hub.stop()
+
+
+class _LossyTransport:
+    """Verwirft einen Teil der gesendeten Pakete (für den Selbsttest)."""
+
+    def __init__(self, transport, loss, rng):
+        self.transport = transport
+        self.loss = loss
+        self.rng = rng
+        self.dropped = 0
+
+    def sendto(self, data, address=None):
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        self.transport.sendto(data, address)
+
+    def close(self):
+        self.transport.close()
+
+
+async def selftest(duration=10.0, loss=0.0, port=0, seed=1, ai="schwer"):
+    """Server und zwei Clients über localhost; misst Datenmenge und Interpolationsfehler."""
+    rng = random.Random(seed)
+    server, server_task = await serve("127.0.0.1", port, ai=ai)
+    server.transport = _LossyTransport(server.transport, loss, rng)
+    port = server.transport.transport.get_extra_info("sockname")[1]
+    # Spieler 1 steuert per Netz, Spieler 2 spielt der Computer auf dem Server
+    player, player_task = await connect("127.0.0.1", port, want=1)
+    viewer, viewer_task = await connect("127.0.0.1", port, want=SPECTATE)
+    for client in (player, viewer):
+        client.transport = _LossyTransport(client.transport, loss, rng)
+
+    truth = {}
+    errors = []
+    original_step = server.step
+
+    def step():
+        original_step()
+        ball = server.physics.ball
+        truth[server.tick] = (ball.x, ball.y)
+    server.step = step
+
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        await asyncio.sleep(1.0 / 60)
+        now = time.monotonic()
+        state = viewer.interpolator.sample(now) if viewer.interpolator else None
+        if state is None:
+            continue
+        # Spieler 1 folgt dem Ball, den er selbst interpoliert sieht
+        offset = state[1] + pong.BALL_SIZE / 2 - (state[4] + pong.PADDLE_HEIGHT / 2)
+        player.control = max(-1.0, min(1.0, offset / 20))
+        t = viewer.interpolator.render_tick(now)
+        # Snapshot-Paar, zwischen dem der Zuschauer interpoliert hat; liegt ein
+        # Aufschlag dazwischen, springt der Ball und der Fehler sagt nichts aus
+        ticks = [tick for tick, _state in viewer.interpolator.snapshots]
+        first = max((tick for tick in ticks if tick <= t), default=int(t))
+        last = max(min((tick for tick in ticks if tick >= t), default=int(t) + 1), int(t) + 1)
+        if any(first < serve <= last for serve in server.serves):
+            continue
+        low = truth.get(int(t))
+        high = truth.get(int(t) + 1)
+        if low and high:
+            fraction = t - int(t)
+            x = low[0] + (high[0] - low[0]) * fraction
+            y = low[1] + (high[1] - low[1]) * fraction
+            errors.append(((state[0] - x) ** 2 + (state[1] - y) ** 2) ** 0.5)
+
+    for client, task in ((player, player_task), (viewer, viewer_task)):
+        client.close()
+        task.cancel()
+    server.stop()
+    await asyncio.gather(server_task, player_task, viewer_task, return_exceptions=True)
+    server.transport.close()
+
+    errors.sort()
+    print(f"Server: {server.tick} Schritte, Leben {server.lives[0]}:{server.lives[1]}, "
+          f"Paketverlust {loss:.0%}")
+    for name, client in (("Spieler", player), ("Zuschauer", viewer)):
+        print(f"{name}: {client.stats()}")
+    for address, stats in server.stats()["clients"].items():
+        print(f"Server -> {address}: {stats}, Ø {stats['bytes'] / max(1, stats['snapshots']):.1f} Byte/Snapshot "
+              f"(vollständig {_SNAPSHOT.size + 2 * len(FIELDS)} Byte)")
+    if errors:
+        print(f"Interpolationsfehler Ball: Ø {sum(errors) / len(errors):.2f} px, "
+              f"p95 {errors[int(0.95 * (len(errors) - 1))]:.2f} px, max {errors[-1]:.2f} px")
+    return server, errors
+
+
+def run_client(host, port, want, ble_address):
+    import tkinter as tk
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="Netzwerk", daemon=True).start()
+    client, _task = asyncio.run_coroutine_threadsafe(connect(host, port, want=want), loop).result()
+    root = tk.Tk()
+    window = PongClientWindow(root, client, ble_address)
+    root.mainloop()
+    window.close()
+    loop.call_soon_threadsafe(client.close)
+    logger.info(f"Netzwerk: {client.stats()}")
+
+
+async def run_server(host, port, ai, snapshot_rate):
+    server, task = await serve(host, port, ai=ai, snapshot_rate=snapshot_rate)
+    logger.info(f"Server läuft auf {host}:{port}")
+    try:
+        await task
+    finally:
+        logger.info(f"Server: {server.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    server_parser = commands.add_parser("server")
+    server_parser.add_argument("--host", default="0.0.0.0")
+    server_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    server_parser.add_argument("--ai", choices=sorted(DIFFICULTIES), help="freie Plätze spielt der Computer")
+    server_parser.add_argument("--snapshot-rate", type=int, default=20)
+    client_parser = commands.add_parser("client")
+    client_parser.add_argument("host")
+    client_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    client_parser.add_argument("--player", type=int, choices=(1, 2), default=0, help="gewünschter Platz")
+    client_parser.add_argument("--spectate", action="store_true", help="nur zuschauen")
+    client_parser.add_argument("--ble", metavar="ADRESSE", help="eigener BLE-Controller statt Tastatur")
+    test_parser = commands.add_parser("selftest")
+    test_parser.add_argument("--duration", type=float, default=10.0)
+    test_parser.add_argument("--loss", type=float, default=0.0, help="Anteil verworfener Pakete")
+    args = parser.parse_args()
+
+    if args.command == "server":
+        try:
+            asyncio.run(run_server(args.host, args.port, args.ai, args.snapshot_rate))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "client":
+        run_client(args.host, args.port, SPECTATE if args.spectate else args.player, args.ble)
+    else:
+        asyncio.run(selftest(args.duration, args.loss))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""Spielphysik ohne tkinter.
+
+Positionen und Geschwindigkeiten von Ball, Schlägern und Blöcken liegen in
+Body-Objekten statt im Canvas. Die Spiele zeichnen den Zustand nur noch
+einmal pro Frame (siehe `sync()` in den Spielklassen), die Physik lässt sich
+dadurch auch ohne Display ausführen und testen.
+
+Der Ball wird nicht einfach verschoben und danach auf Überlappung geprüft,
+sondern mit einem "swept AABB"-Test: für jeden Schritt wird der Zeitpunkt
+der ersten Berührung berechnet, der Ball bis dorthin bewegt, reflektiert und
+mit der restlichen Zeit weiterbewegt. Dadurch fliegt auch ein schneller Ball
+nicht mehr durch Schläger oder Blöcke hindurch.
+"""
+
+INF = float("inf")
+
+# Höchstzahl an Berührungen, die pro Schritt aufgelöst werden
+MAX_CONTACTS = 4
+
+
+class Body:
+    """Achsenparalleles Rechteck mit Geschwindigkeit (x, y = linke obere Ecke)."""
+
+    __slots__ = ("x", "y", "width", "height", "vx", "vy")
+
+    def __init__(self, x, y, width, height, vx=0.0, vy=0.0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.vx = vx
+        self.vy = vy
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def bbox(self):
+        """Koordinaten im Format von canvas.coords(): (x1, y1, x2, y2)."""
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+    def center_at(self, cx, cy):
+        self.x = cx - self.width / 2
+        self.y = cy - self.height / 2
+
+    def step(self):
+        self.x += self.vx
+        self.y += self.vy
+
+    def overlaps(self, other):
+        return (self.x < other.x + other.width and other.x < self.x + self.width and
+                self.y < other.y + other.height and other.y < self.y + self.height)
+
+
+def sweep(body, dx, dy, target):
+    """Erste Berührung von `body` bei Bewegung um (dx, dy) mit dem ruhenden `target`.
+
+    Gibt (t, nx, ny) zurück: t in [0, 1] ist der Anteil der Bewegung bis zur
+    Berührung, (nx, ny) die Normale der getroffenen Seite von `target`.
+    None, wenn es keine Berührung gibt oder sich beide schon überlappen
+    (dafür gibt es `separate()`).
+    """
+    if dx > 0:
+        tx_entry = (target.x - (body.x + body.width)) / dx
+        tx_exit = (target.x + target.width - body.x) / dx
+    elif dx < 0:
+        tx_entry = (target.x + target.width - body.x) / dx
+        tx_exit = (target.x - (body.x + body.width)) / dx
+    elif body.x < target.x + target.width and target.x < body.x + body.width:
+        tx_entry, tx_exit = -INF, INF
+    else:
+        return None
+
+    if dy > 0:
+        ty_entry = (target.y - (body.y + body.height)) / dy
+        ty_exit = (target.y + target.height - body.y) / dy
+    elif dy < 0:
+        ty_entry = (target.y + target.height - body.y) / dy
+        ty_exit = (target.y - (body.y + body.height)) / dy
+    elif body.y < target.y + target.height and target.y < body.y + body.height:
+        ty_entry, ty_exit = -INF, INF
+    else:
+        return None
+
+    entry = max(tx_entry, ty_entry)
+    exit_ = min(tx_exit, ty_exit)
+    if entry >= exit_ or entry < 0 or entry > 1:
+        return None
+    if tx_entry > ty_entry:
+        return entry, (-1 if dx > 0 else 1), 0
+    return entry, 0, (-1 if dy > 0 else 1)
+
+
+def separate(body, target):
+    """Schiebt `body` auf dem kürzesten Weg aus dem überlappenden `target`.
+
+    Das passiert, wenn sich ein Schläger in den Ball hineinbewegt hat; der
+    Swept-Test sieht dann keine Berührung mehr. Gibt die Normale (nx, ny) der
+    Seite von `target` zurück, auf die `body` geschoben wurde.
+    """
+    depth, nx, ny = min((body.x + body.width - target.x, -1, 0),
+                        (target.x + target.width - body.x, 1, 0),
+                        (body.y + body.height - target.y, 0, -1),
+                        (target.y + target.height - body.y, 0, 1))
+    body.x += nx * depth
+    body.y += ny * depth
+    return nx, ny
+
+
+def earliest_contact(body, dx, dy, bounds, targets):
+    """Früheste Berührung mit einer Wand oder einem der `targets`.
+
+    `bounds` ist (links, oben, rechts, unten); None steht für eine offene
+    Seite. Gibt (t, nx, ny, target) zurück, bei Wänden ist target None.
+    """
+    best = None
+    left, top, right, bottom = bounds
+    if dx < 0 and left is not None:
+        t = max(0.0, (left - body.x) / dx)
+        if t <= 1:
+            best = (t, 1, 0, None)
+    elif dx > 0 and right is not None:
+        t = max(0.0, (right - body.x - body.width) / dx)
+        if t <= 1:
+            best = (t, -1, 0, None)
+    if dy < 0 and top is not None:
+        t = max(0.0, (top - body.y) / dy)
+        if t <= 1 and (best is None or t < best[0]):
+            best = (t, 0, 1, None)
+    elif dy > 0 and bottom is not None:
+        t = max(0.0, (bottom - body.y - body.height) / dy)
+        if t <= 1 and (best is None or t < best[0]):
+            best = (t, 0, -1, None)
+    for target in targets:
+        hit = sweep(body, dx, dy, target)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = (hit[0], hit[1], hit[2], target)
+    return best
+
+
+def advance(body, bounds, targets_for, on_contact=None):
+    """Bewegt `body` einen Schritt weit und reflektiert an allen Berührungen.
+
+    `targets_for(x1, y1, x2, y2)` liefert die Hindernisse, die im überstrichenen
+    Bereich liegen können. `on_contact(target)` wird für jedes getroffene
+    Hindernis aufgerufen (nicht für Wände), z.B. um einen Block zu entfernen.
+
+    Überlappt `body` zu Beginn schon ein Hindernis (bewegter Schläger), wird
+    er erst herausgeschoben und läuft danach vom Hindernis weg.
+    """
+    for target in targets_for(*body.bbox()):
+        if body.overlaps(target):
+            nx, ny = separate(body, target)
+            if body.vx * nx < 0:
+                body.vx = -body.vx
+            if body.vy * ny < 0:
+                body.vy = -body.vy
+            if on_contact is not None:
+                on_contact(target)
+
+    remaining = 1.0
+    for _ in range(MAX_CONTACTS):
+        dx = body.vx * remaining
+        dy = body.vy * remaining
+        targets = targets_for(min(body.x, body.x + dx), min(body.y, body.y + dy),
+                              max(body.x, body.x + dx) + body.width,
+                              max(body.y, body.y + dy) + body.height)
+        hit = earliest_contact(body, dx, dy, bounds, targets)
+        if hit is None:
+            body.x += dx
+            body.y += dy
+            return
+        t, nx, ny, target = hit
+        body.x += dx * t
+        body.y += dy * t
+        if nx:
+            body.vx = -body.vx
+        if ny:
+            body.vy = -body.vy
+        if target is not None and on_contact is not None:
+            on_contact(target)
+        remaining *= 1.0 - t
+
+
+class BlockGrid:
+    """Blöcke in einem gleichmäßigen Raster, Schlüssel ist (Zeile, Spalte).
+
+    Eine Kollisionsabfrage prüft nur die Zellen, die der Ball überdeckt, und
+    das Entfernen eines Blocks ist ein einzelnes dict-Löschen.
+    """
+
+    def __init__(self, cell_width, cell_height, origin_x=0, origin_y=0):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self._cells = {}
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __iter__(self):
+        return iter(list(self._cells.values()))
+
+    def __contains__(self, block):
+        return self._cells.get(self.cell_of(block)) is block
+
+    def cell_of(self, block):
+        return (int((block.y - self.origin_y) // self.cell_height),
+                int((block.x - self.origin_x) // self.cell_width))
+
+    def add(self, row, col, width=None, height=None):
+        """Legt einen Block in Zelle (row, col) an und gibt ihn zurück."""
+        block = Body(self.origin_x + col * self.cell_width, self.origin_y + row * self.cell_height,
+                     self.cell_width if width is None else width,
+                     self.cell_height if height is None else height)
+        self._cells[(row, col)] = block
+        return block
+
+    def remove(self, block):
+        del self._cells[self.cell_of(block)]
+
+    def candidates(self, x1, y1, x2, y2):
+        """Alle Blöcke in Zellen, die das Rechteck (x1, y1, x2, y2) berührt."""
+        cells = self._cells
+        if not cells:
+            return []
+        first_row = int((y1 - self.origin_y) // self.cell_height)
+        last_row = int((y2 - self.origin_y) // self.cell_height)
+        first_col = int((x1 - self.origin_x) // self.cell_width)
+        last_col = int((x2 - self.origin_x) // self.cell_width)
+        found = []
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                block = cells.get((row, col))
+                if block is not None:
+                    found.append(block)
+        return found
+
+    def query(self, body):
+        """Alle Blöcke, die `body` überlappen, zeilenweise von oben links."""
+        return [block for block in self.candidates(*body.bbox()) if body.overlaps(block)]
+
+
+class PongPhysics:
+    """Regeln von Pong_Bluetooth3.py: zwei senkrechte Schläger, Ball prallt oben/unten ab."""
+
+    MISS_LEFT = 1   # Ball hat die linke Kante erreicht, Spieler 1 verliert ein Leben
+    MISS_RIGHT = 2  # Ball hat die rechte Kante erreicht, Spieler 2 verliert ein Leben
+
+    def __init__(self, width, height, paddle_width, paddle_height, ball_size, ball_speed,
+                 two_players=True, paddle_margin=20):
+        self.width = width
+        self.height = height
+        self.ball_speed = ball_speed
+        paddle_y = height // 2 - paddle_height // 2
+        self.paddle1 = Body(paddle_margin, paddle_y, paddle_width, paddle_height)
+        self.paddle2 = Body(width - paddle_margin - paddle_width, paddle_y,
+                            paddle_width, paddle_height) if two_players else None
+        self.ball = Body(0, 0, ball_size, ball_size)
+        self.paddle_hits = 0
+        self.reset_ball()
+
+    def reset_ball(self):
+        self.ball.center_at(self.width // 2, self.height // 2)
+        self.ball.vx = self.ball_speed
+        self.ball.vy = self.ball_speed
+
+    def move_paddle(self, paddle):
+        # Schläger bleibt stehen, wenn der nächste Schritt über den Rand hinausginge
+        if 0 <= paddle.y + paddle.vy <= self.height - paddle.height:
+            paddle.y += paddle.vy
+
+    def step(self):
+        """Ein Physik-Schritt. Gibt MISS_LEFT, MISS_RIGHT oder None zurück."""
+        self.move_paddle(self.paddle1)
+        if self.paddle2:
+            self.move_paddle(self.paddle2)
+
+        ball = self.ball
+        advance(ball, (None, 0, None, self.height), self._paddles, self._count_hit)
+
+        if ball.x <= 0:
+            return self.MISS_LEFT
+        if ball.right >= self.width:
+            return self.MISS_RIGHT
+        return None
+
+    def _paddles(self, x1, y1, x2, y2):
+        return (self.paddle1, self.paddle2) if self.paddle2 else (self.paddle1,)
+
+    def _count_hit(self, paddle):
+        self.paddle_hits += 1
+
+
+class ArkanoidPhysics:
+    """Regeln von Arkanoid_Bluetooth2.py: waagrechter Schläger unten, Blöcke oben."""
+
+    def __init__(self, width, height, paddle_width, paddle_height, ball_size, ball_speed,
+                 block_width, block_height, block_rows=5, paddle_offset=50, reset_speed=4):
+        self.width = width
+        self.height = height
+        self.reset_speed = reset_speed
+        self.paddle = Body(width // 2 - paddle_width // 2, height - paddle_offset,
+                           paddle_width, paddle_height)
+        self.ball = Body(0, 0, ball_size, ball_size, ball_speed, -ball_speed)
+        self.ball.center_at(width // 2, height // 2)
+        self.paddle_hits = 0
+        self.blocks = BlockGrid(block_width, block_height)
+        for row in range(block_rows):
+            for col in range(width // block_width):
+                self.blocks.add(row, col)
+
+    def reset_ball(self):
+        self.ball.center_at(self.width // 2, self.height // 2)
+        self.ball.vx = self.reset_speed
+        self.ball.vy = -self.reset_speed
+
+    def ball_lost(self):
+        return self.ball.bottom > self.height
+
+    def move_paddle(self):
+        paddle = self.paddle
+        paddle.x += paddle.vx
+        if paddle.x < 0:
+            paddle.x = 0
+        elif paddle.right > self.width:
+            paddle.x = self.width - paddle.width
+
+    def step(self):
+        """Ein Physik-Schritt. Gibt die Liste der getroffenen (entfernten) Blöcke zurück.
+
+        Trifft der Ball in einem Schritt mehrere Blöcke nacheinander, werden alle entfernt.
+        """
+        removed = []
+
+        def on_contact(target):
+            if target is self.paddle:
+                self.paddle_hits += 1
+            else:
+                self.blocks.remove(target)
+                removed.append(target)
+
+        advance(self.ball, (0, 0, self.width, None), self._obstacles, on_contact)
+        self.move_paddle()
+        return removed
+
+    def _obstacles(self, x1, y1, x2, y2):
+        obstacles = self.blocks.candidates(x1, y1, x2, y2)
+        obstacles.append(self.paddle)
+        return obstacles
@@ -0,0 +1,108 @@
+"""Computergegner für Pong.
+
+Statt den Ball Schritt für Schritt vorauszurechnen, wird der Punkt, an dem
+er die Linie des Schlägers kreuzt, direkt ausgerechnet: Die Abpraller an
+oberer und unterer Wand werden "aufgefaltet" - der Ball fliegt gedanklich
+geradeaus weiter, und die Höhe wird danach in das Spielfeld zurückgespiegelt.
+Neu gerechnet wird nur, wenn der Ball die Richtung wechselt (Schläger)
+oder neu aufgeschlagen wird - Wandabpraller sind in der Rechnung schon
+enthalten. In den Schritten dazwischen fährt die KI nur ihr Ziel an.
+
+Die Schwierigkeit ergibt sich aus Reaktionszeit (Schritte, bis die KI auf
+eine neue Flugbahn reagiert), Zielfehler (Pixel) und Höchstgeschwindigkeit
+des Schlägers.
+"""
+
+import random
+
+# reaction in Schritten, error in Pixeln (Standardabweichung), max_speed in Pixeln pro Schritt
+DIFFICULTIES = {
+    "leicht": {"reaction": 20, "error": 40.0, "max_speed": 3.0},
+    "mittel": {"reaction": 10, "error": 20.0, "max_speed": 4.0},
+    "schwer": {"reaction": 4, "error": 6.0, "max_speed": 6.0},
+}
+
+
+def fold(y, low, high):
+    """Spiegelt eine aufgefaltete Höhe `y` zurück in [low, high]."""
+    span = high - low
+    if span <= 0:
+        return low
+    u = (y - low) % (2 * span)
+    return low + (u if u <= span else 2 * span - u)
+
+
+def intercept_y(x, y, vx, vy, target_x, low, high):
+    """Höhe, in der ein Ball bei (x, y) mit (vx, vy) die Senkrechte `target_x` erreicht.
+
+    `low`/`high` begrenzen die y-Koordinate des Balls (Wände). Gibt None
+    zurück, wenn sich der Ball nicht auf `target_x` zubewegt.
+    """
+    if vx == 0 or (target_x - x) * vx < 0:
+        return None
+    t = (target_x - x) / vx
+    return fold(y + vy * t, low, high)
+
+
+class PongAI:
+    """Steuert einen Schläger; `update()` gibt einmal pro Schritt dessen Geschwindigkeit zurück.
+
+    `ball` und `paddle` sind physics.Body-Objekte, `height` ist die Höhe des
+    Spielfelds (Wände bei 0 und `height`).
+    """
+
+    def __init__(self, ball, paddle, width, height, reaction=10, error=20.0, max_speed=4.0, rng=None):
+        self.ball = ball
+        self.paddle = paddle
+        self.height = height
+        self.reaction = reaction
+        self.error = error
+        self.max_speed = max_speed
+        self.rng = rng or random.Random()
+        # Linie, auf der die Vorderkante des Balls den Schläger berührt
+        self.right_side = paddle.x > width / 2
+        self.line_x = paddle.x - ball.width if self.right_side else paddle.right
+        self.target = height / 2
+        self.next_target = self.target
+        self.switch_in = 0
+        self.trajectories = 0
+        self._last = None
+
+    def _trajectory_changed(self):
+        ball = self.ball
+        last = self._last
+        self._last = (ball.x, ball.vx)
+        if last is None:
+            return True
+        x, vx = last
+        if vx != ball.vx:
+            return True
+        # Gleiche Richtung, aber Sprung: neuer Aufschlag
+        return abs(ball.x - x - vx) > 1e-6
+
+    def _plan(self):
+        ball = self.ball
+        y = intercept_y(ball.x, ball.y, ball.vx, ball.vy, self.line_x, 0.0, self.height - ball.height)
+        if y is None:
+            target = self.height / 2  # Ball fliegt weg: zurück zur Mitte
+        else:
+            target = y + ball.height / 2 + self.rng.gauss(0.0, self.error)
+        self.next_target = target
+        self.switch_in = self.reaction
+        self.trajectories += 1
+
+    def update(self):
+        if self._trajectory_changed():
+            self._plan()
+        if self.switch_in > 0:
+            self.switch_in -= 1
+            if self.switch_in == 0:
+                self.target = self.next_target
+        elif self.target != self.next_target:
+            self.target = self.next_target
+
+        paddle = self.paddle
+        half = paddle.height / 2
+        target = min(max(self.target, half), self.height - half)
+        offset = target - (paddle.y + half)
+        return max(-self.max_speed, min(self.max_speed, offset))
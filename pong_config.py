@@ -0,0 +1,18 @@
+"""Spielfeld und Geschwindigkeiten von Pong_Bluetooth3.py.
+
+Eigenes Modul, damit headless Programme (net_pong.py als Server,
+match_sim.py) dieselben Maße verwenden, ohne das Spiel samt tkinter und
+bleak zu importieren.
+"""
+
+SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
+CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
+
+# Spielfeldgrößen
+WIN_WIDTH = 800
+WIN_HEIGHT = 600
+PADDLE_WIDTH = 10
+PADDLE_HEIGHT = 100
+BALL_SIZE = 20
+BALL_SPEED = 5
+PADDLE_SPEED = 4
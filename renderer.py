@@ -0,0 +1,264 @@
+"""Zeichenschicht zwischen den Spielobjekten und der Ausgabe.
+
+Die Spielobjekte melden während des Ticks nur, wo ihre Figur jetzt liegt
+(`move()`), und der Renderer überträgt einmal pro Frame (`flush()`) nur
+die Figuren, die sich wirklich geändert haben. Figuren, die nicht mehr
+gebraucht werden (`release()`), werden versteckt und beim nächsten
+`create()` derselben Art wiederverwendet - ein Neustart legt also keine
+neuen Canvas-Items an, sondern färbt und verschiebt die alten.
+
+Es gibt zwei Ausgaben:
+
+    TkRenderer           zeichnet auf ein tk.Canvas
+    FramebufferRenderer  zeichnet ohne Display in ein NumPy-Array (RGB),
+                         z.B. für Benchmarks und Screenshot-Vergleiche
+
+Die Figuren werden mit ihrem Handle (einer Zahl) angesprochen.
+"""
+
+import numpy as np
+
+RECTANGLE = "rectangle"
+OVAL = "oval"
+
+COLORS = {
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "purple": (128, 0, 128),
+    "gray": (190, 190, 190),
+}
+
+
+def rgb(color):
+    """Farbname oder "#rrggbb" als (r, g, b)."""
+    if color.startswith("#") and len(color) == 7:
+        return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    try:
+        return COLORS[color]
+    except KeyError:
+        raise ValueError(f"Unbekannte Farbe {color!r}") from None
+
+
+class _Item:
+    __slots__ = ("kind", "bbox", "fill", "visible", "native", "drawn_bbox", "drawn_fill", "drawn_visible")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.bbox = None
+        self.fill = None
+        self.visible = False
+        self.native = None        # Canvas-Item bzw. None, solange noch nie gezeichnet
+        self.drawn_bbox = None    # Stand der letzten Ausgabe
+        self.drawn_fill = None
+        self.drawn_visible = False
+
+
+class Renderer:
+    """Verwaltung der Figuren und Änderungen; die Ausgabe macht eine Unterklasse in `_apply()`."""
+
+    def __init__(self):
+        self._items = []
+        self._free = {RECTANGLE: [], OVAL: []}
+        self._dirty = {}  # Handle -> None, geordnet nach erster Änderung
+        self.flushes = 0
+        self.applied = 0
+        self.created = 0
+        self.reused = 0
+
+    def create(self, kind, bbox, fill):
+        free = self._free[kind]
+        if free:
+            handle = free.pop()
+            item = self._items[handle]
+            self.reused += 1
+        else:
+            handle = len(self._items)
+            item = _Item(kind)
+            self._items.append(item)
+            self.created += 1
+        item.bbox = tuple(bbox)
+        item.fill = fill
+        item.visible = True
+        self._dirty[handle] = None
+        return handle
+
+    def move(self, handle, bbox):
+        item = self._items[handle]
+        bbox = tuple(bbox)
+        if bbox != item.bbox:
+            item.bbox = bbox
+            self._dirty[handle] = None
+
+    def set_fill(self, handle, fill):
+        item = self._items[handle]
+        if fill != item.fill:
+            item.fill = fill
+            self._dirty[handle] = None
+
+    def release(self, handle):
+        """Versteckt die Figur; das Handle darf danach nicht mehr verwendet werden."""
+        item = self._items[handle]
+        if item.visible:
+            item.visible = False
+            self._free[item.kind].append(handle)
+            self._dirty[handle] = None
+
+    def release_all(self):
+        for handle in range(len(self._items)):
+            self.release(handle)
+
+    def flush(self):
+        """Überträgt alle Änderungen seit dem letzten Aufruf, gibt deren Anzahl zurück."""
+        if not self._dirty:
+            return 0
+        handles = list(self._dirty)
+        self._dirty.clear()
+        self._apply(handles)
+        for handle in handles:
+            item = self._items[handle]
+            item.drawn_bbox = item.bbox
+            item.drawn_fill = item.fill
+            item.drawn_visible = item.visible
+        self.flushes += 1
+        self.applied += len(handles)
+        return len(handles)
+
+    def _apply(self, handles):
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            "items": len(self._items),
+            "visible": sum(1 for item in self._items if item.visible),
+            "flushes": self.flushes,
+            "applied_per_flush": self.applied / self.flushes if self.flushes else 0.0,
+            "created": self.created,
+            "reused": self.reused,
+        }
+
+
+class TkRenderer(Renderer):
+    def __init__(self, canvas):
+        super().__init__()
+        self.canvas = canvas
+
+    def _apply(self, handles):
+        canvas = self.canvas
+        for handle in handles:
+            item = self._items[handle]
+            if item.native is None:
+                if not item.visible:
+                    continue
+                create = canvas.create_rectangle if item.kind == RECTANGLE else canvas.create_oval
+                item.native = create(*item.bbox, fill=item.fill)
+                continue
+            if not item.visible:
+                if item.drawn_visible:
+                    canvas.itemconfigure(item.native, state="hidden")
+                continue
+            if item.bbox != item.drawn_bbox:
+                canvas.coords(item.native, *item.bbox)
+            if item.fill != item.drawn_fill:
+                canvas.itemconfigure(item.native, fill=item.fill)
+            if not item.drawn_visible:
+                canvas.itemconfigure(item.native, state="normal")
+
+
+def _pixel_box(bbox, width, height):
+    x1, y1, x2, y2 = bbox
+    return (max(0, min(width, int(round(x1)))), max(0, min(height, int(round(y1)))),
+            max(0, min(width, int(round(x2)))), max(0, min(height, int(round(y2)))))
+
+
+class FramebufferRenderer(Renderer):
+    """Zeichnet in `pixels` (Höhe x Breite x 3, uint8), ohne Display.
+
+    Neu gezeichnet werden nur die Bereiche, in denen eine Figur verschwunden
+    oder hinzugekommen ist: Hintergrund, dann alle sichtbaren Figuren, die den
+    Bereich berühren, in Erzeugungsreihenfolge. Umrisslinien zeichnet das
+    Canvas, der Framebuffer nicht.
+    """
+
+    FULL_REDRAW_REGIONS = 32
+
+    def __init__(self, width, height, bg="black"):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.bg = np.array(rgb(bg), dtype=np.uint8)
+        self.pixels = np.empty((height, width, 3), dtype=np.uint8)
+        self.pixels[:] = self.bg
+        self.pixels_redrawn = 0
+        # Pixel-Rechtecke und Sichtbarkeit aller Figuren, für die Suche nach betroffenen Figuren
+        self._boxes = np.zeros((0, 4), dtype=np.int64)
+        self._shown = np.zeros(0, dtype=bool)
+
+    def _apply(self, handles):
+        regions = []
+        for handle in handles:
+            item = self._items[handle]
+            if item.drawn_visible:
+                regions.append(_pixel_box(item.drawn_bbox, self.width, self.height))
+            if item.visible:
+                regions.append(_pixel_box(item.bbox, self.width, self.height))
+        if len(regions) > self.FULL_REDRAW_REGIONS:
+            regions = [(0, 0, self.width, self.height)]  # z.B. Neustart: einmal alles zeichnen
+
+        if len(self._items) > len(self._shown):
+            grow = len(self._items) - len(self._shown)
+            self._boxes = np.concatenate((self._boxes, np.zeros((grow, 4), dtype=np.int64)))
+            self._shown = np.concatenate((self._shown, np.zeros(grow, dtype=bool)))
+        for handle in handles:
+            item = self._items[handle]
+            self._shown[handle] = item.visible
+            if item.visible:
+                self._boxes[handle] = _pixel_box(item.bbox, self.width, self.height)
+
+        boxes = self._boxes
+        for clip in regions:
+            cx1, cy1, cx2, cy2 = clip
+            if cx1 >= cx2 or cy1 >= cy2:
+                continue
+            self.pixels[cy1:cy2, cx1:cx2] = self.bg
+            self.pixels_redrawn += (cx2 - cx1) * (cy2 - cy1)
+            hit = (self._shown & (boxes[:, 0] < cx2) & (boxes[:, 2] > cx1)
+                   & (boxes[:, 1] < cy2) & (boxes[:, 3] > cy1))
+            for handle in np.flatnonzero(hit):  # aufsteigend = Erzeugungsreihenfolge
+                self._draw(self._items[handle], boxes[handle], clip)
+
+    def _draw(self, item, box, clip):
+        x1, y1, x2, y2 = box
+        ix1, iy1 = max(x1, clip[0]), max(y1, clip[1])
+        ix2, iy2 = min(x2, clip[2]), min(y2, clip[3])
+        if ix1 >= ix2 or iy1 >= iy2:
+            return
+        region = self.pixels[iy1:iy2, ix1:ix2]
+        color = rgb(item.fill)
+        if item.kind == RECTANGLE:
+            region[:] = color
+            return
+        bx1, by1, bx2, by2 = item.bbox
+        rx, ry = (bx2 - bx1) / 2, (by2 - by1) / 2
+        if rx <= 0 or ry <= 0:
+            return
+        ys = (np.arange(iy1, iy2) + 0.5 - (by1 + ry)) / ry
+        xs = (np.arange(ix1, ix2) + 0.5 - (bx1 + rx)) / rx
+        region[ys[:, None] ** 2 + xs[None, :] ** 2 <= 1.0] = color
+
+    def snapshot(self):
+        return self.pixels.copy()
+
+    def save_ppm(self, path):
+        """Speichert das Bild als PPM (P6), das jeder Bildbetrachter öffnet."""
+        with open(path, "wb") as f:
+            f.write(f"P6 {self.width} {self.height} 255\n".encode("ascii"))
+            f.write(self.pixels.tobytes())
+
+    def stats(self):
+        stats = super().stats()
+        stats["pixels_redrawn"] = self.pixels_redrawn
+        return stats
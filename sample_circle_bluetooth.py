@@ -1,9 +1,15 @@
 import tkinter as tk
-from bleak import BleakClient, BleakScanner, BleakError
-import asyncio
+from bleak import BleakScanner
 import json
-import threading
-from queue import Queue
+from ble_frame import decode_samples, is_binary_frame, FrameError
+from ble_stream import FrameReassembler
+from game_loop import GameLoop
+from ble_hub import BleHub, STATUS_CONNECTED, STATUS_FAILED, STATUS_LOST
+from sensor_log import install_from_env
+from ble_input import InputQueue
+from imu_filter import InputFilter, LinearPredictor
+from device_cache import DeviceCache
+from renderer import TkRenderer, OVAL
 
 # UUIDs für den BLE-Service und die Charakteristik
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
@@ -18,27 +24,29 @@ FG_COLOR = "black"
 BG_COLOR = "white"
 
 class Ball:
-    def __init__(self, canvas):
-        self.canvas = canvas
-        self.ball = canvas.create_oval(WIN_WIDTH // 2 - BALL_SIZE // 2, WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                                       WIN_WIDTH // 2 + BALL_SIZE // 2, WIN_HEIGHT // 2 + BALL_SIZE // 2, fill=FG_COLOR)
+    def __init__(self, renderer):
+        self.renderer = renderer
+        # Position der linken oberen Ecke, das Canvas wird nur noch beim Zeichnen angepasst
+        self.x = WIN_WIDTH // 2 - BALL_SIZE // 2
+        self.y = WIN_HEIGHT // 2 - BALL_SIZE // 2
+        self.item = renderer.create(OVAL, self.bbox(), FG_COLOR)
         self.x_velocity = 0
         self.y_velocity = 0
 
+    def bbox(self):
+        return (self.x, self.y, self.x + BALL_SIZE, self.y + BALL_SIZE)
+
     def move(self):
-        self.canvas.move(self.ball, self.x_velocity, self.y_velocity)
+        self.x += self.x_velocity
+        self.y += self.y_velocity
         self.check_wall_collision()
 
     def check_wall_collision(self):
-        pos = self.canvas.coords(self.ball)
-        if pos[0] < 0:
-            self.canvas.move(self.ball, -pos[0], 0)
-        if pos[1] < 0:
-            self.canvas.move(self.ball, 0, -pos[1])
-        if pos[2] > WIN_WIDTH:
-            self.canvas.move(self.ball, WIN_WIDTH - pos[2], 0)
-        if pos[3] > WIN_HEIGHT:
-            self.canvas.move(self.ball, 0, WIN_HEIGHT - pos[3])
+        self.x = min(max(self.x, 0), WIN_WIDTH - BALL_SIZE)
+        self.y = min(max(self.y, 0), WIN_HEIGHT - BALL_SIZE)
+
+    def sync(self):
+        self.renderer.move(self.item, self.bbox())
 
     def setSpeedX(self, speedX):
         self.x_velocity = speedX 
@@ -47,8 +55,8 @@ class Ball:
         self.y_velocity = speedY 
         
     def reset(self):
-        self.canvas.coords(self.ball, WIN_WIDTH // 2 - BALL_SIZE // 2, WIN_HEIGHT // 2 - BALL_SIZE // 2,
-                           WIN_WIDTH // 2 + BALL_SIZE // 2, WIN_HEIGHT // 2 + BALL_SIZE // 2)
+        self.x = WIN_WIDTH // 2 - BALL_SIZE // 2
+        self.y = WIN_HEIGHT // 2 - BALL_SIZE // 2
 
 class ExampleGame:
     def __init__(self, root):
@@ -57,7 +65,10 @@ class ExampleGame:
         self.canvas = tk.Canvas(root, width=WIN_WIDTH, height=WIN_HEIGHT, bg=BG_COLOR)
         self.canvas.pack()
 
-        self.ball = Ball(self.canvas)
+        # Änderungen werden gesammelt und einmal pro Frame gezeichnet
+        self.renderer = TkRenderer(self.canvas)
+        self.ball = Ball(self.renderer)
+        self.renderer.flush()
 
         self.root.bind("<KeyPress>", self.key_press)
         self.root.bind("<KeyRelease>", self.key_release)
@@ -71,75 +82,60 @@ class ExampleGame:
         self.status_label = tk.Label(root, text="Status: Nicht verbunden", fg="red")
         self.status_label.pack()
 
-        self.ble_queue = Queue()
+        # Weckt den Tk-Thread, sobald Daten da sind (statt alle 100 ms nachzusehen)
+        self.ble_queue = InputQueue(self.root, self.process_ble_data)
+        # Sensordaten werden gesammelt und einmal pro Tick gefiltert,
+        # zwischen zwei Samples wird der Steuerwert extrapoliert
+        self.input_filter = InputFilter(predictor=LinearPredictor)
+        self.ble_steering = False  # steuert gerade der Controller (sonst die Tastatur)?
+        self.ble_hub = BleHub(characteristic_uuid=CHARACTERISTIC_UUID).start()
         self.ble_device_address = None
+        self.ble_device_name = None
         self.connected = False
 
-        self.update_game()
-        self.root.after(100, self.check_ble_queue)
-        self.ble_buffer = b""  # Puffer für empfangene Daten
+        # Bekannte Controller zuerst direkt verbinden, gescannt wird nur, wenn das scheitert
+        self.device_cache = DeviceCache()
+        self.cached_addresses = [entry["address"] for entry in self.device_cache.candidates(SERVICE_UUID)]
+        self.trying_cached = False
 
-    def check_ble_queue(self):
-        try:
-            while not self.ble_queue.empty():
-                #print("Queue not empty")
-                data = self.ble_queue.get_nowait()
-                self.process_ble_data(data)
-        except Exception as e:
-            print(f"⚠️ Fehler beim Verarbeiten der BLE-Daten: {e}")
-        finally:
-            self.root.after(100, self.check_ble_queue)
+        self.game_loop = GameLoop(self.root, self.update_game, self.render)
+        self.game_loop.start()
+        # Setzt fragmentierte Frames zusammen, Binär-Frames werden direkt durchgereicht
+        self.ble_reassembler = FrameReassembler(start_byte=b"{", passthrough=is_binary_frame)
+
+        if self.cached_addresses:
+            self.try_cached_device()
 
-    def process_ble_data(self, json_str):
+    def process_ble_data(self, frame):
         try:
-            json_data = json.loads(json_str)
-            ax = json_data.get("Ax", 0)
-            ay = json_data.get("Ay", 0)
-            self.ball.setSpeedX(ax * PLAYER_SPEED)
-            self.ball.setSpeedY(ay * PLAYER_SPEED)
-        except json.JSONDecodeError as e:
-            print(f"⚠️ Fehler beim Parsen der JSON-Daten: {e}")
+            self.input_filter.push_batch(1, decode_samples(frame))
+        except (json.JSONDecodeError, FrameError) as e:
+            print(f"⚠️ Fehler beim Parsen der Sensordaten: {e}")
         except Exception as e:
             print(f"⚠️ Fehler beim Verarbeiten der BLE-Daten: {e}")
 
     def notification_handler(self, sender, data):
-        self.ble_buffer += data  # Füge die empfangenen Daten zum Puffer hinzu
-        while b"\n" in self.ble_buffer:  # Suche nach dem Trennzeichen
-            # Trenne die Nachricht am ersten Trennzeichen
-            json_str, self.ble_buffer = self.ble_buffer.split(b"\n", 1)
-            try:
-                # Dekodiere die Nachricht und verarbeite sie
-                json_str = json_str.decode('utf-8')
-                self.ble_queue.put(json_str)
-            except UnicodeDecodeError as e:
-                print(f"⚠️ Fehler beim Dekodieren der Daten: {e}")
-            except Exception as e:
-                print(f"⚠️ Fehler beim Verarbeiten der BLE-Daten: {e}")
+        for frame in self.ble_reassembler.feed(data):
+            self.ble_queue.put(bytes(frame))
 
     def start_scan(self):
-        """Startet das Scannen nach BLE-Geräten in einem separaten Thread."""
+        """Startet das Scannen nach BLE-Geräten auf der asyncio-Schleife des Hubs."""
         self.button.config(text="Suche läuft...", state=tk.DISABLED)
-        scan_thread = threading.Thread(target=self.run_ble_scan, daemon=True)
-        scan_thread.start()
-
-    def run_ble_scan(self):
-        """Scan-Prozess läuft in eigenem Thread mit neuer asyncio-Schleife."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.scan_ble_devices())
+        self.ble_hub.run(self.scan_ble_devices())
 
     async def scan_ble_devices(self):
         """Asynchrones Scannen nach BLE-Geräten."""
         try:
-            devices = await BleakScanner.discover(timeout=10.0)  # Timeout von 10 Sekunden
-            for device in devices:
-                # Nutze advertisement_data direkt vom Device-Objekt
-                if device.advertisement.service_uuids:
-                    service_uuids = [str(uuid).lower() for uuid in device.advertisement.service_uuids]
+            discovered = await BleakScanner.discover(timeout=10.0, return_adv=True)  # Timeout von 10 Sekunden
+            for device, advertisement in discovered.values():
+                if advertisement.service_uuids:
+                    service_uuids = [str(uuid).lower() for uuid in advertisement.service_uuids]
                     
                     if SERVICE_UUID.lower() in service_uuids:
                         self.ble_device_address = device.address
+                        self.ble_device_name = device.name
                         print(f"✅ Gefundenes ESP32-Gerät: {self.ble_device_address}")
+                        self.device_cache.record_seen(device.address, device.name, advertisement.rssi, SERVICE_UUID)
                         self.root.after(0, self.enable_connect_button, device.name)
                         return
 
@@ -148,6 +144,21 @@ class ExampleGame:
             print(f"⚠️ Fehler beim Scannen: {e}")
             self.root.after(0, self.show_no_device_found)
 
+    def try_cached_device(self):
+        """Verbindet direkt mit dem nächsten bekannten Controller; ohne weitere Kandidaten wird gescannt."""
+        if not self.cached_addresses:
+            self.trying_cached = False
+            self.start_scan()
+            return
+        self.trying_cached = True
+        self.ble_device_address = self.cached_addresses.pop(0)
+        self.ble_device_name = None
+        self.button.config(state=tk.DISABLED)
+        self.connect_button.config(text="Verbinde...", state=tk.DISABLED)
+        self.status_label.config(text=f"Status: Verbinde mit bekanntem Gerät {self.ble_device_address}...",
+                                 fg="orange")
+        self.ble_hub.add_device(1, self.ble_device_address, self.notification_handler,
+                                on_status=self.on_ble_status, retry_delay=None)
 
     def enable_connect_button(self, device_name):
         self.connect_button.config(state=tk.NORMAL, text=f"Verbinden mit {device_name}")
@@ -158,35 +169,34 @@ class ExampleGame:
         self.status_label.config(text="Status: Kein Gerät gefunden", fg="red")
 
     def start_connection(self):
-        """Startet die Verbindung mit dem gefundenen ESP32-Gerät in einem separaten Thread."""
+        """Startet die Verbindung mit dem gefundenen ESP32-Gerät als Task im BLE-Hub."""
         if not self.ble_device_address:
             print("⚠️ Kein Gerät zum Verbinden gefunden!")
             return
 
+        self.trying_cached = False
         self.connect_button.config(text="Verbinde...", state=tk.DISABLED)
-        ble_thread = threading.Thread(target=self.run_ble_connection, daemon=True)
-        ble_thread.start()
-
-    def run_ble_connection(self):
-        """Startet die BLE-Verbindung mit eigenem asyncio-Loop."""
-        print("Event-Loop für BLE-Verbindung starten...")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.connect_ble_device())
-
-    async def connect_ble_device(self):
-        """Asynchrone Verbindung zum BLE-Gerät."""
-        try:
-            async with BleakClient(self.ble_device_address) as client:
-                print("✅ Verbindung zu ESP32 hergestellt!")
-                self.connected = True
-                self.root.after(0, self.update_status, "Status: Verbunden", "green")
-                await client.start_notify(CHARACTERISTIC_UUID, self.notification_handler)
-                print("notifying...")
-                await asyncio.Event().wait()  # Run forever
-        except BleakError as e:
-            print(f"❌ BLE-Verbindungsfehler: {e}")
-            self.root.after(0, self.enable_reconnect_button)
+        self.ble_hub.add_device(1, self.ble_device_address, self.notification_handler,
+                                on_status=self.on_ble_status, retry_delay=None)
+
+    def on_ble_status(self, status):
+        """Statusmeldungen des BLE-Hubs (laufen im asyncio-Thread)."""
+        if status == STATUS_CONNECTED:
+            print("✅ Verbindung zu ESP32 hergestellt!")
+            self.connected = True
+            self.trying_cached = False
+            self.device_cache.record_seen(self.ble_device_address, self.ble_device_name, service_uuid=SERVICE_UUID)
+            self.root.after(0, self.update_status, "Status: Verbunden", "green")
+        elif status == STATUS_FAILED:
+            print("❌ BLE-Verbindungsfehler")
+            self.connected = False
+            if self.trying_cached:
+                self.device_cache.record_failure(self.ble_device_address)
+                self.root.after(0, self.try_cached_device)
+            else:
+                self.root.after(0, self.enable_reconnect_button)
+        elif status == STATUS_LOST:
+            self.disconnected_callback(None)
 
     def enable_reconnect_button(self):
         self.connect_button.config(text="Erneut verbinden", state=tk.NORMAL)
@@ -217,13 +227,32 @@ class ExampleGame:
             self.ball.setSpeedY(0)
 
     def update_game(self):
+        # Ein Zeitpunkt für beide Achsen, sonst kann y zwischen den Aufrufen veralten
+        now = self.input_filter.clock()
+        x = self.input_filter.value(1, "x", now)
+        y = self.input_filter.value(1, "y", now)
+        if x is not None and y is not None:
+            self.ball.setSpeedX(x * PLAYER_SPEED)
+            self.ball.setSpeedY(y * PLAYER_SPEED)
+            self.ble_steering = True
+        elif self.ble_steering:
+            # Controller verstummt: anhalten, danach gilt wieder die Tastatur
+            self.ball.setSpeedX(0)
+            self.ball.setSpeedY(0)
+            self.ble_steering = False
         self.ball.move()
-        self.root.after(20, self.update_game)
+
+    def render(self):
+        self.ball.sync()
+        self.renderer.flush()
 
 def main():
+    install_from_env()
     root = tk.Tk()
     game = ExampleGame(root)
     root.mainloop()
+    print(f"BLE-Queue: {game.ble_queue.stats()}")
+    game.ble_hub.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""Aufzeichnung und Wiedergabe der rohen Controller-Daten.
+
+SensorRecorder hängt jede Notification mit Zeitstempel und Gerät an eine
+kompakte Binärdatei an. SensorLog öffnet so eine Datei per mmap, ohne sie
+einzulesen, und ReplayClient spielt sie anstelle eines BleakClient wieder
+ab - in Originalgeschwindigkeit, beschleunigt oder so schnell wie möglich.
+
+Aufbau der Datei:
+
+    Kopf      magic "BLELOG", Version, Startzeit (Unix-Zeit, double)
+    Einträge  Zeit in µs seit Start (int64), Gerät (uint8), Länge (uint16), Daten
+
+Ein Eintrag mit Gerät DEVICE_ANNOUNCE meldet ein neues Gerät an; seine
+Daten sind die Gerätenummer (1 Byte) und die Adresse (UTF-8).
+
+Die Spiele zeichnen auf bzw. spielen ab, wenn die Umgebungsvariablen
+gesetzt sind (siehe install_from_env()):
+
+    BLE_RECORD=session.blelog python Pong_Bluetooth3.py
+    BLE_REPLAY=session.blelog BLE_REPLAY_SPEED=10 python Pong_Bluetooth3.py
+"""
+
+import argparse
+import asyncio
+import atexit
+import functools
+import mmap
+import os
+import struct
+import threading
+import time
+
+from ble_frame import ATT_HEADER_SIZE, COMMAND_PAUSE, COMMAND_RESUME, DEFAULT_MTU, decode_commands
+
+_HEADER = struct.Struct("<6sBxd")
+_RECORD = struct.Struct("<qBH")
+MAGIC = b"BLELOG"
+VERSION = 1
+DEVICE_ANNOUNCE = 0xFF
+MAX_DEVICES = DEVICE_ANNOUNCE
+
+
+class SensorLogError(ValueError):
+    pass
+
+
+class SensorRecorder:
+    """Schreibt Notifications aller Geräte in eine Log-Datei.
+
+    `record()` darf aus jedem Thread aufgerufen werden.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+        self._start = clock()
+
+    def record(self, address, data, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        t_us = int((timestamp - self._start) * 1_000_000)
+        with self._lock:
+            if self._file is None:
+                return
+            device = self._devices.get(address)
+            if device is None:
+                device = len(self._devices)
+                if device >= MAX_DEVICES:
+                    raise SensorLogError(f"Mehr als {MAX_DEVICES} Geräte in einer Aufzeichnung")
+                self._devices[address] = device
+                announce = bytes([device]) + address.encode("utf-8")
+                self._file.write(_RECORD.pack(t_us, DEVICE_ANNOUNCE, len(announce)))
+                self._file.write(announce)
+            self._file.write(_RECORD.pack(t_us, device, len(data)))
+            self._file.write(data)
+            self.frames += 1
+
+    def notify_wrapper(self, address, on_notify):
+        """Gibt einen Notification-Handler zurück, der erst aufzeichnet und dann `on_notify` aufruft."""
+        def recording_handler(sender, data):
+            self.record(address, data)
+            on_notify(sender, data)
+        return recording_handler
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SensorLog:
+    """Liest eine Aufzeichnung über mmap.
+
+    Beim Öffnen werden nur die Eintragsköpfe durchlaufen, die Daten selbst
+    bleiben in der Datei und werden als memoryview herausgegeben. Ein am
+    Ende abgeschnittener Eintrag (Programm abgestürzt) wird ignoriert.
+
+    Die memoryviews zeigen direkt in die Datei. Leben sie beim `close()`
+    noch (z.B. `list(log.frames())`), bleibt die Datei gemappt, bis der
+    letzte freigegeben ist; wer die Daten länger braucht, kopiert sie mit
+    `bytes()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            # mmap lehnt leere Dateien mit einem nichtssagenden ValueError ab
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise SensorLogError(f"{path} ist keine Sensor-Aufzeichnung")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if len(self._mmap) < _HEADER.size:
+            raise SensorLogError(f"{path} ist keine Sensor-Aufzeichnung")
+        magic, version, self.start_time = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SensorLogError(f"{path} ist keine Sensor-Aufzeichnung")
+        if version != VERSION:
+            raise SensorLogError(f"Unbekannte Version {version} in {path}")
+        self.addresses = []  # Gerätenummer -> Adresse
+        self._index = []     # (t_us, Gerät, Offset, Länge)
+        self._build_index()
+
+    def _build_index(self):
+        offset = _HEADER.size
+        end = len(self._mmap)
+        while offset + _RECORD.size <= end:
+            t_us, device, length = _RECORD.unpack_from(self._mmap, offset)
+            data_start = offset + _RECORD.size
+            if data_start + length > end:
+                break
+            if device == DEVICE_ANNOUNCE:
+                number = self._mmap[data_start]
+                address = bytes(self._mmap[data_start + 1:data_start + length]).decode("utf-8")
+                del self.addresses[number:]
+                self.addresses.append(address)
+            else:
+                self._index.append((t_us, device, data_start, length))
+            offset = data_start + length
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def duration(self):
+        return self._index[-1][0] / 1_000_000 if self._index else 0.0
+
+    def device_of(self, address):
+        """Gerätenummer von `address` oder None."""
+        try:
+            return self.addresses.index(address)
+        except ValueError:
+            return None
+
+    def frames(self, device=None):
+        """Liefert (Zeit in s seit Start, Adresse, Daten als memoryview), optional nur für ein Gerät."""
+        view = self._view
+        for t_us, number, start, length in self._index:
+            if device is None or number == device:
+                yield t_us / 1_000_000, self.addresses[number], view[start:start + length]
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # Es gibt noch Ausschnitte aus frames(); die mmap wird mit dem
+            # letzten von ihnen freigegeben
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayClient:
+    """Spielt die Aufzeichnung eines Geräts ab und verhält sich dabei wie ein BleakClient.
+
+    Gedacht als `BleHub.client_factory`. Abgespielt wird das Gerät mit
+    derselben Adresse; gibt es die nicht, das Gerät `source` bzw. bei nur
+    einem aufgezeichneten Gerät dieses. `speed=0` spielt ohne Pausen ab
+    (Lasttest), mit `repeat=True` beginnt die Aufzeichnung am Ende von vorn.
+
+    Befehle an den Controller (ble_frame.encode_command()) werden in
+    `commands` gesammelt; Pause und Fortsetzen halten die Wiedergabe an,
+    Messabstand und Feldauswahl stehen in der Aufzeichnung fest.
+    """
+
+    def __init__(self, address, disconnected_callback=None, log=None, speed=1.0, source=None, repeat=False):
+        self.address = address
+        self.disconnected_callback = disconnected_callback
+        self.log = log
+        self.speed = speed
+        self.repeat = repeat
+        self.services = []
+        self.is_connected = False
+        self.frames_sent = 0
+        self.commands = []
+        self.mtu_size = DEFAULT_MTU
+        self.paused = False
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._task = None
+        self.device = log.device_of(address)
+        if self.device is None:
+            if source is not None:
+                self.device = log.device_of(source) if isinstance(source, str) else source
+            elif len(log.addresses) == 1:
+                self.device = 0
+
+    async def connect(self, timeout=None):
+        if self.device is None:
+            raise SensorLogError(f"Keine Aufzeichnung für {self.address} in {self.log.path}")
+        # Mindestens die MTU, mit der die Aufzeichnung entstanden ist
+        largest = max((len(data) for _t, _address, data in self.log.frames(self.device)), default=0)
+        self.mtu_size = max(DEFAULT_MTU, largest + ATT_HEADER_SIZE)
+        self.paused = False
+        self._resumed.set()
+        self.is_connected = True
+        return True
+
+    async def write_gatt_char(self, characteristic, data, response=True):
+        for command, value in decode_commands(data):
+            self.commands.append((command, value))
+            if command == COMMAND_PAUSE:
+                self.paused = True
+                self._resumed.clear()
+            elif command == COMMAND_RESUME:
+                self.paused = False
+                self._resumed.set()
+
+    async def start_notify(self, characteristic, callback):
+        self._task = asyncio.get_running_loop().create_task(self._play(characteristic, callback))
+
+    async def stop_notify(self, characteristic):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def disconnect(self):
+        await self.stop_notify(None)
+        was_connected = self.is_connected
+        self.is_connected = False
+        if was_connected and self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+        return True
+
+    async def _play(self, characteristic, callback):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            for t, _address, data in self.log.frames(self.device):
+                if self.speed > 0:
+                    delay = started + t / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif self.frames_sent % 64 == 0:
+                    await asyncio.sleep(0)  # anderen Tasks Zeit lassen
+                if self.paused:
+                    # Die Pause verschiebt den Rest der Aufzeichnung
+                    paused_at = loop.time()
+                    await self._resumed.wait()
+                    started += loop.time() - paused_at
+                # Bleak liefert ein bytearray, die Handler dürfen es also behalten
+                callback(characteristic, bytearray(data))
+                self.frames_sent += 1
+            if not self.repeat:
+                return
+
+
+def install_from_env(environ=os.environ):
+    """Richtet Aufzeichnung (BLE_RECORD) oder Wiedergabe (BLE_REPLAY) für alle BleHubs ein.
+
+    BLE_REPLAY_SPEED gibt den Zeitfaktor an (0 = so schnell wie möglich),
+    BLE_REPLAY_REPEAT=1 spielt in Schleife ab.
+    """
+    from ble_hub import BleHub
+
+    record_path = environ.get("BLE_RECORD")
+    if record_path:
+        recorder = SensorRecorder(record_path)
+        atexit.register(recorder.close)
+        BleHub.recorder = recorder
+        print(f"Zeichne Controller-Daten in {record_path} auf")
+
+    replay_path = environ.get("BLE_REPLAY")
+    if replay_path:
+        log = SensorLog(replay_path)
+        speed = float(environ.get("BLE_REPLAY_SPEED", "1"))
+        repeat = environ.get("BLE_REPLAY_REPEAT", "") not in ("", "0")
+        BleHub.client_factory = functools.partial(ReplayClient, log=log, speed=speed, repeat=repeat)
+        print(f"Spiele {replay_path} ab ({len(log)} Frames, {log.duration:.1f} s, Faktor {speed:g})")
+
+
+def print_info(path):
+    with SensorLog(path) as log:
+        print(f"{path}: {len(log)} Frames, {log.duration:.1f} s, "
+              f"Start {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(log.start_time))}")
+        for number, address in enumerate(log.addresses):
+            count = sum(1 for _ in log.frames(number))
+            print(f"  Gerät {number}: {address}, {count} Frames")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zeigt den Inhalt einer Sensor-Aufzeichnung an.")
+    parser.add_argument("paths", nargs="+")
+    for path in parser.parse_args().paths:
+        print_info(path)
@@ -13,13 +13,135 @@ NimBLECharacteristic* pCharacteristic = nullptr;
 bool deviceConnected = false;
 bool oldDeviceConnected = false;
 unsigned long lastDataSent = 0;
-const unsigned long SEND_INTERVAL = 100; // Sendeintervall in Millisekunden
+unsigned long lastSample = 0;
+const unsigned long SEND_INTERVAL = 100; // Sendeintervall ohne Bündelung in Millisekunden
+const unsigned long SAMPLE_INTERVAL = 10; // Messintervall mit Bündelung (100 Hz)
+const unsigned long MAX_BATCH_AGE = 40;  // so lange wartet eine Messung höchstens aufs Senden
+const uint16_t PREFERRED_MTU = 247;      // wird beim Verbinden ausgehandelt
 const unsigned long RETRY_INTERVAL = 1000; // Reconnect-Intervall in Millisekunden
 
 // UUIDs für den BLE-Service und die Charakteristik
 #define SERVICE_UUID        "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 #define CHARACTERISTIC_UUID "beb5483e-36e1-4688-b7f5-ea07361b26a8"
 
+// Datenformat: true = kompakter Binär-Frame, false = JSON mit "\n" (altes Format)
+const bool USE_BINARY_FRAME = true;
+
+// Binär-Frame Version 2 (Little Endian, 20 Byte, füllt eine Notification
+// mit Standard-MTU genau aus). Muss zu ble_frame.py auf dem Host passen.
+// Gegenüber Version 1 kommen Frame-Zähler und Sendezeit dazu, damit der Host
+// verlorene von verspäteten Notifications unterscheiden kann (link_stats.py).
+const uint8_t FRAME_MAGIC = 0xA5;
+const uint8_t FRAME_VERSION_2 = 2;
+const float ACCEL_SCALE = 100.0; // 1/100 m/s²
+const float TEMP_SCALE = 100.0;  // 1/100 °C
+const float GYRO_SCALE = 500.0;  // 1/500 rad/s
+
+// Binär-Frame Version 3: mehrere Messungen in einer Notification, so viele,
+// wie in die ausgehandelte MTU passen. Die Messungen haben aufeinander
+// folgende Zähler ab `seq`, jede trägt ihre eigene Messzeit.
+const uint8_t FRAME_VERSION_3 = 3;
+const uint16_t ATT_HEADER_SIZE = 3;
+
+struct __attribute__((packed)) BatchHeader {
+    uint8_t magic;
+    uint8_t version;
+    uint8_t player;
+    uint8_t count;
+    uint8_t seq;      // Zähler der ersten Messung
+};
+
+struct __attribute__((packed)) BatchSample {
+    uint16_t ms;
+    int16_t ax, ay, az;
+    int16_t t;
+    int16_t gx, gy, gz;
+};
+
+// Binär-Frame Version 4: wie Version 3, aber nur mit den per COMMAND_FIELDS
+// gewählten Sensorwerten. Nach dem Header folgt ein Byte mit der Feldmaske
+// (Bit i = i-tes Feld in der Reihenfolge Ax, Ay, Az, T, Gx, Gy, Gz), jede
+// Messung enthält nach `ms` nur die gesetzten Felder.
+const uint8_t FRAME_VERSION_4 = 4;
+const uint8_t ALL_FIELDS = 0x7F;
+
+const uint8_t MAX_BATCH = 31; // (517 - 3 - 5) / 16, größte MTU nach Spezifikation
+uint8_t batchData[MAX_BATCH * sizeof(BatchSample)]; // Messungen des angefangenen Frames
+size_t batchLength = 0;
+uint8_t batchCount = 0;
+uint8_t batchSeq = 0;
+uint8_t batchFields = ALL_FIELDS;
+unsigned long batchStarted = 0;
+volatile uint16_t negotiatedMtu = 23;
+
+// Befehle, die der Host auf die Charakteristik schreibt (siehe ble_frame.py):
+// FRAME_MAGIC, Befehl, Argument. Mehrere Befehle dürfen aneinanderhängen.
+// Die Einstellungen gelten bis zum Trennen.
+const uint8_t COMMAND_INTERVAL = 0x01; // uint16 ms Messabstand, 0 = Standard
+const uint8_t COMMAND_PAUSE = 0x02;
+const uint8_t COMMAND_RESUME = 0x03;
+const uint8_t COMMAND_FIELDS = 0x04;   // uint8 Feldmaske
+volatile uint16_t requestedInterval = 0;
+volatile bool streaming = true;
+volatile uint8_t fieldMask = ALL_FIELDS;
+volatile bool settingsChanged = false;
+
+struct __attribute__((packed)) SensorFrameV2 {
+    uint8_t magic;
+    uint8_t version;
+    uint8_t player;
+    uint8_t seq;      // läuft nach 255 über
+    uint16_t ms;      // millis() beim Messen, modulo 65536
+    int16_t ax, ay, az;
+    int16_t t;
+    int16_t gx, gy, gz;
+};
+
+int16_t toFixed(float value, float scale) {
+    float scaled = value * scale;
+    if (scaled > 32767.0) return 32767;
+    if (scaled < -32768.0) return -32768;
+    return (int16_t)lroundf(scaled);
+}
+
+// Zählt jeden gemessenen Frame, auch wenn notify() fehlschlägt - dann sieht
+// der Host die Lücke
+uint8_t frameSeq = 0;
+
+// Läuft im BLE-Task, setzt nur Werte; loop() übernimmt sie
+void handleCommands(const uint8_t* data, size_t length) {
+    size_t offset = 0;
+    while (offset + 2 <= length && data[offset] == FRAME_MAGIC) {
+        uint8_t command = data[offset + 1];
+        if (command == COMMAND_INTERVAL && offset + 4 <= length) {
+            requestedInterval = data[offset + 2] | (data[offset + 3] << 8);
+            offset += 4;
+        } else if (command == COMMAND_FIELDS && offset + 3 <= length) {
+            uint8_t mask = data[offset + 2] & ALL_FIELDS;
+            fieldMask = mask ? mask : ALL_FIELDS;
+            offset += 3;
+        } else if (command == COMMAND_PAUSE) {
+            streaming = false;
+            offset += 2;
+        } else if (command == COMMAND_RESUME) {
+            streaming = true;
+            offset += 2;
+        } else {
+            Serial.printf("Unbekannter Befehl: %d\n", command);
+            return;
+        }
+        settingsChanged = true;
+    }
+}
+
+// Callback-Klasse für Schreibzugriffe auf die Charakteristik
+class CommandCallbacks : public NimBLECharacteristicCallbacks {
+    void onWrite(NimBLECharacteristic* pCharacteristic, NimBLEConnInfo& connInfo) override {
+        NimBLEAttValue value = pCharacteristic->getValue();
+        handleCommands(value.data(), value.length());
+    }
+};
+
 // Callback-Klasse für Server-Ereignisse
 class MyServerCallbacks : public NimBLEServerCallbacks {
     void onConnect(NimBLEServer* pServer, NimBLEConnInfo& connInfo) override {
@@ -29,10 +151,50 @@ class MyServerCallbacks : public NimBLEServerCallbacks {
 
     void onDisconnect(NimBLEServer* pServer, NimBLEConnInfo& connInfo, int reason) override {
         deviceConnected = false;
+        negotiatedMtu = 23;
+        // Der nächste Host bekommt wieder die Standardeinstellungen
+        requestedInterval = 0;
+        streaming = true;
+        fieldMask = ALL_FIELDS;
+        settingsChanged = true;
         Serial.printf("Client getrennt. Grund: %d\n", reason);
     }
+
+    void onMTUChange(uint16_t MTU, NimBLEConnInfo& connInfo) override {
+        negotiatedMtu = MTU;
+        Serial.printf("MTU ausgehandelt: %d\n", MTU);
+    }
 };
 
+int sampleSize(uint8_t fields) {
+    return sizeof(uint16_t) + sizeof(int16_t) * __builtin_popcount(fields);
+}
+
+int batchHeaderSize(uint8_t fields) {
+    return sizeof(BatchHeader) + (fields == ALL_FIELDS ? 0 : 1);
+}
+
+// Wie viele Messungen mit diesen Feldern in eine Notification passen
+uint8_t batchCapacity(uint8_t fields) {
+    int capacity = (negotiatedMtu - ATT_HEADER_SIZE - batchHeaderSize(fields)) / sampleSize(fields);
+    int limit = sizeof(batchData) / sampleSize(fields);
+    if (capacity < 0) return 0;
+    return capacity > limit ? limit : capacity;
+}
+
+// Gebündelt wird, sobald mehr als eine Messung passt; mit Feldauswahl
+// gibt es nur Version 4, dann auch mit einer Messung pro Frame
+bool useBatchFrames() {
+    uint8_t fields = fieldMask;
+    uint8_t capacity = batchCapacity(fields);
+    return USE_BINARY_FRAME && (capacity >= 2 || (capacity == 1 && fields != ALL_FIELDS));
+}
+
+unsigned long sampleInterval(bool batched) {
+    if (requestedInterval > 0) return requestedInterval;
+    return batched ? SAMPLE_INTERVAL : SEND_INTERVAL;
+}
+
 void setup() {
     Serial.begin(115200);
     
@@ -53,6 +215,8 @@ void setup() {
     }
     
     Serial.println("MPU6050 Found!");
+    // Tiefpass des Sensors unter der halben Messrate (SAMPLE_INTERVAL)
+    mpu.setFilterBandwidth(MPU6050_BAND_44_HZ);
 
     // BLE Setup
     initBLE();
@@ -61,6 +225,8 @@ void setup() {
 void initBLE() {
     // BLE-Gerät initialisieren
     NimBLEDevice::init("ESP32-C3-NimBLE");
+    // Größere MTU anbieten, der Host handelt sie beim Verbinden aus
+    NimBLEDevice::setMTU(PREFERRED_MTU);
     
     // Erhöhe die Sendeleistung für bessere Reichweite
     NimBLEDevice::setPower(ESP_PWR_LVL_P9);
@@ -79,6 +245,7 @@ void initBLE() {
         NIMBLE_PROPERTY::WRITE | 
         NIMBLE_PROPERTY::NOTIFY
     );
+    pCharacteristic->setCallbacks(new CommandCallbacks());
     
     // Setze initiale Werte
     JsonDocument doc;
@@ -118,6 +285,22 @@ void loop() {
         Serial.println("Starte Advertising neu...");
         oldDeviceConnected = deviceConnected;
     }
+
+    // Neue Einstellungen vom Host: angefangenen Frame noch mit den alten
+    // Feldern senden, sonst sähe der Host seine Messungen als verloren
+    if (settingsChanged) {
+        settingsChanged = false;
+        if (batchCount > 0) {
+            if (deviceConnected) {
+                sendBatch();
+            } else {
+                frameSeq = batchSeq; // Verbindung weg, Zähler nicht verbrauchen
+                batchCount = 0;
+                batchLength = 0;
+            }
+        }
+        mpu.enableSleep(!streaming); // in der Pause schläft auch der Sensor
+    }
     
     // Wenn neu verbunden
     if (deviceConnected && !oldDeviceConnected) {
@@ -125,10 +308,20 @@ void loop() {
         Serial.println("Verbindung hergestellt.");
     }
     
-    // Sende Daten nur wenn verbunden und Intervall erreicht
-    if (deviceConnected && (millis() - lastDataSent >= SEND_INTERVAL)) {
-        sendSensorData();
-        lastDataSent = millis();
+    // Sende Daten nur wenn verbunden und nicht pausiert. Passen mehrere
+    // Messungen in eine Notification, wird schnell gemessen und gebündelt
+    // gesendet, sonst eine Messung pro SEND_INTERVAL (oder dem Messabstand
+    // vom Host)
+    if (deviceConnected && streaming) {
+        if (useBatchFrames()) {
+            if (millis() - lastSample >= sampleInterval(true)) {
+                lastSample = millis();
+                collectSample();
+            }
+        } else if (millis() - lastDataSent >= sampleInterval(false)) {
+            sendSensorData();
+            lastDataSent = millis();
+        }
     }
     
     // Prüfe regelmäßig die Verbindung
@@ -145,20 +338,107 @@ void loop() {
     }
 }
 
+void collectSample() {
+    sensors_event_t a, g, temp;
+    mpu.getEvent(&a, &g, &temp);
+    unsigned long measuredAt = millis();
+
+    if (batchCount == 0) {
+        batchSeq = frameSeq;
+        batchStarted = measuredAt;
+        batchFields = fieldMask;
+        batchLength = 0;
+    }
+    frameSeq++;
+
+    // Aufbau wie BatchSample, aber nur die gewählten Felder
+    uint16_t ms = (uint16_t)(measuredAt & 0xFFFF);
+    int16_t values[7] = {
+        toFixed(a.acceleration.x, ACCEL_SCALE),
+        toFixed(a.acceleration.y, ACCEL_SCALE),
+        toFixed(a.acceleration.z, ACCEL_SCALE),
+        toFixed(temp.temperature, TEMP_SCALE),
+        toFixed(g.gyro.x, GYRO_SCALE),
+        toFixed(g.gyro.y, GYRO_SCALE),
+        toFixed(g.gyro.z, GYRO_SCALE),
+    };
+    memcpy(batchData + batchLength, &ms, sizeof(ms));
+    batchLength += sizeof(ms);
+    for (int i = 0; i < 7; i++) {
+        if (batchFields & (1 << i)) {
+            memcpy(batchData + batchLength, &values[i], sizeof(values[i]));
+            batchLength += sizeof(values[i]);
+        }
+    }
+    batchCount++;
+
+    // Senden, wenn der Frame voll ist oder die erste Messung sonst zu alt würde.
+    // Die Kapazität gilt für die Felder dieses Frames, nicht für eine
+    // inzwischen per Befehl geänderte Auswahl
+    if (batchCount >= batchCapacity(batchFields) || measuredAt - batchStarted >= MAX_BATCH_AGE) {
+        sendBatch();
+    }
+}
+
+void sendBatch() {
+    uint8_t buffer[sizeof(BatchHeader) + 1 + sizeof(batchData)];
+    uint8_t version = batchFields == ALL_FIELDS ? FRAME_VERSION_3 : FRAME_VERSION_4;
+    BatchHeader header = {FRAME_MAGIC, version, 1, batchCount, batchSeq};
+    size_t length = sizeof(header);
+    memcpy(buffer, &header, sizeof(header));
+    if (version == FRAME_VERSION_4) {
+        buffer[length++] = batchFields;
+    }
+    memcpy(buffer + length, batchData, batchLength);
+    length += batchLength;
+    if (!pCharacteristic->notify(buffer, length)) {
+        Serial.println("Fehler beim Senden der Daten!");
+    }
+    batchCount = 0;
+    batchLength = 0;
+}
+
 void sendSensorData() {
     try {
         sensors_event_t a, g, temp;
         mpu.getEvent(&a, &g, &temp);
+        unsigned long measuredAt = millis();
+        uint8_t seq = frameSeq++;
+
+        if (USE_BINARY_FRAME) {
+            SensorFrameV2 frame;
+            frame.magic = FRAME_MAGIC;
+            frame.version = FRAME_VERSION_2;
+            frame.player = 1;
+            frame.seq = seq;
+            frame.ms = (uint16_t)(measuredAt & 0xFFFF);
+            frame.ax = toFixed(a.acceleration.x, ACCEL_SCALE);
+            frame.ay = toFixed(a.acceleration.y, ACCEL_SCALE);
+            frame.az = toFixed(a.acceleration.z, ACCEL_SCALE);
+            frame.t = toFixed(temp.temperature, TEMP_SCALE);
+            frame.gx = toFixed(g.gyro.x, GYRO_SCALE);
+            frame.gy = toFixed(g.gyro.y, GYRO_SCALE);
+            frame.gz = toFixed(g.gyro.z, GYRO_SCALE);
+
+            if (!pCharacteristic->notify((uint8_t*)&frame, sizeof(frame))) {
+                Serial.println("Fehler beim Senden der Daten!");
+            }
+            return;
+        }
         
+        // Nur die per COMMAND_FIELDS gewählten Werte
+        const char* names[7] = {"Ax", "Ay", "Az", "T", "Gx", "Gy", "Gz"};
+        float values[7] = {a.acceleration.x, a.acceleration.y, a.acceleration.z, temp.temperature,
+                           g.gyro.x, g.gyro.y, g.gyro.z};
         JsonDocument doc;
-        doc["Ax"] = a.acceleration.x;
-        doc["Ay"] = a.acceleration.y;
-        doc["Az"] = a.acceleration.z;
-        doc["T"] = temp.temperature;
-        doc["Gx"] = g.gyro.x;
-        doc["Gy"] = g.gyro.y;
-        doc["Gz"] = g.gyro.z;
+        for (int i = 0; i < 7; i++) {
+            if (fieldMask & (1 << i)) {
+                doc[names[i]] = values[i];
+            }
+        }
         doc["player"] = 1;
+        doc["seq"] = seq;
+        doc["ms"] = measuredAt;
         
         char out[512];
         serializeJson(doc, out);
@@ -0,0 +1,93 @@
+import pytest
+
+from ble_frame import (ALL_FIELDS, COMMAND_FIELDS, COMMAND_INTERVAL, COMMAND_PAUSE, COMMAND_RESUME, FRAME_V1_SIZE,
+                       FRAME_V2_SIZE, FrameError, batch_capacity, decode_commands, decode_samples, encode_batch_frame,
+                       encode_binary_frame, encode_command, field_mask, sample_ages)
+
+SAMPLE = {"Ax": 1.23, "Ay": -4.56, "Az": 9.81, "T": 24.5, "Gx": 0.102, "Gy": -0.25, "Gz": 1.5, "player": 2}
+VALUES = ("Ax", "Ay", "Az", "T", "Gx", "Gy", "Gz")
+
+
+def assert_sample(decoded, expected=SAMPLE, fields=VALUES):
+    for name in fields:
+        assert decoded[name] == pytest.approx(expected[name], abs=0.01)
+    assert decoded["player"] == expected["player"]
+
+
+def test_version_1_round_trip():
+    data = encode_binary_frame(SAMPLE, player=2)
+    assert len(data) == FRAME_V1_SIZE
+    [decoded] = decode_samples(data)
+    assert_sample(decoded)
+    assert "seq" not in decoded
+
+
+def test_version_2_round_trip_wraps_counter_and_clock():
+    data = encode_binary_frame(SAMPLE, player=2, seq=257, ms=65537)
+    assert len(data) == FRAME_V2_SIZE
+    [decoded] = decode_samples(data)
+    assert_sample(decoded)
+    assert (decoded["seq"], decoded["ms"]) == (1, 1)
+
+
+def test_version_3_round_trip():
+    data = encode_batch_frame([SAMPLE] * 3, player=2, seq=255, times=[65530, 4, 14])
+    decoded = decode_samples(data)
+    assert [sample["seq"] for sample in decoded] == [255, 0, 1]
+    for sample in decoded:
+        assert_sample(sample)
+    assert sample_ages(decoded) == pytest.approx([0.02, 0.01, 0.0])
+
+
+def test_version_4_only_carries_selected_fields():
+    fields = ("Ax", "Gy")
+    full = encode_batch_frame([SAMPLE] * 2, player=2, times=[0, 10])
+    data = encode_batch_frame([SAMPLE] * 2, player=2, times=[0, 10], fields=fields)
+    assert len(data) < len(full)
+    decoded = decode_samples(data)
+    assert len(decoded) == 2
+    for sample in decoded:
+        assert_sample(sample, fields=fields)
+        assert "Az" not in sample and "T" not in sample
+
+
+def test_json_frame():
+    [decoded] = decode_samples(b'{"Ax":1.23,"Ay":-4.56,"Az":9.81,"T":24.5,"Gx":0.102,"Gy":-0.25,"Gz":1.5,"player":2}\n')
+    assert_sample(decoded)
+
+
+def test_truncated_batch_frame_is_rejected():
+    data = encode_batch_frame([SAMPLE] * 3, player=2, times=[0, 10, 20])
+    with pytest.raises(FrameError):
+        decode_samples(data[:-1])
+
+
+def test_batch_capacity():
+    assert batch_capacity(23) == 0
+    assert batch_capacity(247) == 14
+    assert batch_capacity(517) == 31
+    assert batch_capacity(23, ("Ax", "Ay", "Az", "Gx", "Gy")) == 1
+    # Ein voller Frame passt genau in die Notification
+    assert len(encode_batch_frame([SAMPLE] * 14, times=range(14))) <= 247 - 3
+
+
+def test_commands_round_trip_concatenated():
+    data = (encode_command(COMMAND_INTERVAL, 0.01) + encode_command(COMMAND_FIELDS, ("Ax", "Ay"))
+            + encode_command(COMMAND_PAUSE) + encode_command(COMMAND_INTERVAL, None) + encode_command(COMMAND_RESUME))
+    assert decode_commands(data) == [
+        (COMMAND_INTERVAL, 0.01),
+        (COMMAND_FIELDS, field_mask(("Ax", "Ay"))),
+        (COMMAND_PAUSE, None),
+        (COMMAND_INTERVAL, None),
+        (COMMAND_RESUME, None),
+    ]
+
+
+def test_invalid_commands():
+    assert field_mask(VALUES) == ALL_FIELDS
+    with pytest.raises(ValueError):
+        field_mask(("Ax", "Bx"))
+    with pytest.raises(ValueError):
+        encode_command(COMMAND_INTERVAL, 100.0)
+    with pytest.raises(FrameError):
+        decode_commands(encode_command(COMMAND_INTERVAL, 0.01)[:-1])
@@ -0,0 +1,55 @@
+from link_stats import LinkStats
+
+INTERVAL_MS = 10
+
+
+def feed(stats, seqs, start_ms=60000):
+    """Frames mit fortlaufendem Zähler `seqs` (nicht umlaufend), Sendezeit im Takt INTERVAL_MS."""
+    for seq in seqs:
+        ms = start_ms + seq * INTERVAL_MS
+        stats.on_frame(seq % 256, ms % 65536, now=ms / 1000.0 + 0.02)
+
+
+def test_no_loss_across_counter_and_clock_wrap():
+    stats = LinkStats()
+    feed(stats, range(1000))  # Zähler läuft fast viermal, die Uhr einmal über
+    assert stats.lost == 0
+    assert stats.reordered == 0
+    assert stats.duplicates == 0
+    assert stats.sequenced == 1000
+
+
+def test_gap_longer_than_half_the_counter():
+    stats = LinkStats()
+    feed(stats, list(range(100)) + list(range(300, 400)))  # 2 s Funkloch bei 100 Hz
+    assert stats.lost == 200
+    assert stats.reordered == 0
+    assert abs(stats.loss_rate() - 0.5) < 1e-9
+
+
+def test_gap_longer_than_the_counter():
+    stats = LinkStats()
+    feed(stats, list(range(50)) + list(range(650, 700)))
+    assert stats.lost == 600
+    assert stats.reordered == 0
+
+
+def test_late_frame_counts_as_reordered_not_lost():
+    stats = LinkStats()
+    feed(stats, [0, 1, 2, 4, 3, 5])
+    assert stats.lost == 0
+    assert stats.reordered == 1
+
+
+def test_duplicate():
+    stats = LinkStats()
+    feed(stats, [0, 1, 1, 2])
+    assert stats.duplicates == 1
+    assert stats.lost == 0
+
+
+def test_small_gap_without_device_time():
+    stats = LinkStats()
+    for seq in (0, 1, 5, 6):
+        stats.on_frame(seq, now=seq / 100)
+    assert stats.lost == 3
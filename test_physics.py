@@ -0,0 +1,23 @@
+from physics import Body, PongPhysics, advance
+
+
+def test_paddle_moving_into_ball_pushes_it_out():
+    # Der Schläger ist von oben in den Ball gefahren, der Ball steckt 5 px darin
+    paddle = Body(40, 10, 10, 100)
+    ball = Body(45, 100, 20, 20, vx=-4, vy=-4)
+    hits = []
+    advance(ball, (None, 0, None, 600), lambda *area: (paddle,), hits.append)
+    assert hits == [paddle]
+    assert not ball.overlaps(paddle)
+    assert ball.x >= paddle.right and ball.vx > 0
+
+
+def test_pong_ball_never_ends_inside_a_moving_paddle():
+    physics = PongPhysics(1000, 600, 10, 100, 20, 8)
+    for tick in range(2000):
+        physics.paddle1.vy = 15 if tick // 20 % 2 else -15
+        physics.paddle2.vy = -physics.paddle1.vy
+        if physics.step() is not None:
+            physics.reset_ball()
+        assert not physics.ball.overlaps(physics.paddle1)
+        assert not physics.ball.overlaps(physics.paddle2)
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from ble_frame import COMMAND_PAUSE, COMMAND_RESUME, encode_command
+from sensor_log import ReplayClient, SensorLog, SensorLogError, SensorRecorder
+
+
+def record(path, frames):
+    recorder = SensorRecorder(str(path))
+    notify = recorder.notify_wrapper("64:E8:33:88:5E:E2", lambda sender, data: None)
+    for data in frames:
+        notify(None, bytearray(data))
+    recorder.close()
+
+
+def test_close_with_live_frames(tmp_path):
+    path = tmp_path / "session.blelog"
+    record(path, [b"a", b"bc", b"def"])
+    log = SensorLog(str(path))
+    frames = list(log.frames())
+    log.close()
+    assert [bytes(data) for _t, _address, data in frames] == [b"a", b"bc", b"def"]
+
+    with SensorLog(str(path)) as log:
+        frames = list(log.frames(0))
+    assert len(frames) == 3
+
+
+def test_empty_file_is_rejected(tmp_path):
+    path = tmp_path / "empty.blelog"
+    path.write_bytes(b"")
+    with pytest.raises(SensorLogError):
+        SensorLog(str(path))
+
+
+def test_replay_client_pauses_on_command(tmp_path):
+    path = tmp_path / "session.blelog"
+    record(path, [bytes(40)] * 5)
+
+    async def play(log):
+        client = ReplayClient("64:E8:33:88:5E:E2", log=log, speed=0)
+        await client.connect()
+        await client.write_gatt_char(None, encode_command(COMMAND_PAUSE))
+        received = []
+        await client.start_notify(None, lambda sender, data: received.append(data))
+        await asyncio.sleep(0.01)
+        paused = len(received)
+        await client.write_gatt_char(None, encode_command(COMMAND_RESUME))
+        await asyncio.sleep(0.01)
+        await client.disconnect()
+        return client, paused, len(received)
+
+    with SensorLog(str(path)) as log:
+        client, paused, received = asyncio.run(play(log))
+    assert (paused, received) == (0, 5)
+    assert client.commands == [(COMMAND_PAUSE, None), (COMMAND_RESUME, None)]
+    assert client.mtu_size == 43